@@ -1,19 +1,129 @@
 import re
-import PyPDF2
 import io
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_community.vectorstores import FAISS
-from langchain.chains import RetrievalQA
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import importlib
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 import tempfile
+import threading
+import time
 import os
 import json
+import ingest
+from history import owner_key
+from routing import ModelRouter
+from resilience import lexical_skill_score
+from budget import AnalysisBudget, BudgetExceededError, estimate_tokens, COMPLETION_TOKENS, BATCHED_COMPLETION_TOKENS_PER_SKILL, MESSAGE_OVERHEAD_TOKENS
+from budget import MAX_SECONDS as BUDGET_MAX_SECONDS
+from vector_scoring import SkillVectorScorer
+from dedup import MinHashIndex, mentioned_skills, section_digests, skills_to_rescore
+from retrieval import hybrid_retriever
+from answer_cache import AnswerCache
+from rewrite import split_resume_sections, relevant_skills, section_key, cached_section, cache_section
+import cassette
+import metrics
+from profiling import profiled
+
+# Imported on first use so that the first page paints before these load
+HEAVY_MODULES = (
+    "PyPDF2",
+    "langchain_openai",
+    "langchain_community.vectorstores",
+    "langchain.chains",
+    "langchain.text_splitter",
+    "langchain.embeddings",
+    "langchain.storage",
+)
+
+# Static instructions come first so every per-skill call shares one long, cacheable
+# prompt prefix (instructions, resume, JD); only the short skill suffix varies.
+SKILL_SCORING_INSTRUCTIONS = """You are screening a candidate's resume for a recruiter.
+You will be given the resume, and the job description if there is one, followed by a single skill.
+On a scale of 0-10, rate how clearly the candidate mentions proficiency in that skill.
+Provide a numeric rating first, followed by reasoning."""
+
+# Used when the analysis budget cannot cover one call per skill
+BATCH_SKILL_SCORING_INSTRUCTIONS = """You are screening a candidate's resume for a recruiter.
+You will be given the resume, and the job description if there is one, followed by a list of skills.
+For each skill, rate on a scale of 0-10 how clearly the candidate mentions proficiency in it,
+with one sentence of reasoning. Return a JSON object with a "scores" array of
+{"skill", "score", "reasoning"} objects, one per skill, using the skill names exactly as given."""
+
+WEAKNESS_INSTRUCTIONS = """You are a resume coach. You will be given a resume, and the job description if there is one,
+followed by a skill the resume is weak in demonstrating.
+
+For your analysis, consider:
+1. What's missing from the resume regarding this skill?
+2. How could it be improved with specific examples?
+3. What specific action items would make this skill stand out?
+
+Provide your response in this JSON format:
+{
+    "weakness": "A concise description of what's missing or problematic (1-2 sentences)",
+    "improvement_suggestions": [
+        "Specific suggestion 1",
+        "Specific suggestion 2",
+        "Specific suggestion 3"
+    ],
+    "example_addition": "A specific bullet point that could be added to showcase this skill"
+}
+
+Return only valid JSON, no other text."""
+
+# Shared by every per-section rewrite call so they share a cacheable prompt prefix
+REWRITE_SECTION_INSTRUCTIONS = """You are rewriting one section of a resume to make it highly optimized for the target job.
+You will be given the job description or target role, then the section with the skills it should highlight
+and any weaknesses to address.
+
+Improve the section by:
+1. Adding strong, quantifiable achievements and measurable outcomes
+2. Highlighting the specified skills strategically for ATS scanning
+3. Addressing the weaknesses listed with the suggestions provided
+4. Incorporating the example content provided
+5. Using industry-standard terminology and a clear, professional format
+
+Keep the section's heading and do not invent employers, dates, degrees or contact details.
+Return only the rewritten section text without any additional explanations."""
+
+# Embeddings are cached on disk so evicted vector stores rebuild without API calls
+EMBEDDING_CACHE_DIR = os.environ.get(
+    "EMBEDDING_CACHE_DIR", os.path.join(tempfile.gettempdir(), "resume_agent_embeddings")
+)
+
+# Resubmitted and lightly edited resumes reuse earlier skill scores; shared across sessions, scoped per user
+_duplicate_index = None
+_duplicate_index_lock = threading.Lock()
+
+
+def duplicate_index():
+    """The process-wide near-duplicate resume index, created on first use
+
+    Entries hold MinHash and section signatures and the skill scores, never
+    resume text.
+    """
+    global _duplicate_index
+    with _duplicate_index_lock:
+        if _duplicate_index is None:
+            _duplicate_index = MinHashIndex(threshold=float(os.environ.get("DEDUP_THRESHOLD", "0.85")))
+        return _duplicate_index
+
+
+def warmup():
+    """Import the heavy dependencies ahead of the first analysis"""
+    for module_name in HEAVY_MODULES:
+        importlib.import_module(module_name)
+
 
 class ResumeAnalysisAgent:
-    def __init__(self, api_key, cutoff_score=75):
+    def __init__(self, api_key, cutoff_score=75, analysis_deadline=90, scoring_mode="llm", history=None, question_bank=None,
+                 profile_requests=False):
         self.api_key = api_key
+        self.profile_requests = profile_requests
+        self.history = history
+        self.question_bank = question_bank
+        self.analysis_id = None
         self.cutoff_score = cutoff_score
+        self.analysis_deadline = analysis_deadline
+        self.scoring_mode = scoring_mode
         self.resume_text = None
         self.rag_vectorstore = None
         self.analysis_result = None
@@ -22,9 +132,39 @@ class ResumeAnalysisAgent:
         self.resume_weaknesses = []
         self.resume_strengths = []
         self.improvement_suggestions = {}
+        # Budget of the current analysis; follow-up calls made for it are charged here too
+        self.budget = None
+        self._router = None
+        self._skill_scorer = None
+        self._skill_scorer_key = None
+        self._qa_chain = None
+        self._answer_cache = None
+
+    @property
+    def router(self):
+        """Per-stage model router, rebuilt if the API key changes"""
+        if self._router is None or self._router.api_key != self.api_key:
+            self._router = ModelRouter(self.api_key)
+        return self._router
+
+    @property
+    def history_owner(self):
+        """Key under which this user's analyses are stored; other users' history is never listed or loaded"""
+        return owner_key(self.api_key)
+
+    @property
+    def skill_scorer(self):
+        """Embedding-similarity skill scorer, rebuilt if the API key changes"""
+        if self._skill_scorer is None or self._skill_scorer_key != self.api_key:
+            embeddings = self.create_embeddings()
+            self._skill_scorer = SkillVectorScorer(embeddings, model=embeddings.underlying_embeddings.model)
+            self._skill_scorer_key = self.api_key
+        return self._skill_scorer
 
     def extract_text_from_pdf(self, pdf_file):
         """Extract text from a PDF file"""
+        import PyPDF2
+
         try:
             if hasattr(pdf_file, 'getvalue'): 
                 pdf_data = pdf_file.getvalue()
@@ -54,8 +194,20 @@ class ResumeAnalysisAgent:
             print(f"Error extracting text from text file: {e}")
             return ""
 
+    def extract_text_from_docx(self, docx_file):
+        """Extract text from a DOCX file"""
+        try:
+            if hasattr(docx_file, 'getvalue'):
+                return ingest.extract_docx_text(docx_file.getvalue())
+            else:
+                with open(docx_file, 'rb') as f:
+                    return ingest.extract_docx_text(f.read())
+        except Exception as e:
+            print(f"Error extracting text from DOCX file: {e}")
+            return ""
+
     def extract_text_from_file(self, file):
-        """Extract text from a file (PDF or TXT)"""
+        """Extract text from a file (PDF, DOCX or TXT)"""
         if hasattr(file, 'name'):
             file_extension = file.name.split('.')[-1].lower()
         else:
@@ -65,12 +217,27 @@ class ResumeAnalysisAgent:
             return self.extract_text_from_pdf(file)
         elif file_extension == 'txt':
             return self.extract_text_from_txt(file)
+        elif file_extension == 'docx':
+            return self.extract_text_from_docx(file)
         else:
             print(f"Unsupported file extension: {file_extension}")
             return ""
 
+    def create_embeddings(self):
+        """Create an embeddings client backed by the on-disk embedding cache"""
+        from langchain_openai import OpenAIEmbeddings
+        from langchain.embeddings import CacheBackedEmbeddings
+        from langchain.storage import LocalFileStore
+
+        underlying = OpenAIEmbeddings(api_key=self.api_key, http_client=cassette.http_client())
+        return CacheBackedEmbeddings.from_bytes_store(
+            underlying, LocalFileStore(EMBEDDING_CACHE_DIR), namespace=underlying.model
+        )
+
     def create_rag_vector_store(self, text):
         """Create a vector store for RAG"""
+        from langchain_community.vectorstores import FAISS
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
    
         text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
@@ -80,20 +247,67 @@ class ResumeAnalysisAgent:
         chunks = text_splitter.split_text(text)
         
    
-        embeddings = OpenAIEmbeddings(api_key=self.api_key)
-        vectorstore = FAISS.from_texts(chunks, embeddings)
+        embeddings = self.create_embeddings()
+        vectorstore = FAISS.from_texts(chunks, embeddings, metadatas=[{"chunk": i} for i in range(len(chunks))])
         return vectorstore
 
     def create_vector_store(self, text):
         """Create a simpler vector store for skill analysis"""
-        embeddings = OpenAIEmbeddings(api_key=self.api_key)
+        from langchain_community.vectorstores import FAISS
+
+        embeddings = self.create_embeddings()
         vectorstore = FAISS.from_texts([text], embeddings)
         return vectorstore
 
-    def analyze_skill(self, qa_chain, skill):
+    def get_rag_vectorstore(self):
+        """Return the RAG vector store, rebuilding it if it was evicted"""
+        vectorstore = self.rag_vectorstore
+        if vectorstore is None and self.resume_text:
+            vectorstore = self.create_rag_vector_store(self.resume_text)
+            self.rag_vectorstore = vectorstore
+        return vectorstore
+
+    def release_vector_stores(self):
+        """Drop vector stores to free memory; they are rebuilt on next use"""
+        released = self.rag_vectorstore is not None
+        self.rag_vectorstore = None
+        self._qa_chain = None
+        return released
+
+    def memory_footprint(self):
+        """Approximate bytes held by this agent, by category"""
+        footprint = {
+            "text": len((self.resume_text or "").encode("utf-8")) + len((self.jd_text or "").encode("utf-8")),
+            "analysis": len(json.dumps(self.analysis_result, default=str).encode("utf-8")) if self.analysis_result else 0,
+            "vectorstores": 0,
+        }
+        if self.rag_vectorstore is not None:
+            index = self.rag_vectorstore.index
+            footprint["vectorstores"] += index.ntotal * index.d * 4
+            footprint["vectorstores"] += sum(
+                len(doc.page_content.encode("utf-8")) for doc in self.rag_vectorstore.docstore._dict.values()
+            )
+        return footprint
+
+    def prompt_prefix(self, instructions, resume_text, resume_chars=None):
+        """Build the stable leading messages shared by every per-skill call"""
+        from langchain_core.messages import SystemMessage, HumanMessage
+
+        resume = resume_text[:resume_chars] if resume_chars else resume_text
+        context = f"Resume Content:\n{resume}\n\nJob Description:\n{self.jd_text or 'Not provided'}"
+        return [SystemMessage(content=instructions), HumanMessage(content=context)]
+
+    def new_budget(self):
+        """A fresh per-analysis budget; its wall time never exceeds the analysis deadline"""
+        seconds = min(BUDGET_MAX_SECONDS, self.analysis_deadline) if BUDGET_MAX_SECONDS else self.analysis_deadline
+        return AnalysisBudget(max_seconds=seconds)
+
+    def analyze_skill(self, prefix, skill, budget=None):
         """Analyze a skill in the resume"""
-        query = f"On a scale of 0-10, how clearly does the candidate mention proficiency in {skill}? Provide a numeric rating first, followed by reasoning."
-        response = qa_chain.run(query)
+        from langchain_core.messages import HumanMessage
+
+        messages = prefix + [HumanMessage(content=f"Skill: {skill}")]
+        response = self.router.invoke("skill_scoring", messages, hedge=True, budget=budget).content
         match = re.search(r"(\d{1,2})", response)
         score = int(match.group(1)) if match else 0
         
@@ -103,136 +317,245 @@ class ResumeAnalysisAgent:
     
         return skill, min(score, 10), reasoning
 
-    def analyze_resume_weaknesses(self):
+    def score_skills_batched(self, prefix, skills, budget=None, timeout=None):
+        """Score several skills in one call: {skill: (skill, score, reasoning)} for the skills it answered"""
+        from langchain_core.messages import HumanMessage
+
+        messages = prefix + [HumanMessage(content="Skills:\n" + "\n".join(f"- {skill}" for skill in skills))]
+        result = self.router.invoke_structured("skill_scoring", messages, "skill_scores", timeout=timeout, budget=budget)
+        if result is None:
+            return {}
+
+        by_name = {skill.lower(): skill for skill in skills}
+        scored = {}
+        for item in result.scores:
+            skill = by_name.get(item.skill.strip().lower())
+            if skill:
+                scored[skill] = (skill, max(0, min(item.score, 10)), item.reasoning)
+        return scored
+
+    def plan_skill_calls(self, prefix, batch_prefix, skills, budget):
+        """Split skills into per-skill calls, one batched call and model-free scoring to fit the budget
+
+        Per-skill calls are kept for as many skills as possible; the rest are
+        batched if one more call fits, and scored without the model if not.
+        Also returns the limit that forced the split, or None.
+        """
+        if not skills:
+            return [], [], [], None
+        suffix = MESSAGE_OVERHEAD_TOKENS + max(estimate_tokens(f"Skill: {skill}") for skill in skills)
+        per_skill = estimate_tokens(prefix) + suffix + COMPLETION_TOKENS["skill_scoring"]
+        budget.plan(len(skills), len(skills) * per_skill)
+        reason = budget.short_of(len(skills), len(skills) * per_skill)
+        if reason is None:
+            return skills, [], [], None
+
+        batch_base = estimate_tokens(batch_prefix) + MESSAGE_OVERHEAD_TOKENS
+        for split in range(len(skills) - 1, -1, -1):
+            rest = skills[split:]
+            batch_tokens = batch_base + estimate_tokens("\n".join(rest)) + BATCHED_COMPLETION_TOKENS_PER_SKILL * len(rest)
+            if budget.can_afford(split + 1, split * per_skill + batch_tokens):
+                return skills[:split], rest, [], reason
+
+        split = len(skills)
+        while split and not budget.can_afford(split, split * per_skill):
+            split -= 1
+        return skills[:split], [], skills[split:], reason
+
+    def vector_skill_scores(self, resume_text, skills):
+        """Score skills against resume chunk embeddings: {skill: (score, similarity, uncertain)}"""
+        if resume_text == self.resume_text:
+            vectorstore = self.get_rag_vectorstore()
+        else:
+            vectorstore = self.create_rag_vector_store(resume_text)
+        index = vectorstore.index
+        return self.skill_scorer.score(skills, index.reconstruct_n(0, index.ntotal))
+
+    def analyze_resume_weaknesses(self, deadline=None, budget=None):
         """Analyze specific weaknesses in the resume based on missing skills"""
         if not self.resume_text or not self.extracted_skills or not self.analysis_result:
             return []
         
+        from langchain_core.messages import HumanMessage
+
         weaknesses = []
+        prefix = self.prompt_prefix(WEAKNESS_INSTRUCTIONS, self.resume_text, resume_chars=3000)
+        budget = budget or self.new_budget()
+        deadline = deadline or budget.deadline
+        missing_skills = self.analysis_result.get("missing_skills", [])
+        per_skill = estimate_tokens(prefix) + MESSAGE_OVERHEAD_TOKENS + COMPLETION_TOKENS["weakness_analysis"]
+        budget.plan(len(missing_skills), len(missing_skills) * per_skill)
+        skipped = {}
         
-        for skill in self.analysis_result.get("missing_skills", []):
+        for skill in missing_skills:
+            remaining = deadline - time.monotonic() if deadline else None
+            reason = "seconds" if remaining is not None and remaining <= 1 else budget.short_of(1, per_skill)
+            if reason:
+                # Out of time or budget: keep what we have and say which skills were skipped
+                skipped.setdefault(reason, []).append(skill)
+                self.analysis_result.setdefault("weaknesses_skipped", []).append(skill)
+                self.analysis_result["degraded"] = True
+                continue
 
-            llm = ChatOpenAI(model="gpt-4o", api_key=self.api_key)
-            prompt = f"""
-            Analyze why the resume is weak in demonstrating proficiency in "{skill}".
-            
-            For your analysis, consider:
-            1. What's missing from the resume regarding this skill?
-            2. How could it be improved with specific examples?
-            3. What specific action items would make this skill stand out?
-            
-            Resume Content:
-            {self.resume_text[:3000]}...
-            
-            Provide your response in this JSON format:
-            {{
-                "weakness": "A concise description of what's missing or problematic (1-2 sentences)",
-                "improvement_suggestions": [
-                    "Specific suggestion 1",
-                    "Specific suggestion 2",
-                    "Specific suggestion 3"
-                ],
-                "example_addition": "A specific bullet point that could be added to showcase this skill"
-            }}
-            
-            Return only valid JSON, no other text.
-            """
-            
-            response = llm.invoke(prompt)
-            weakness_content = response.content.strip()
-            
-    
+            messages = prefix + [HumanMessage(content=f'Skill: "{skill}"')]
             try:
-                weakness_data = json.loads(weakness_content)
-                
-                weakness_detail = {
-                    "skill": skill,
-                    "score": self.analysis_result.get("skill_scores", {}).get(skill, 0),
-                    "detail": weakness_data.get("weakness", "No specific details provided."),
-                    "suggestions": weakness_data.get("improvement_suggestions", []),
-                    "example": weakness_data.get("example_addition", "")
-                }
-                
-                weaknesses.append(weakness_detail)
+                weakness_data = self.router.invoke_structured(
+                    "weakness_analysis", messages, "weakness", timeout=remaining, budget=budget
+                )
+            except BudgetExceededError as e:
+                skipped.setdefault(e.limit, []).append(skill)
+                self.analysis_result.setdefault("weaknesses_skipped", []).append(skill)
+                self.analysis_result["degraded"] = True
+                continue
+            except Exception as e:
+                print(f"Error analyzing weakness in {skill}: {e}")
+                self.analysis_result.setdefault("weaknesses_skipped", []).append(skill)
+                self.analysis_result["degraded"] = True
+                continue
 
-                self.improvement_suggestions[skill] = {
-                    "suggestions": weakness_data.get("improvement_suggestions", []),
-                    "example": weakness_data.get("example_addition", "")
-                }
-            except json.JSONDecodeError:
-             
+            if weakness_data is None:
                 weaknesses.append({
                     "skill": skill,
                     "score": self.analysis_result.get("skill_scores", {}).get(skill, 0),
-                    "detail": weakness_content[:200]  # Truncate if it's not proper JSON
+                    "detail": "No specific details provided."
                 })
-            
+                continue
+
+            weaknesses.append({
+                "skill": skill,
+                "score": self.analysis_result.get("skill_scores", {}).get(skill, 0),
+                "detail": weakness_data.weakness or "No specific details provided.",
+                "suggestions": weakness_data.improvement_suggestions,
+                "example": weakness_data.example_addition
+            })
+
+            self.improvement_suggestions[skill] = {
+                "suggestions": weakness_data.improvement_suggestions,
+                "example": weakness_data.example_addition
+            }
+
+        for reason, skills in skipped.items():
+            budget.degrade("weaknesses_skipped", skills, reason)
+        self.analysis_result["budget"] = budget.summary()
         self.resume_weaknesses = weaknesses
         return weaknesses
 
-    def extract_skills_from_jd(self, jd_text):
+    def extract_skills_from_jd(self, jd_text, budget=None):
         """Extract skills from a job description"""
         try:
-            llm = ChatOpenAI(model="gpt-4o", api_key=self.api_key)
             prompt = f"""
             Extract a comprehensive list of technical skills, technologies, and competencies required from this job description. 
-            Format the output as a Python list of strings. Only include the list, nothing else.
+            Return a JSON object with a "skills" array of strings.
             
             Job Description:
             {jd_text}
             """
             
-            response = llm.invoke(prompt)
-            skills_text = response.content
-            
-      
-            match = re.search(r'\[(.*?)\]', skills_text, re.DOTALL)
-            if match:
-                skills_text = match.group(0)
-            
-
-            try:
-                skills_list = eval(skills_text)
-                if isinstance(skills_list, list):
-                    return skills_list
-            except:
-                pass
-            
-         
-            skills = []
-            for line in skills_text.split('\n'):
-                line = line.strip()
-                if line.startswith('- ') or line.startswith('* '):
-                    skill = line[2:].strip()
-                    if skill:
-                        skills.append(skill)
-                elif line.startswith('"') and line.endswith('"'):
-                    skill = line.strip('"')
-                    if skill:
-                        skills.append(skill)
+            if budget:
+                budget.plan(1, estimate_tokens(prompt) + COMPLETION_TOKENS["jd_extraction"])
+            result = self.router.invoke_structured("jd_extraction", prompt, "skill_list", budget=budget)
+            if result is None:
+                return []
             
-            return skills
+            return [skill for skill in dict.fromkeys(result.skills) if skill]
         except Exception as e:
             print(f"Error extracting skills from job description: {e}")
             return []
 
-    def semantic_skill_analysis(self, resume_text, skills):
+    def semantic_skill_analysis(self, resume_text, skills, deadline=None, budget=None):
         """Analyze skills semantically"""
-        vectorstore = self.create_vector_store(resume_text)
-        retriever = vectorstore.as_retriever()
-        qa_chain = RetrievalQA.from_chain_type(
-            llm=ChatOpenAI(model="gpt-4o", api_key=self.api_key),
-            retriever=retriever,
-            return_source_documents=False
-        )
+        started = time.monotonic()
+        prefix = self.prompt_prefix(SKILL_SCORING_INSTRUCTIONS, resume_text)
+        budget = budget or self.new_budget()
+        deadline = deadline or budget.deadline or started + self.analysis_deadline
 
         skill_scores = {}
         skill_reasoning = {}
         missing_skills = []
         total_score = 0
 
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            results = list(executor.map(lambda skill: self.analyze_skill(qa_chain, skill), skills))
+        # A near-duplicate of an earlier resume keeps its scores for skills its edits did not touch
+        scored = {}
+        scope = hashlib.sha256(
+            f"{self.history_owner}\n{self.scoring_mode}\n{self.jd_text or ''}".encode("utf-8")
+        ).hexdigest()
+        duplicate = duplicate_index().query(resume_text, scope=scope)
+        duplicate_of = None
+        carried = {}
+        if duplicate:
+            duplicate_of, _, prior = duplicate
+            rescore = set(skills_to_rescore(skills, prior["sections"], prior["mentioned"], resume_text))
+            carried = {skill: score for skill, score in prior["scores"].items() if skill not in rescore}
+            scored.update((skill, carried[skill]) for skill in skills if skill in carried)
+            metrics.incr("dedup.skill_calls_saved", len(scored))
+        reused_skills = list(scored)
+        remaining = [skill for skill in skills if skill not in scored]
+
+        # In vector mode only skills in the uncertain similarity band go to the LLM
+        vector_scores = {}
+        llm_skills = remaining
+        if self.scoring_mode == "vector":
+            try:
+                vector_scores = self.vector_skill_scores(resume_text, remaining) if remaining else {}
+                llm_skills = [skill for skill in remaining if vector_scores[skill][2]]
+                for skill, (score, similarity, uncertain) in vector_scores.items():
+                    if not uncertain:
+                        scored[skill] = (skill, score, f"Scored by embedding similarity ({similarity:.2f}) to the closest resume section.")
+                metrics.incr("analysis.vector_scored", len(remaining) - len(llm_skills))
+                metrics.incr("analysis.vector_escalated", len(llm_skills))
+            except Exception as e:
+                print(f"Error in vector skill scoring, using the LLM for all skills: {e}")
+
+        # Over budget, the remaining skills share one batched call, then go without the model
+        batch_prefix = self.prompt_prefix(BATCH_SKILL_SCORING_INSTRUCTIONS, resume_text)
+        individual, batched, over_budget, reason = self.plan_skill_calls(prefix, batch_prefix, llm_skills, budget)
+        budget.degrade("batched_scoring", batched, reason)
+
+        # Collect results as they finish so one slow response cannot hold up the rest past the deadline
+        executor = ThreadPoolExecutor(max_workers=5)
+        futures = {executor.submit(self.analyze_skill, prefix, skill, budget): skill for skill in individual}
+        if batched:
+            timeout = max(1, deadline - time.monotonic())
+            futures[executor.submit(self.score_skills_batched, batch_prefix, batched, budget, timeout)] = "(batched)"
+        try:
+            for future in as_completed(futures, timeout=max(0, deadline - time.monotonic())):
+                try:
+                    if futures[future] == "(batched)":
+                        scored.update(future.result())
+                    else:
+                        scored[futures[future]] = future.result()
+                except BudgetExceededError as e:
+                    # Fallbacks and hedges spent what the plan set aside for this call
+                    over_budget.extend(batched if futures[future] == "(batched)" else [futures[future]])
+                    reason = reason or e.limit
+                except Exception as e:
+                    print(f"Error analyzing skill {futures[future]}: {e}")
+        except FuturesTimeoutError:
+            metrics.incr("analysis.deadline_reached")
+            budget.degrade("out_of_time", [skill for skill in skills if skill not in scored and skill not in over_budget], "seconds")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        budget.degrade("vector_scoring", [skill for skill in over_budget if skill in vector_scores], reason)
+        budget.degrade("lexical_scoring", [skill for skill in over_budget if skill not in vector_scores], reason)
+        degraded_skills = [skill for skill in skills if skill not in scored]
+        for skill in degraded_skills:
+            metrics.incr("analysis.degraded_skills")
+            why = "to stay within the analysis budget" if skill in over_budget else "because the model call failed or ran out of time"
+            if skill in vector_scores:
+                scored[skill] = (skill, vector_scores[skill][0], f"Scored by embedding similarity {why}.")
+            else:
+                scored[skill] = (skill, lexical_skill_score(resume_text, skill), f"Scored by keyword match {why}.")
+        results = [scored[skill] for skill in skills]
+
+        # Degraded fallbacks are not worth reusing; they get a real score next time
+        fresh = {**carried, **{skill: scored[skill] for skill in skills if skill not in degraded_skills}}
+        duplicate_index().add(
+            hashlib.sha256(resume_text.encode("utf-8")).hexdigest()[:16] + scope[:16],
+            resume_text,
+            {"sections": section_digests(resume_text), "mentioned": mentioned_skills(fresh, resume_text), "scores": fresh},
+            scope=scope
+        )
 
         for skill, score, reasoning in results:
             skill_scores[skill] = score
@@ -259,71 +582,268 @@ class ResumeAnalysisAgent:
             "reasoning": reasoning,
             "missing_skills": missing_skills,
             "strengths": strengths,
-            "improvement_areas": improvement_areas
+            "improvement_areas": improvement_areas,
+            "degraded": bool(degraded_skills or budget.degradations),
+            "degraded_skills": degraded_skills,
+            "duplicate_of": duplicate_of,
+            "reused_skills": reused_skills,
+            "scoring_seconds": round(time.monotonic() - started, 3),
+            "budget": budget.summary()
         }
 
-    def analyze_resume(self, resume_file, role_requirements=None, custom_jd=None):
+    @profiled("analyze_resume")
+    def analyze_resume(self, resume_file, role_requirements=None, custom_jd=None, role=""):
         """Analyze a resume against role requirements or a custom JD"""
+        budget = self.new_budget()
+        deadline = budget.deadline
+        self.budget = None
         self.resume_text = self.extract_text_from_file(resume_file)
-        
-       
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.txt', mode='w', encoding='utf-8') as tmp:
-            tmp.write(self.resume_text)
-            self.resume_file_path = tmp.name
-     
+        self.analysis_id = None
+
+        self.jd_text = None
+        if custom_jd:
+            self.jd_text = self.extract_text_from_file(custom_jd)
+
+        # The same resume against the same JD or role was analyzed before
+        if self.history:
+            analysis_id = self.history.find_analysis(
+                self.resume_text, role_requirements or [], self.jd_text,
+                scoring_mode=self.scoring_mode, owner=self.history_owner
+            )
+            if analysis_id is not None:
+                return self.load_analysis(analysis_id)
+
         self.rag_vectorstore = self.create_rag_vector_store(self.resume_text)
         
    
         if custom_jd:
-            self.jd_text = self.extract_text_from_file(custom_jd)
-            self.extracted_skills = self.extract_skills_from_jd(self.jd_text)
+            self.extracted_skills = self.extract_skills_from_jd(self.jd_text, budget)
             
         
-            self.analysis_result = self.semantic_skill_analysis(self.resume_text, self.extracted_skills)
+            self.analysis_result = self.semantic_skill_analysis(self.resume_text, self.extracted_skills, deadline, budget)
     
         elif role_requirements:
             self.extracted_skills = role_requirements
             
  
-            self.analysis_result = self.semantic_skill_analysis(self.resume_text, role_requirements)
+            self.analysis_result = self.semantic_skill_analysis(self.resume_text, role_requirements, deadline, budget)
             
     
         if self.analysis_result and "missing_skills" in self.analysis_result and self.analysis_result["missing_skills"]:
-            self.analyze_resume_weaknesses()
+            self.analyze_resume_weaknesses(deadline, budget)
      
             self.analysis_result["detailed_weaknesses"] = self.resume_weaknesses
+
+        self.budget = budget
+        if self.history and self.analysis_result:
+            try:
+                self.analysis_id = self.history.save_analysis(
+                    self.resume_text, self.extracted_skills, self.analysis_result, role=role, jd_text=self.jd_text,
+                    scoring_mode=self.scoring_mode, owner=self.history_owner
+                )
+            except Exception as e:
+                print(f"Error saving analysis: {e}")
         
         return self.analysis_result
 
-    def ask_question(self, question):
-        """Ask a question about the resume"""
-        if not self.rag_vectorstore or not self.resume_text:
-            return "Please analyze a resume first."
-        
-        retriever = self.rag_vectorstore.as_retriever(
-            search_kwargs={"k": 3}  
-        )
-        
-        qa_chain = RetrievalQA.from_chain_type(
-            llm=ChatOpenAI(model="gpt-4o", api_key=self.api_key),
-            chain_type="stuff",  
-            retriever=retriever,
+    def load_analysis(self, analysis_id):
+        """Load a stored analysis from the history into the agent"""
+        stored = self.history.load_analysis(analysis_id, owner=self.history_owner)
+        if stored is None:
+            return None
+        resume_text, skills, analysis_result, jd_text = stored
+        self.jd_text = jd_text
+        self.restore_analysis(resume_text, skills, analysis_result)
+        self.analysis_id = analysis_id
+        return analysis_result
+
+    def stored_artifact(self, kind, params):
+        """Output generated earlier for the current analysis, or None"""
+        if not self.history or self.analysis_id is None:
+            return None
+        try:
+            return self.history.load_artifact(self.analysis_id, kind, params)
+        except Exception as e:
+            print(f"Error loading {kind}: {e}")
+            return None
+
+    def artifact_scope(self):
+        """The analysis and resume a generation starts from, to hand to store_artifact"""
+        return self.analysis_id, self.resume_text
+
+    def store_artifact(self, kind, params, content, scope=None):
+        """Keep generated output with the analysis it was generated from
+
+        scope is artifact_scope() from when generation started. A generation that
+        outlived its analysis (a prefetch still running when another resume was
+        analyzed) may have read from both, so its output is dropped rather than
+        filed under either.
+        """
+        scope = scope or self.artifact_scope()
+        analysis_id = scope[0]
+        if not self.history or analysis_id is None:
+            return
+        if scope != self.artifact_scope():
+            metrics.incr("history.stale_artifacts")
+            return
+        try:
+            self.history.save_artifact(analysis_id, kind, params, content)
+        except Exception as e:
+            print(f"Error saving {kind}: {e}")
+
+    def restore_analysis(self, resume_text, skills, analysis_result, jd_text=None):
+        """Load a previously computed analysis into the agent without recomputing it"""
+        self.resume_text = resume_text
+        self.extracted_skills = skills
+        self.analysis_result = analysis_result
+        if jd_text is not None:
+            self.jd_text = jd_text
+        self.resume_strengths = analysis_result.get("strengths", [])
+        self.resume_weaknesses = analysis_result.get("detailed_weaknesses", [])
+        # Rebuilt on first use, from the embedding cache
+        self.rag_vectorstore = None
+        self.budget = None
+        return analysis_result
+
+    def qa_chain(self):
+        """Return the Q&A chain for the current resume, building it once per vector store"""
+        from langchain.chains import RetrievalQA
+
+        vectorstore = self.get_rag_vectorstore()
+        router = self.router
+        if self._qa_chain is not None and self._qa_chain[:2] == (vectorstore, router):
+            return self._qa_chain[2]
+
+        chunks = [
+            vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]).page_content
+            for i in range(vectorstore.index.ntotal)
+        ]
+        chain = RetrievalQA.from_chain_type(
+            llm=router.llm("qa"),
+            chain_type="stuff",
+            retriever=hybrid_retriever(vectorstore, chunks, k=3),
             return_source_documents=False,
         )
-        
-        response = qa_chain.run(question)
-        return response
+        metrics.incr("qa.chain_builds")
+        self._qa_chain = (vectorstore, router, chain)
+        return chain
 
-    def generate_interview_questions(self, question_types, difficulty, num_questions):
-        """Generate interview questions based on the resume"""
+    def answer_cache(self):
+        """Return the answer cache for the current resume, starting a fresh one when the resume changes"""
+        resume_hash = hashlib.sha256(f"{self.api_key}\n{self.resume_text}".encode("utf-8")).hexdigest()
+        cache = self._answer_cache
+        if cache is None or cache.resume_hash != resume_hash:
+            embeddings = self.create_embeddings()
+            cache = AnswerCache(
+                embeddings, resume_hash, model=embeddings.underlying_embeddings.model, vocabulary=self.extracted_skills or ()
+            )
+            self._answer_cache = cache
+        return cache
+
+    @profiled("ask_question")
+    def ask_question(self, question):
+        """Ask a question about the resume"""
+        return "".join(self.stream_answer(question))
+
+    @profiled("stream_answer")
+    def stream_answer(self, question):
+        """Yield the answer to a question about the resume as it is generated"""
+        if not self.resume_text:
+            yield "Please analyze a resume first."
+            return
+
+        cache, vector = None, None
+        try:
+            cache = self.answer_cache()
+            answer, vector = cache.lookup(question)
+            if answer is not None:
+                yield answer
+                return
+        except Exception as e:
+            print(f"Error checking the answer cache: {e}")
+
+        # Same retriever and prompt as the chain, but with the model's tokens passed through as they arrive
+        chain = self.qa_chain()
+        docs = chain.retriever.get_relevant_documents(question)
+        prompt = chain.combine_documents_chain.llm_chain.prompt.format_prompt(
+            context="\n\n".join(doc.page_content for doc in docs), question=question
+        ).to_messages()
+        chunks = []
+        for chunk in self.router.stream("qa", prompt):
+            chunks.append(chunk)
+            yield chunk
+
+        if cache is not None:
+            try:
+                cache.store(question, "".join(chunks), vector)
+            except Exception as e:
+                print(f"Error caching answer: {e}")
+
+    @profiled("generate_interview_questions")
+    def generate_interview_questions(self, question_types, difficulty, num_questions, regenerate=False):
+        """Generate interview questions based on the resume; regenerate replaces any saved set"""
         if not self.resume_text or not self.extracted_skills:
             return []
+
+        params = [question_types, difficulty, num_questions]
+        scope = self.artifact_scope()
+        stored = None if regenerate else self.stored_artifact("interview_questions", params)
+        if stored is not None:
+            return [tuple(question) for question in stored]
         
         try:
-            llm = ChatOpenAI(model="gpt-4o", api_key=self.api_key)
+            questions = []
+            if self.question_bank:
+                questions = self.bank_interview_questions(question_types, difficulty, num_questions)
+            if len(questions) < num_questions:
+                questions += self.fresh_interview_questions(
+                    question_types, difficulty, num_questions - len(questions), avoid=[question for _, question in questions]
+                )
+
+            questions = questions[:num_questions]
+            if questions:
+                self.store_artifact("interview_questions", params, questions, scope)
             
+            return questions
         
-            context = f"""
+        except Exception as e:
+            print(f"Error generating interview questions: {e}")
+            return []
+
+    def bank_interview_questions(self, question_types, difficulty, num_questions):
+        """Assemble questions from the shared bank and tailor them with one short call"""
+        picked = self.question_bank.pick(self.extracted_skills, question_types, difficulty, num_questions)
+        if not picked:
+            return []
+
+        numbered = "\n".join(f"{i + 1}. [{question_type}, {skill}] {question}" for i, (question_type, skill, question) in enumerate(picked))
+        prompt = f"""
+        Lightly tailor each of these interview questions to the candidate below. Keep each question's
+        type, skill, difficulty and intent; only add references to the candidate's background where natural.
+
+        Strengths: {', '.join(self.analysis_result.get('strengths', []))}
+        Areas for improvement: {', '.join(self.analysis_result.get('missing_skills', []))}
+        Resume excerpt:
+        {self.resume_text[:800]}
+
+        Questions:
+        {numbered}
+
+        Return a JSON object with a "questions" array holding the {len(picked)} tailored questions in the same order.
+        """
+        try:
+            result = self.router.invoke_structured("interview_personalization", prompt, "personalized_questions")
+        except Exception as e:
+            print(f"Error personalizing interview questions: {e}")
+            result = None
+        if result is None or len(result.questions) != len(picked):
+            metrics.incr("question_bank.unpersonalized")
+            return [(question_type, question) for question_type, _, question in picked]
+        return [(question_type, tailored) for (question_type, _, _), tailored in zip(picked, result.questions)]
+
+    def fresh_interview_questions(self, question_types, difficulty, num_questions, avoid=()):
+        """Generate questions with the full prompt and file their generic forms in the bank"""
+        context = f"""
             Resume Content:
             {self.resume_text[:2000]}...
             
@@ -334,7 +854,7 @@ class ResumeAnalysisAgent:
             Areas for improvement: {', '.join(self.analysis_result.get('missing_skills', []))}
             """
             
-            prompt = f"""
+        prompt = f"""
             Generate {num_questions} personalized {difficulty.lower()} level interview questions for this candidate 
             based on their resume and skills. Include only the following question types: {', '.join(question_types)}.
             
@@ -344,61 +864,57 @@ class ResumeAnalysisAgent:
             3. For coding questions, include a clear problem statement
             
             {context}
+            {"Do not repeat these questions, already chosen:" + chr(10) + chr(10).join(avoid) if avoid else ""}
             
-            Format the response as a list of tuples with the question type and the question itself.
-            Each tuple should be in the format: ("Question Type", "Full Question Text")
+            Return a JSON object with a "questions" array. Each item has "type" (one of: {', '.join(question_types)}),
+            "skill" (the one skill from the focus list it tests), "question" (the full question text) and
+            "generic_question" (the same question with every candidate-specific detail removed).
             """
             
-            response = llm.invoke(prompt)
-            questions_text = response.content
-            
-      
-            questions = []
-            pattern = r'[("]([^"]+)[",)\s]+[(",\s]+([^"]+)[")\s]+'
-            matches = re.findall(pattern, questions_text, re.DOTALL)
-            
-            for match in matches:
-                if len(match) >= 2:
-                    question_type = match[0].strip()
-                    question = match[1].strip()
-                    
-     
-                    for requested_type in question_types:
-                        if requested_type.lower() in question_type.lower():
-                            questions.append((requested_type, question))
-                            break
+        result = self.router.invoke_structured("interview_questions", prompt, "interview_questions")
+        if result is None:
+            return []
             
+        questions = []
+        bankable = []
+        for item in result.questions:
+            for requested_type in question_types:
+                if requested_type.lower() in item.type.lower():
+                    questions.append((requested_type, item.question))
+                    if item.skill in self.extracted_skills and item.generic_question:
+                        bankable.append((item.skill, requested_type, item.generic_question))
+                    break
 
-            if not questions:
-                lines = questions_text.split('\n')
-                current_type = None
-                current_question = ""
-                
-                for line in lines:
-                    line = line.strip()
-                    if any(t.lower() in line.lower() for t in question_types) and not current_question:
-                        current_type = next((t for t in question_types if t.lower() in line.lower()), None)
-                        if ":" in line:
-                            current_question = line.split(":", 1)[1].strip()
-                    elif current_type and line:
-                        current_question += " " + line
-                    elif current_type and current_question:
-                        questions.append((current_type, current_question))
-                        current_type = None
-                        current_question = ""
+        if self.question_bank and bankable:
+            try:
+                embeddings = self.create_embeddings()
+                vectors = embeddings.embed_documents([question for _, _, question in bankable])
+                for (skill, question_type, question), vector in zip(bankable, vectors):
+                    self.question_bank.add(
+                        skill, question_type, difficulty, question, vector, embeddings.underlying_embeddings.model
+                    )
+            except Exception as e:
+                print(f"Error filing questions in the question bank: {e}")
 
-            questions = questions[:num_questions]
-            
-            return questions
-        
-        except Exception as e:
-            print(f"Error generating interview questions: {e}")
-            return []
+        return questions
 
-    def improve_resume(self, improvement_areas, target_role=""):
+    @profiled("improve_resume")
+    def improve_resume(self, improvement_areas, target_role="", regenerate=False):
         """Generate suggestions to improve the resume"""
+        return dict(self.stream_improvements(improvement_areas, target_role, regenerate))
+
+    @profiled("stream_improvements")
+    def stream_improvements(self, improvement_areas, target_role="", regenerate=False):
+        """Yield (area, suggestions) pairs as each improvement area is ready; regenerate replaces any saved set"""
         if not self.resume_text:
-            return {}
+            return
+
+        params = [improvement_areas, target_role]
+        scope = self.artifact_scope()
+        stored = None if regenerate else self.stored_artifact("improvements", params)
+        if stored is not None:
+            yield from stored.items()
+            return
         
         try:
            
@@ -442,12 +958,11 @@ class ResumeAnalysisAgent:
                         skill_improvements["before_after"] = before_after_examples
                     
                     improvements["Skills Highlighting"] = skill_improvements
+                    yield "Skills Highlighting", skill_improvements
  
             remaining_areas = [area for area in improvement_areas if area not in improvements]
             
             if remaining_areas:
-                llm = ChatOpenAI(model="gpt-4o", api_key=self.api_key)
-                
                 # Create a context with resume analysis and weaknesses
                 weaknesses_text = ""
                 if self.resume_weaknesses:
@@ -483,186 +998,244 @@ class ResumeAnalysisAgent:
                 2. 3-5 specific actionable suggestions
                 3. Where relevant, provide a before/after example
                 
-                Format the response as a JSON object with improvement areas as keys, each containing:
+                Return a JSON object with an "improvements" array containing one item per improvement area, each with:
+                - "area": the improvement area name, exactly as listed above
                 - "description": general description
                 - "specific": list of specific suggestions
-                - "before_after": (where applicable) a dict with "before" and "after" examples
+                - "before_after": an object with "before" and "after" examples, or null if not applicable
                 
                 Only include the requested improvement areas that aren't already covered.
                 Focus particularly on addressing the resume weaknesses identified.
                 """
                 
-                response = llm.invoke(prompt)
-                
-                # Try to parse JSON from the response
-                ai_improvements = {}
-                
-                # Extract from markdown code blocks if present
-                json_match = re.search(r'```(?:json)?\s*([\s\S]+?)\s*```', response.content)
-                if json_match:
-                    try:
-                        ai_improvements = json.loads(json_match.group(1))
-                        # Merge with existing improvements
-                        improvements.update(ai_improvements)
-                    except json.JSONDecodeError:
-                        pass
-                
-                # If JSON parsing failed, create structured output manually
-                if not ai_improvements:
-                    sections = response.content.split("##")
-                    
-                    for section in sections:
-                        if not section.strip():
-                            continue
-                            
-                        lines = section.strip().split("\n")
-                        area = None
-                        
-                        for line in lines:
-                            if not area and line.strip():
-                                area = line.strip()
-                                improvements[area] = {
-                                    "description": "",
-                                    "specific": []
-                                }
-                            elif area and "specific" in improvements[area]:
-                                if line.strip().startswith("- "):
-                                    improvements[area]["specific"].append(line.strip()[2:])
-                                elif not improvements[area]["description"]:
-                                    improvements[area]["description"] += line.strip()
+                for item in self.router.stream_structured("improvements", prompt, "improvements"):
+                    if item.area in improvements:
+                        continue
+                    improvements[item.area] = {
+                        "description": item.description,
+                        "specific": item.specific
+                    }
+                    if item.before_after:
+                        improvements[item.area]["before_after"] = item.before_after
+                    yield item.area, improvements[item.area]
             
-            # Ensure all requested areas are included
+            # Ensure all requested areas are included; placeholders are not worth keeping
+            complete = all(area in improvements for area in improvement_areas)
             for area in improvement_areas:
                 if area not in improvements:
                     improvements[area] = {
                         "description": f"Improvements needed in {area}",
                         "specific": ["Review and enhance this section"]
                     }
-            
-            return improvements
+                    yield area, improvements[area]
+            if complete:
+                self.store_artifact("improvements", params, improvements, scope)
         
         except Exception as e:
             print(f"Error generating resume improvements: {e}")
-            return {area: {"description": "Error generating suggestions", "specific": []} for area in improvement_areas}
+            for area in improvement_areas:
+                if area not in improvements:
+                    yield area, {"description": "Error generating suggestions", "specific": []}
 
-    def get_improved_resume(self, target_role="", highlight_skills=""):
+    @profiled("get_improved_resume")
+    def get_improved_resume(self, target_role="", highlight_skills="", regenerate=False):
         """Generate an improved version of the resume optimized for the job description"""
-        if not self.resume_text:
-            return "Please upload and analyze a resume first."
-        
         try:
-            # Parse highlight skills if provided
-            skills_to_highlight = []
-            if highlight_skills:
-
-                if len(highlight_skills) > 100: 
-                    self.jd_text = highlight_skills
-                    try:
-                        parsed_skills = self.extract_skills_from_jd(highlight_skills)
-                        if parsed_skills:
-                            skills_to_highlight = parsed_skills
-                        else:
-                 
-                            skills_to_highlight = [s.strip() for s in highlight_skills.split(",") if s.strip()]
-                    except:
-      
+            return "".join(self.stream_improved_resume(target_role, highlight_skills, regenerate)).strip()
+        
+        except Exception as e:
+            print(f"Error generating improved resume: {e}")
+            return "Error generating improved resume. Please try again."
+
+    def highlight_skill_list(self, highlight_skills):
+        """Skills to highlight in the rewrite, from the user's list or JD, else from the analysis"""
+        # Parse highlight skills if provided
+        skills_to_highlight = []
+        if highlight_skills:
+
+            if len(highlight_skills) > 100: 
+                self.jd_text = highlight_skills
+                try:
+                    parsed_skills = self.extract_skills_from_jd(highlight_skills, self.budget or self.new_budget())
+                    if parsed_skills:
+                        skills_to_highlight = parsed_skills
+                    else:
+             
                         skills_to_highlight = [s.strip() for s in highlight_skills.split(",") if s.strip()]
-                else:
+                except:
+  
                     skills_to_highlight = [s.strip() for s in highlight_skills.split(",") if s.strip()]
-        
-            if not skills_to_highlight and self.analysis_result:
+            else:
+                skills_to_highlight = [s.strip() for s in highlight_skills.split(",") if s.strip()]
+    
+        if not skills_to_highlight and self.analysis_result:
 
-                skills_to_highlight = self.analysis_result.get('missing_skills', [])
+            skills_to_highlight = list(self.analysis_result.get('missing_skills', []))
   
+            skills_to_highlight.extend([
+                skill for skill in self.analysis_result.get('strengths', [])
+                if skill not in skills_to_highlight
+            ])
+
+            if self.extracted_skills:
                 skills_to_highlight.extend([
-                    skill for skill in self.analysis_result.get('strengths', [])
+                    skill for skill in self.extracted_skills 
                     if skill not in skills_to_highlight
                 ])
+        return skills_to_highlight
 
-                if self.extracted_skills:
-                    skills_to_highlight.extend([
-                        skill for skill in self.extracted_skills 
-                        if skill not in skills_to_highlight
-                    ])
-            
+    @profiled("stream_improved_resume")
+    def stream_improved_resume(self, target_role="", highlight_skills="", regenerate=False):
+        """Yield the improved resume as it is written
 
-            weakness_context = ""
-            improvement_examples = ""
-            
-            if self.resume_weaknesses:
-                weakness_context = "Address these specific weaknesses:\n"
-                
-                for weakness in self.resume_weaknesses:
-                    skill_name = weakness.get('skill', '')
-                    weakness_context += f"- {skill_name}: {weakness.get('detail', '')}\n"
-                    
-           
-                    if 'suggestions' in weakness and weakness['suggestions']:
-                        weakness_context += "  Suggested improvements:\n"
-                        for suggestion in weakness['suggestions']:
-                            weakness_context += f"  * {suggestion}\n"
-    
-                    if 'example' in weakness and weakness['example']:
-                        improvement_examples += f"For {skill_name}: {weakness['example']}\n\n"
-            
-    
-            llm = ChatOpenAI(model="gpt-4o", temperature=0.7, api_key=self.api_key)
-            
-     
-            jd_context = ""
-            if self.jd_text:
-                jd_context = f"Job Description:\n{self.jd_text}\n\n"
-            elif target_role:
-                jd_context = f"Target Role: {target_role}\n\n"
-            
-            prompt = f"""
-            Rewrite and improve this resume to make it highly optimized for the target job.
-            
-            {jd_context}
-            Original Resume:
-            {self.resume_text}
-            
-            Skills to highlight (in order of priority): {', '.join(skills_to_highlight)}
-            
-            {weakness_context}
-            
-            Here are specific examples of content to add:
-            {improvement_examples}
-            
-            Please improve the resume by:
-            1. Adding strong, quantifiable achievements
-            2. Highlighting the specified skills strategically for ATS scanning
-            3. Addressing all the weakness areas identified with the specific suggestions provided
-            4. Incorporating the example improvements provided above
-            5. Structuring information in a clear, professional format
-            6. Using industry-standard terminology
-            7. Ensuring all relevant experience is properly emphasized
-            8. Adding measurable outcomes and achievements
-            
-            Return only the improved resume text without any additional explanations.
-            Format the resume in a modern, clean style with clear section headings.
-            """
-            
-            response = llm.invoke(prompt)
-            improved_resume = response.content.strip()
-       
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.txt', mode='w', encoding='utf-8') as tmp:
-                tmp.write(improved_resume)
-                self.improved_resume_path = tmp.name
-            
-            return improved_resume
-        
+        Every section is rewritten concurrently; the first one that needs the
+        model streams token by token, and the rest follow in order as they finish.
+        With regenerate, saved and cached rewrites are ignored and replaced.
+        """
+        if not self.resume_text:
+            yield "Please upload and analyze a resume first."
+            return
+
+        params = [target_role, highlight_skills]
+        scope = self.artifact_scope()
+        stored = None if regenerate else self.stored_artifact("improved_resume", params)
+        if stored is not None:
+            yield stored
+            return
+
+        skills_to_highlight = self.highlight_skill_list(highlight_skills)
+        jd_context = ""
+        if self.jd_text:
+            jd_context = f"Job Description:\n{self.jd_text}\n\n"
+        elif target_role:
+            jd_context = f"Target Role: {target_role}\n\n"
+
+        jd_digest = hashlib.sha256(jd_context.encode("utf-8")).hexdigest()
+        requests = [
+            self.section_request(heading, text, skills_to_highlight, jd_context, jd_digest, regenerate)
+            for heading, text in split_resume_sections(self.resume_text)
+        ]
+        pending = [i for i, request in enumerate(requests) if request["cached"] is None and request["messages"]]
+        streamed = pending[0] if pending else None
+
+        parts = []
+        complete = True
+        executor = ThreadPoolExecutor(max_workers=min(8, max(1, len(pending))))
+        futures = {i: executor.submit(self.rewrite_section, requests[i]) for i in pending[1:]}
+        try:
+            for i, request in enumerate(requests):
+                if i:
+                    parts.append("\n\n")
+                    yield "\n\n"
+                if i == streamed:
+                    chunks = []
+                    for chunk in self.stream_section(request):
+                        chunks.append(chunk)
+                        yield chunk
+                    parts.append("".join(chunks))
+                    complete = complete and request["ok"]
+                    continue
+                if i in futures:
+                    text, ok = futures[i].result()
+                    complete = complete and ok
+                else:
+                    text = request["cached"] if request["cached"] is not None else request["text"]
+                parts.append(text)
+                yield text
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if complete:
+            self.store_artifact("improved_resume", params, "".join(parts).strip(), scope)
+
+    def weakness_context(self, skills):
+        """Weakness details and example additions for the given skills, formatted for a prompt"""
+        weakness_context = ""
+        improvement_examples = ""
+        for weakness in self.resume_weaknesses:
+            skill_name = weakness.get('skill', '')
+            if skill_name not in skills:
+                continue
+            weakness_context += f"- {skill_name}: {weakness.get('detail', '')}\n"
+            if weakness.get('suggestions'):
+                weakness_context += "  Suggested improvements:\n"
+                for suggestion in weakness['suggestions']:
+                    weakness_context += f"  * {suggestion}\n"
+            if weakness.get('example'):
+                improvement_examples += f"For {skill_name}: {weakness['example']}\n\n"
+        if weakness_context:
+            weakness_context = "Address these specific weaknesses:\n" + weakness_context
+        return weakness_context, improvement_examples
+
+    def section_request(self, heading, text, skills_to_highlight, jd_context, jd_digest, regenerate=False):
+        """Everything needed to rewrite one section: cache key, cached result and prompt messages"""
+        from langchain_core.messages import SystemMessage, HumanMessage
+
+        request = {"heading": heading, "text": text, "key": None, "cached": None, "messages": None, "ok": True}
+        # The contact block before the first heading is kept as is
+        if heading is None:
+            return request
+
+        skills = relevant_skills(heading, text, skills_to_highlight)
+        weakness_context, improvement_examples = self.weakness_context(skills)
+        request["key"] = section_key(text, skills, jd_digest, weakness_context + improvement_examples)
+        request["cached"] = None if regenerate else cached_section(request["key"])
+        if request["cached"] is not None:
+            metrics.incr("rewrite.sections_cached")
+            return request
+
+        prompt = f"""
+        Section to rewrite:
+        {text}
+
+        Skills to highlight in this section (in order of priority): {', '.join(skills) or 'none'}
+
+        {weakness_context}
+
+        Examples of content to add:
+        {improvement_examples or 'none'}
+        """
+        request["messages"] = [
+            SystemMessage(content=REWRITE_SECTION_INSTRUCTIONS),
+            HumanMessage(content=jd_context or "No job description provided."),
+            HumanMessage(content=prompt),
+        ]
+        return request
+
+    def rewrite_section(self, request):
+        """Rewrite one section in a single call; returns (text, ok), keeping the original text on failure"""
+        try:
+            with metrics.timer("rewrite.section"):
+                rewritten = self.router.invoke("rewrite", request["messages"]).content.strip()
         except Exception as e:
-            print(f"Error generating improved resume: {e}")
-            return "Error generating improved resume. Please try again."
+            print(f"Error rewriting section {request['heading']}: {e}")
+            metrics.incr("rewrite.section_failures")
+            return request["text"], False
 
-    def cleanup(self):
-        """Clean up temporary files"""
+        cache_section(request["key"], rewritten)
+        metrics.incr("rewrite.sections_generated")
+        return rewritten, True
+
+    def stream_section(self, request):
+        """Yield one section's rewrite as it streams; sets request["ok"] to False if it fell back to the original"""
+        chunks = []
         try:
-            if hasattr(self, 'resume_file_path') and os.path.exists(self.resume_file_path):
-                os.unlink(self.resume_file_path)
-            
-            if hasattr(self, 'improved_resume_path') and os.path.exists(self.improved_resume_path):
-                os.unlink(self.improved_resume_path)
+            with metrics.timer("rewrite.section"):
+                for chunk in self.router.stream("rewrite", request["messages"]):
+                    chunks.append(chunk)
+                    yield chunk
         except Exception as e:
-            print(f"Error cleaning up temporary files: {e}")
\ No newline at end of file
+            print(f"Error rewriting section {request['heading']}: {e}")
+            metrics.incr("rewrite.section_failures")
+            if chunks:
+                raise
+            request["ok"] = False
+            yield request["text"]
+            return
+
+        cache_section(request["key"], "".join(chunks).strip())
+        metrics.incr("rewrite.sections_generated")
+
+    def cleanup(self):
+        """Release what the agent holds; analyses and generated output live in the history database"""
+        self.release_vector_stores()
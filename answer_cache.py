@@ -0,0 +1,111 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import metrics
+
+# Paraphrase thresholds per embedding model; ada-002 puts even unrelated questions above 0.7
+THRESHOLDS = {
+    "text-embedding-ada-002": 0.95,
+    "text-embedding-3-small": 0.85,
+    "text-embedding-3-large": 0.85,
+}
+
+
+def normalize_question(question):
+    """Lowercased words with punctuation dropped, keeping the + # . that tell C++, C# and .NET apart"""
+    return re.sub(r"[^\w\s+#.]|\.(?!\w)", "", question.lower()).split()
+
+
+def key_terms(question, vocabulary=()):
+    """Entity-like terms a cached answer must share: vocabulary phrases (e.g. skills) in the question,
+    and words that are capitalised mid-sentence or contain digits or symbols (AWS, Python, C++, 2019)
+
+    Embeddings put "Does the candidate know Python?" and "... Java?" above
+    every paraphrase threshold, so a similarity hit is only trusted when these
+    terms match.
+    """
+    lowered = question.lower()
+    terms = {
+        phrase.lower() for phrase in vocabulary
+        if re.search(r"(?<!\w)" + re.escape(phrase.lower()) + r"(?!\w)", lowered)
+    }
+    for i, word in enumerate(re.findall(r"[A-Za-z0-9][\w+#.-]*", question)):
+        word = word.rstrip(".")
+        if (i > 0 and word[0].isupper()) or re.search(r"[\d+#]", word):
+            terms.add(word.lower())
+    return frozenset(terms)
+
+
+class AnswerCache:
+    """Answers to earlier questions about one resume, matched by question embedding similarity
+
+    Exact repeats are answered without embedding; paraphrases need one
+    embedding call and a dot product against the cached questions.
+    Least recently used entries go first once max_entries is reached.
+    A paraphrase only counts if it names the same entities (key_terms),
+    with vocabulary adding the analysed skills to what is recognised.
+    """
+
+    def __init__(self, embeddings, resume_hash, model="text-embedding-ada-002", threshold=None, max_entries=64,
+                 vocabulary=()):
+        self.embeddings = embeddings
+        self.resume_hash = resume_hash
+        self.vocabulary = tuple(vocabulary)
+        self.threshold = threshold or float(
+            os.environ.get("ANSWER_CACHE_THRESHOLD", THRESHOLDS.get(model, THRESHOLDS["text-embedding-ada-002"]))
+        )
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # normalized question -> (unit vector, answer, key terms)
+        self._lock = threading.Lock()
+
+    def _embed(self, question):
+        import numpy as np
+
+        # embed_documents goes through the on-disk embedding cache; embed_query does not
+        vector = np.asarray(self.embeddings.embed_documents([question])[0], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, question):
+        """Return (answer, question vector); answer is None on a miss"""
+        import numpy as np
+
+        key = " ".join(normalize_question(question))
+        terms = key_terms(question, self.vocabulary)
+        with self._lock:
+            if key in self._entries and self._entries[key][2] == terms:
+                self._entries.move_to_end(key)
+                metrics.incr("qa.cache_exact_hits")
+                return self._entries[key][1], None
+
+        vector = self._embed(question)
+        with self._lock:
+            if self._entries:
+                keys = list(self._entries)
+                matrix = np.stack([self._entries[k][0] for k in keys])
+                similarities = matrix @ vector
+                best = int(similarities.argmax())
+                if similarities[best] >= self.threshold:
+                    if self._entries[keys[best]][2] == terms:
+                        self._entries.move_to_end(keys[best])
+                        metrics.incr("qa.cache_semantic_hits")
+                        return self._entries[keys[best]][1], vector
+                    metrics.incr("qa.cache_entity_mismatches")
+        metrics.incr("qa.cache_misses")
+        return None, vector
+
+    def store(self, question, answer, vector=None):
+        """Remember an answer, reusing the vector from a missed lookup when given"""
+        if vector is None:
+            vector = self._embed(question)
+        key = " ".join(normalize_question(question))
+        with self._lock:
+            self._entries[key] = (vector, answer, key_terms(question, self.vocabulary))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
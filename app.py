@@ -9,8 +9,15 @@ st.set_page_config(
 )
 
 import ui
-from agents import ResumeAnalysisAgent
+from agents import ResumeAnalysisAgent, warmup
+from resources import SessionResourceManager
+from history import AnalysisRepository
+from question_bank import QuestionBank
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import prefetch
 import atexit
+import threading
 
 
 
@@ -69,6 +76,28 @@ if 'resume_analyzed' not in st.session_state:
 if 'analysis_result' not in st.session_state:
     st.session_state.analysis_result = None
 
+if 'prefetcher' not in st.session_state:
+    st.session_state.prefetcher = None
+
+
+@st.cache_resource
+def warm_role_skills(api_key):
+    """Embed every predefined role skill once per process, in the background"""
+    skills = [skill for role_skills in ROLE_REQUIREMENTS.values() for skill in role_skills]
+    scorer = ResumeAnalysisAgent(api_key=api_key).skill_scorer
+    thread = threading.Thread(target=scorer.warm, args=(skills,), name="skill-warmup", daemon=True)
+    thread.start()
+    return thread
+
+@st.cache_resource
+def analysis_history():
+    """Process-wide store of past analyses; each user only sees their own"""
+    return AnalysisRepository()
+
+@st.cache_resource
+def interview_question_bank():
+    """Process-wide bank of reusable interview questions"""
+    return QuestionBank()
 
 # Important part to check
 def setup_agent(config):
@@ -79,77 +108,194 @@ def setup_agent(config):
 
     # Initialize or update the agent with the API key
     if st.session_state.resume_agent is None:
-        st.session_state.resume_agent = ResumeAnalysisAgent(api_key=config["openai_api_key"])
+        st.session_state.resume_agent = ResumeAnalysisAgent(
+            api_key=config["openai_api_key"], history=analysis_history(), question_bank=interview_question_bank()
+        )
     else:
         st.session_state.resume_agent.api_key = config["openai_api_key"]
 
+    st.session_state.resume_agent.scoring_mode = config["scoring_mode"]
+    st.session_state.resume_agent.profile_requests = config["profile"]
+    if config["scoring_mode"] == "vector":
+        warm_role_skills(config["openai_api_key"])
+
     return st.session_state.resume_agent
 
-def analyze_resume(agent, resume_file, role, custom_jd):
+def start_prefetch(agent):
+    """Precompute the default results of the downstream tabs in the background"""
+    stop_prefetch()
+    scheduler = prefetch.PrefetchScheduler()
+    prefetch.prefetch_downstream(
+        scheduler,
+        agent,
+        ui.EXAMPLE_QUESTIONS,
+        (ui.DEFAULT_QUESTION_TYPES, ui.DEFAULT_DIFFICULTY, ui.DEFAULT_NUM_QUESTIONS),
+        ui.DEFAULT_IMPROVEMENT_AREAS
+    )
+    st.session_state.prefetcher = scheduler
+
+def stop_prefetch():
+    """Cancel background work belonging to a previous analysis"""
+    if st.session_state.prefetcher:
+        st.session_state.prefetcher.cancel()
+        st.session_state.prefetcher = None
+
+def prefetched(key):
+    """Return a prefetched result for key, or None"""
+    if st.session_state.prefetcher:
+        return st.session_state.prefetcher.get(key)
+    return None
+
+def analyze_resume(agent, resume_file, role, custom_jd, prefetch_enabled=False):
     """Analyze the resume with the agent"""
     if not resume_file:
         st.error("⚠️ Please upload a resume.")
         return None
 
+    stop_prefetch()
+
     try:
         with st.spinner("🔍 Analyzing resume... This may take a minute."):
             if custom_jd:
                 result = agent.analyze_resume(resume_file, custom_jd=custom_jd)
             else:
-                result = agent.analyze_resume(resume_file, role_requirements=ROLE_REQUIREMENTS[role])
+                result = agent.analyze_resume(resume_file, role_requirements=ROLE_REQUIREMENTS[role], role=role)
 
             st.session_state.resume_analyzed = True
             st.session_state.analysis_result = result
-            return result
+
+        if result and prefetch_enabled:
+            start_prefetch(agent)
+        return result
     except Exception as e:
         st.error(f"⚠️ Error analyzing resume: {e}")
         return None
 
+def load_past_analysis(agent, analysis_id):
+    """Show a stored analysis without recomputing it"""
+    stop_prefetch()
+    try:
+        result = agent.load_analysis(analysis_id)
+        if result:
+            st.session_state.resume_analyzed = True
+            st.session_state.analysis_result = result
+        return result
+    except Exception as e:
+        st.error(f"⚠️ Error loading analysis: {e}")
+        return None
+
 def ask_question(agent, question):
     """Ask a question about the resume"""
     try:
+        response = prefetched(prefetch.qa_key(question))
+        if response is not None:
+            return response
         with st.spinner("Generating response..."):
             response = agent.ask_question(question)
             return response
     except Exception as e:
         return f"Error: {e}"
 
-def generate_interview_questions(agent, question_types, difficulty, num_questions):
+def guarded_stream(stream, error_message):
+    """Pass a stream through, ending it with an error message instead of raising mid-render"""
+    try:
+        yield from stream
+    except Exception as e:
+        yield f"\n\n⚠️ {error_message}: {e}"
+
+def stream_answer(agent, question):
+    """Stream the answer to a question about the resume"""
+    response = prefetched(prefetch.qa_key(question))
+    if response is not None:
+        return iter([response])
+    return guarded_stream(agent.stream_answer(question), "Error")
+
+def generate_interview_questions(agent, question_types, difficulty, num_questions, regenerate=False):
     """Generate interview questions based on the resume"""
     try:
+        questions = None if regenerate else prefetched(prefetch.interview_key(question_types, difficulty, num_questions))
+        if questions:
+            return questions
         with st.spinner("Generating personalized interview questions..."):
-            questions = agent.generate_interview_questions(question_types, difficulty, num_questions)
+            questions = agent.generate_interview_questions(question_types, difficulty, num_questions, regenerate)
             return questions
     except Exception as e:
         st.error(f"⚠️ Error generating questions: {e}")
         return []
 
-def improve_resume(agent, improvement_areas, target_role):
+def improve_resume(agent, improvement_areas, target_role, regenerate=False):
     """Generate resume improvement suggestions"""
     try:
+        improvements = None if regenerate else prefetched(prefetch.improvement_key(improvement_areas, target_role))
+        if improvements:
+            return improvements
         with st.spinner("Analyzing and generating improvements..."):
-            return agent.improve_resume(improvement_areas, target_role)
+            return agent.improve_resume(improvement_areas, target_role, regenerate)
     except Exception as e:
         st.error(f"⚠️ Error generating improvements: {e}")
         return {}
 
-def get_improved_resume(agent, target_role, highlight_skills):
+def stream_improvements(agent, improvement_areas, target_role, regenerate=False):
+    """Stream resume improvement suggestions area by area"""
+    improvements = None if regenerate else prefetched(prefetch.improvement_key(improvement_areas, target_role))
+    if improvements:
+        return iter(improvements.items())
+    # The agent reports failures per area, so nothing here raises mid-render
+    return agent.stream_improvements(improvement_areas, target_role, regenerate)
+
+def stream_improved_resume(agent, target_role, highlight_skills, regenerate=False):
+    """Stream an improved version of the resume"""
+    improved_resume = None if regenerate else prefetched(prefetch.improved_resume_key(target_role, highlight_skills))
+    if improved_resume:
+        return iter([improved_resume])
+    return guarded_stream(
+        agent.stream_improved_resume(target_role, highlight_skills, regenerate), "Error creating improved resume"
+    )
+
+def get_improved_resume(agent, target_role, highlight_skills, regenerate=False):
     """Get an improved version of the resume"""
     try:
+        improved_resume = None if regenerate else prefetched(prefetch.improved_resume_key(target_role, highlight_skills))
+        if improved_resume:
+            return improved_resume
         with st.spinner("Creating improved resume..."):
-            return agent.get_improved_resume(target_role, highlight_skills)
+            return agent.get_improved_resume(target_role, highlight_skills, regenerate)
     except Exception as e:
         st.error(f"⚠️ Error creating improved resume: {e}")
         return "Error generating improved resume."
 
 def cleanup():
     """Clean up resources when the app exits"""
+    stop_prefetch()
     if st.session_state.resume_agent:
         st.session_state.resume_agent.cleanup()
 
 # Register cleanup function
 atexit.register(cleanup)
 
+@st.cache_resource
+def start_warmup():
+    """Load heavy dependencies once per server process, off the render path"""
+    thread = threading.Thread(target=warmup, name="agent-warmup", daemon=True)
+    thread.start()
+    return thread
+
+@st.cache_resource
+def resource_manager():
+    """Process-wide tracker of the memory held by each session"""
+    return SessionResourceManager()
+
+def track_session(agent):
+    """Record this session's memory use and release sessions that have disconnected"""
+    ctx = get_script_run_ctx()
+    if agent is None or ctx is None:
+        return
+
+    manager = resource_manager()
+    manager.touch(ctx.session_id, agent)
+    if Runtime.exists():
+        manager.prune(Runtime.instance().is_active_session)
+
 def main():
     # Setup page UI
     ui.setup_page()
@@ -160,6 +306,10 @@ def main():
 
     # Set up the agent
     agent = setup_agent(config)
+    if agent and agent.history:
+        analysis_id = ui.analysis_history_section(agent.history.recent(owner=agent.history_owner))
+        if analysis_id is not None:
+            load_past_analysis(agent, analysis_id)
 
     # Create tabs for different functionalities
     tabs = ui.create_tabs()
@@ -174,11 +324,15 @@ def main():
             if st.button("🔍 Analyze Resume", type="primary"):
                 if agent and uploaded_resume:
                     # Just store the result, don't display it here
-                    analyze_resume(agent, uploaded_resume, role, custom_jd)
+                    analyze_resume(agent, uploaded_resume, role, custom_jd, prefetch_enabled=config["prefetch"])
                     
         # Display analysis result (only once)
         if st.session_state.analysis_result:
-            ui.display_analysis_results(st.session_state.analysis_result)
+            ui.display_analysis_results(
+                st.session_state.analysis_result,
+                theme_color=config["theme_color"],
+                cutoff=agent.cutoff_score if agent else 75
+            )
 
     # Tab 2: Resume Q&A
     with tabs[1]:
@@ -186,7 +340,8 @@ def main():
         if st.session_state.resume_analyzed and st.session_state.resume_agent:
             ui.resume_qa_section(
                 has_resume=True,  # Explicitly set to True since we checked above
-                ask_question_func=lambda q: ask_question(st.session_state.resume_agent, q)
+                ask_question_func=lambda q: ask_question(st.session_state.resume_agent, q),
+                stream_answer_func=lambda q: stream_answer(st.session_state.resume_agent, q)
             )
         else:
             st.warning("Please upload and analyze a resume first in the 'Resume Analysis' tab.")
@@ -197,7 +352,9 @@ def main():
         if st.session_state.resume_analyzed and st.session_state.resume_agent:
             ui.interview_questions_section(
                 has_resume=True,  # Explicitly set to True since we checked above
-                generate_questions_func=lambda types, diff, num: generate_interview_questions(st.session_state.resume_agent, types, diff, num)
+                generate_questions_func=lambda types, diff, num, regen=False: generate_interview_questions(
+                    st.session_state.resume_agent, types, diff, num, regen
+                )
             )
         else:
             st.warning("Please upload and analyze a resume first in the 'Resume Analysis' tab.")
@@ -207,7 +364,10 @@ def main():
         if st.session_state.resume_analyzed and st.session_state.resume_agent:
             ui.resume_improvement_section(
                 has_resume=True,
-                improve_resume_func=lambda areas, role: improve_resume(st.session_state.resume_agent, areas, role)
+                improve_resume_func=lambda areas, role, regen=False: improve_resume(st.session_state.resume_agent, areas, role, regen),
+                stream_improvements_func=lambda areas, role, regen=False: stream_improvements(
+                    st.session_state.resume_agent, areas, role, regen
+                )
             )
         else:
             st.warning("Please upload and analyze a resume first in the 'Resume Analysis' tab.")
@@ -217,10 +377,19 @@ def main():
         if st.session_state.resume_analyzed and st.session_state.resume_agent:
             ui.improved_resume_section(
                 has_resume=True,
-                get_improved_resume_func=lambda role, skills: get_improved_resume(st.session_state.resume_agent, role, skills)
+                get_improved_resume_func=lambda role, skills, regen=False: get_improved_resume(
+                    st.session_state.resume_agent, role, skills, regen
+                ),
+                stream_improved_resume_func=lambda role, skills, regen=False: stream_improved_resume(
+                    st.session_state.resume_agent, role, skills, regen
+                )
             )
         else:
             st.warning("Please upload and analyze a resume first in the 'Resume Analysis' tab.")
 
+    # The page is on screen by now; warm the process up for the first analysis
+    start_warmup()
+    track_session(agent)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,365 @@
+"""Resumable, shardable screening runs driven by a manifest.
+
+A manifest is a JSON file; paths in it are relative to the manifest:
+
+    {
+        "run_id": "backend-q3",
+        "sources": ["resumes.zip", "more_resumes/"],
+        "role": "Backend Engineer",
+        "skills": ["Python", "Kubernetes", "PostgreSQL"],
+        "jd_path": "backend_jd.txt",
+        "scoring_mode": "llm",
+        "cutoff_score": 75,
+        "shortlist": 50
+    }
+
+Every resume is a work unit keyed by its content hash and the scoring
+parameters, checkpointed as soon as it is scored, so a crashed run picks
+up where it stopped. Shards split the candidate hash space into equal
+ranges and need no coordination; on separate machines, copy each
+shard-*.db into one work directory before merging:
+
+    python batch.py run backend.json --shard 0/4
+    python batch.py status backend.json
+    python batch.py merge backend.json
+"""
+import argparse
+import glob
+import json
+import os
+import time
+
+import ingest
+import metrics
+from history import connect, jd_hash, params_hash
+from ranking import ShortlistRanker
+from results_store import ResultStore
+
+CHECKPOINT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    unit_key TEXT PRIMARY KEY,
+    candidate_id TEXT NOT NULL,
+    params_hash TEXT NOT NULL,
+    member TEXT NOT NULL,
+    status TEXT NOT NULL,
+    overall_score INTEGER,
+    result TEXT,
+    resume_text TEXT,
+    metadata TEXT NOT NULL,
+    completed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_units_status ON units(params_hash, status);
+"""
+
+MERGE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shortlist_weaknesses (
+    unit_key TEXT PRIMARY KEY,
+    weaknesses TEXT NOT NULL,
+    completed_at REAL NOT NULL
+);
+"""
+
+# Candidate ids are the first 64 bits of the resume's SHA-256
+HASH_SPACE = 1 << 64
+# When checkpoints from different shard layouts hold the same unit, the best status wins, then the latest
+STATUS_RANK = {"done": 3, "degraded": 2, "timed_out": 1, "failed": 0}
+
+
+def load_manifest(path):
+    """Read a manifest, resolving its paths and filling in defaults"""
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if not manifest.get("skills"):
+        raise ValueError(f"{path} must list the skills to screen for")
+
+    base = os.path.dirname(os.path.abspath(path))
+    manifest["sources"] = [os.path.join(base, source) for source in manifest.get("sources", [])]
+    if manifest.get("jd_path"):
+        with open(os.path.join(base, manifest["jd_path"]), "r", encoding="utf-8") as f:
+            manifest["jd_text"] = f.read()
+    manifest.setdefault("jd_text", None)
+    manifest.setdefault("run_id", os.path.splitext(os.path.basename(path))[0])
+    manifest.setdefault("role", "")
+    manifest.setdefault("scoring_mode", "llm")
+    manifest.setdefault("cutoff_score", 75)
+    manifest.setdefault("shortlist", 50)
+    manifest["workdir"] = os.path.join(base, manifest.get("workdir", manifest["run_id"] + ".run"))
+    # Anything that changes a score changes the unit keys, so stale results are never reused
+    manifest["params_hash"] = params_hash({
+        "jd": jd_hash(manifest["skills"], manifest["jd_text"]),
+        "skills": manifest["skills"],
+        "scoring_mode": manifest["scoring_mode"],
+        "cutoff_score": manifest["cutoff_score"],
+    })
+    return manifest
+
+
+def parse_shard(spec):
+    """Parse "index/count", e.g. "2/8" """
+    index, _, count = spec.partition("/")
+    index, count = int(index), int(count or 1)
+    if not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"Shard {spec} is out of range")
+    return index, count
+
+
+def shard_of(candidate_id, count):
+    return int(candidate_id, 16) * count // HASH_SPACE
+
+
+def unit_key(candidate_id, params):
+    return f"{candidate_id}-{params[:16]}"
+
+
+def checkpoint_paths(workdir):
+    return sorted(glob.glob(os.path.join(workdir, "shard-*.db")))
+
+
+class Checkpoint:
+    """One shard's finished work units, committed after every candidate"""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = connect(path)
+        with self.conn:
+            self.conn.executescript(CHECKPOINT_SCHEMA)
+
+    def finished(self, params, retry_degraded=False):
+        """Keys of units that need no more work; with retry_degraded, degraded and timed-out units are redone"""
+        statuses = ("done", "failed") if retry_degraded else ("done", "failed", "degraded", "timed_out")
+        rows = self.conn.execute(
+            f"SELECT unit_key FROM units WHERE params_hash = ? AND status IN ({', '.join('?' * len(statuses))})",
+            (params, *statuses)
+        )
+        return {row["unit_key"] for row in rows}
+
+    def record(self, key, candidate_id, params, member, status, result=None, resume_text=None, metadata=None):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO units (unit_key, candidate_id, params_hash, member, status, overall_score, "
+                "result, resume_text, metadata, completed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key, candidate_id, params, member, status,
+                    result.get("overall_score") if result else None,
+                    json.dumps(result, default=str) if result else None,
+                    resume_text, json.dumps(metadata or {}, default=str), time.time(),
+                )
+            )
+
+    def scored(self, params):
+        return self.conn.execute(
+            "SELECT * FROM units WHERE params_hash = ? AND status IN ('done', 'degraded') ORDER BY completed_at",
+            (params,)
+        )
+
+    def units(self, params):
+        return self.conn.execute(
+            "SELECT unit_key, status, completed_at FROM units WHERE params_hash = ?", (params,)
+        )
+
+    def close(self):
+        self.conn.close()
+
+
+def make_agent(manifest):
+    from agents import ResumeAnalysisAgent
+
+    agent = ResumeAnalysisAgent(
+        api_key=os.environ.get("OPENAI_API_KEY"),
+        cutoff_score=manifest["cutoff_score"],
+        scoring_mode=manifest["scoring_mode"]
+    )
+    agent.jd_text = manifest["jd_text"]
+    return agent
+
+
+def run_shard(manifest, index=0, count=1, retry_degraded=False, max_workers=None):
+    """Score this shard's candidates, skipping units any checkpoint in the work directory already holds
+
+    Returns how many units were scored in this run.
+    """
+    workdir, params = manifest["workdir"], manifest["params_hash"]
+    os.makedirs(workdir, exist_ok=True)
+    checkpoint = Checkpoint(os.path.join(workdir, f"shard-{index}-of-{count}.db"))
+
+    # Units finished under another shard layout still count
+    finished = set()
+    for path in checkpoint_paths(workdir):
+        other = checkpoint if path == checkpoint.path else Checkpoint(path)
+        finished |= other.finished(params, retry_degraded)
+        if other is not checkpoint:
+            other.close()
+    metrics.incr("batch.resumed_units", len(finished))
+
+    def accept(candidate_id):
+        return shard_of(candidate_id, count) == index and unit_key(candidate_id, params) not in finished
+
+    agent = make_agent(manifest)
+    scored = 0
+    try:
+        for source in manifest["sources"]:
+            for candidate_id, text, metadata in ingest.ingest(source, max_workers=max_workers, accept=accept):
+                key = unit_key(candidate_id, params)
+                # The same resume can appear more than once across sources
+                if key in finished:
+                    continue
+                result = None
+                if not text.strip():
+                    # A parse that timed out may succeed on a quieter run; an unparseable file never will
+                    status = "timed_out" if metadata.get("timed_out") else "failed"
+                else:
+                    result = agent.semantic_skill_analysis(text, manifest["skills"])
+                    status = "degraded" if result.get("degraded") else "done"
+                checkpoint.record(
+                    key, candidate_id, params, metadata.get("member", ""), status,
+                    result=result, resume_text=text if result else None, metadata=metadata
+                )
+                finished.add(key)
+                scored += 1
+                metrics.incr(f"batch.{status}")
+    finally:
+        checkpoint.close()
+    return scored
+
+
+def unit_owners(workdir, params):
+    """For every unit, the checkpoint path and completed_at of the row that counts
+
+    A unit retried under another shard layout (run --retry-degraded) is in
+    more than one checkpoint; the row with the best status wins, then the
+    most recent.
+    """
+    best = {}
+    for path in checkpoint_paths(workdir):
+        checkpoint = Checkpoint(path)
+        for row in checkpoint.units(params):
+            rank = (STATUS_RANK.get(row["status"], -1), row["completed_at"])
+            if row["unit_key"] not in best or rank > best[row["unit_key"]][0]:
+                best[row["unit_key"]] = (rank, path)
+        checkpoint.close()
+    return {key: (path, rank[1]) for key, (rank, path) in best.items()}
+
+
+def status(manifest):
+    """Unit counts by status for each shard checkpoint in the work directory
+
+    Each unit is counted once, in the checkpoint whose row counts; rows that
+    another layout's checkpoint supersedes are counted as "superseded".
+    """
+    workdir, params = manifest["workdir"], manifest["params_hash"]
+    owners = unit_owners(workdir, params)
+    report = {}
+    for path in checkpoint_paths(workdir):
+        counts = {}
+        checkpoint = Checkpoint(path)
+        for row in checkpoint.units(params):
+            state = row["status"] if owners[row["unit_key"]] == (path, row["completed_at"]) else "superseded"
+            counts[state] = counts.get(state, 0) + 1
+        checkpoint.close()
+        report[os.path.basename(path)] = counts
+    return report
+
+
+def merge(manifest, weaknesses=True):
+    """Combine every shard's checkpoint into one results store and a ranked shortlist
+
+    Re-running a merge rewrites the results store; weakness analyses of
+    shortlisted candidates are checkpointed too, so they are paid for once.
+    Returns the shortlist and the path it was written to.
+    """
+    workdir, params, run_id = manifest["workdir"], manifest["params_hash"], manifest["run_id"]
+    store = ResultStore(os.path.join(workdir, "results"), run_id=run_id)
+    for part in store.parts():
+        if os.path.basename(part).startswith(f"part-{run_id}-"):
+            os.unlink(part)
+
+    spill_path = os.path.join(workdir, "shortlist-spill.jsonl")
+    if os.path.exists(spill_path):
+        os.unlink(spill_path)
+    ranker = ShortlistRanker(k=manifest["shortlist"], spill_path=spill_path)
+    owners = unit_owners(workdir, params)
+    merged = set()
+    try:
+        for path in checkpoint_paths(workdir):
+            checkpoint = Checkpoint(path)
+            for row in checkpoint.scored(params):
+                if row["unit_key"] in merged or owners[row["unit_key"]] != (path, row["completed_at"]):
+                    continue
+                merged.add(row["unit_key"])
+                result = json.loads(row["result"])
+                ranker.push(row["candidate_id"], result, resume_text=row["resume_text"], metadata=json.loads(row["metadata"]))
+                store.add(row["candidate_id"], result, role=manifest["role"])
+            checkpoint.close()
+        store.flush()
+        shortlist = ranker.shortlist()
+    finally:
+        ranker.close(remove=True)
+    metrics.incr("batch.merged_units", len(merged))
+
+    if weaknesses:
+        conn = connect(os.path.join(workdir, "merge.db"))
+        with conn:
+            conn.executescript(MERGE_SCHEMA)
+        agent = None
+        for record in shortlist:
+            result = record["result"]
+            if not result.get("missing_skills"):
+                continue
+            key = unit_key(record["candidate_id"], params)
+            row = conn.execute("SELECT weaknesses FROM shortlist_weaknesses WHERE unit_key = ?", (key,)).fetchone()
+            if row:
+                result["detailed_weaknesses"] = json.loads(row["weaknesses"])
+                metrics.incr("batch.weaknesses_reused")
+                continue
+            agent = agent or make_agent(manifest)
+            agent.restore_analysis(record["resume_text"], manifest["skills"], result, jd_text=manifest["jd_text"])
+            result["detailed_weaknesses"] = agent.analyze_resume_weaknesses()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO shortlist_weaknesses (unit_key, weaknesses, completed_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(result["detailed_weaknesses"], default=str), time.time())
+                )
+        conn.close()
+
+    output = os.path.join(workdir, "shortlist.json")
+    with open(output + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(shortlist, f, indent=2, default=str)
+    os.replace(output + ".tmp", output)
+    return shortlist, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="score this shard's candidates, resuming from its checkpoint")
+    run_parser.add_argument("manifest")
+    run_parser.add_argument("--shard", type=parse_shard, default=(0, 1), help="index/count, e.g. 0/4")
+    run_parser.add_argument("--workers", type=int, help="resume parsing processes")
+    run_parser.add_argument("--retry-degraded", action="store_true", help="rescore units that fell back to keyword scores or timed out while parsing")
+
+    status_parser = commands.add_parser("status", help="count finished units per shard")
+    status_parser.add_argument("manifest")
+
+    merge_parser = commands.add_parser("merge", help="combine shard checkpoints into results and a shortlist")
+    merge_parser.add_argument("manifest")
+    merge_parser.add_argument("--skip-weaknesses", action="store_true", help="rank only, without weakness analysis")
+
+    args = parser.parse_args()
+    manifest = load_manifest(args.manifest)
+
+    if args.command == "run":
+        index, count = args.shard
+        started = time.perf_counter()
+        scored = run_shard(manifest, index, count, args.retry_degraded, args.workers)
+        print(f"Shard {index}/{count}: scored {scored} resumes in {time.perf_counter() - started:.1f}s")
+    elif args.command == "status":
+        for name, counts in status(manifest).items():
+            print(f"{name}: {', '.join(f'{n} {state}' for state, n in sorted(counts.items())) or 'empty'}")
+    else:
+        shortlist, output = merge(manifest, weaknesses=not args.skip_weaknesses)
+        print(f"Shortlisted {len(shortlist)} candidates to {output}")
+
+
+if __name__ == "__main__":
+    main()
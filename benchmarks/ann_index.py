@@ -0,0 +1,160 @@
+"""ANN index benchmark for the candidate vector corpus.
+
+Builds each index kind over the same vectors and reports recall@k against
+exact flat search, single-query latency, batch throughput, build time and
+index bytes per vector, sweeping nprobe (IVF) and efSearch (HNSW):
+
+    python benchmarks/ann_index.py --n 200000 --dim 1536 --k 10 --json ann.json
+    python benchmarks/ann_index.py --corpus corpus/ --kinds ivf_flat ivf_pq hnsw
+
+Synthetic vectors are clustered unit vectors, a rough stand-in for resume
+chunk embeddings; pass --corpus to measure a real candidate_index directory.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import candidate_index  # noqa: E402
+
+SWEEPS = {
+    "flat": [None],
+    "ivf_flat": [1, 4, 16, 64],
+    "ivf_pq": [1, 4, 16, 64],
+    "hnsw": [16, 32, 64, 128],
+}
+
+
+def synthetic_vectors(n, dim, clusters, seed=0):
+    """Unit vectors scattered around random cluster centres"""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return candidate_index.normalize(vectors)
+
+
+def corpus_vectors(directory):
+    with open(os.path.join(directory, "index.json"), "r", encoding="utf-8") as f:
+        dimensions = json.load(f)["dimensions"]
+    return candidate_index.CandidateIndex(directory, dimensions=dimensions).raw_vectors()
+
+
+def recall_at_k(found, exact):
+    hits = sum(len(set(row[row >= 0]) & set(truth)) for row, truth in zip(found, exact))
+    return hits / exact.size
+
+
+def measure(index, queries, exact, k, single_queries):
+    """Recall, single-query latency percentiles and batch throughput for the index as configured"""
+    latencies = []
+    for query in queries[:single_queries]:
+        started = time.perf_counter()
+        index.search(query[None, :], k)
+        latencies.append(time.perf_counter() - started)
+    started = time.perf_counter()
+    _, found = index.search(queries, k)
+    batch_seconds = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "recall_at_k": recall_at_k(found, exact),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+        "batch_qps": len(queries) / batch_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="candidate_index directory to benchmark instead of synthetic vectors")
+    parser.add_argument("--n", type=int, default=100000, help="synthetic vectors")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--single-queries", type=int, default=200, help="queries timed one at a time")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--kinds", nargs="+", choices=candidate_index.INDEX_KINDS, default=list(candidate_index.INDEX_KINDS))
+    parser.add_argument("--nlist", type=int)
+    parser.add_argument("--pq-m", type=int)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--json", help="write the report to this path")
+    args = parser.parse_args()
+
+    import faiss
+    import numpy as np
+
+    vectors = np.ascontiguousarray(corpus_vectors(args.corpus) if args.corpus else synthetic_vectors(args.n, args.dim, args.clusters))
+    n, dim = vectors.shape
+    rng = np.random.default_rng(1)
+    # Queries are perturbed corpus vectors, like a question close to, but not copied from, a resume chunk
+    queries = vectors[rng.choice(n, size=min(args.queries, n), replace=False)]
+    queries = candidate_index.normalize(queries + 0.3 * rng.standard_normal(queries.shape).astype(np.float32) / np.sqrt(dim))
+
+    exact_index = faiss.IndexFlatIP(dim)
+    exact_index.add(vectors)
+    _, exact = exact_index.search(queries, args.k)
+    del exact_index
+
+    report = {"vectors": n, "dimensions": dim, "k": args.k, "float32_bytes_per_vector": dim * 4, "kinds": {}}
+    ids = np.arange(n, dtype=np.int64)
+    params = {"nlist": args.nlist, "pq_m": args.pq_m, "hnsw_m": args.hnsw_m}
+    print(f"{n} vectors x {dim} dims, {len(queries)} queries, recall@{args.k} against exact search")
+    for kind in args.kinds:
+        started = time.perf_counter()
+        index = candidate_index.make_index(kind, dim, n, **params)
+        if not index.is_trained:
+            nlist = args.nlist or candidate_index.default_nlist(n)
+            sample = rng.choice(n, size=min(n, candidate_index.training_size(kind, nlist)), replace=False)
+            index.train(vectors[np.sort(sample)])
+        train_seconds = time.perf_counter() - started
+        index.add_with_ids(vectors, ids)
+        build_seconds = time.perf_counter() - started
+
+        # Round trip through disk to report index size and memory-mapped load time
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "index.faiss")
+            faiss.write_index(index, path)
+            index_bytes = os.path.getsize(path)
+            started = time.perf_counter()
+            mapped = faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            load_seconds = time.perf_counter() - started
+            del mapped
+
+        row = {
+            "factory": candidate_index.factory_string(kind, n, dim, **params),
+            "train_s": train_seconds,
+            "build_s": build_seconds,
+            "mmap_load_s": load_seconds,
+            "bytes_per_vector": index_bytes / n,
+            "sweep": [],
+        }
+        print(f"{kind}: {row['factory']}, built in {build_seconds:.1f}s, {row['bytes_per_vector']:.0f} bytes/vector")
+        for setting in SWEEPS[kind]:
+            if kind == "hnsw":
+                candidate_index.set_search_params(index, ef_search=setting)
+            elif setting is not None:
+                candidate_index.set_search_params(index, nprobe=setting)
+            result = {"setting": setting, **measure(index, queries, exact, args.k, args.single_queries)}
+            row["sweep"].append(result)
+            label = "exact" if setting is None else f"{'efSearch' if kind == 'hnsw' else 'nprobe'}={setting}"
+            print(
+                f"    {label:<14} recall {result['recall_at_k']:.3f}  p50 {result['p50_ms']:.2f} ms"
+                f"  p95 {result['p95_ms']:.2f} ms  {result['batch_qps']:.0f} q/s batched"
+            )
+        report["kinds"][kind] = row
+        del index
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Refit the embedding-similarity skill scoring calibration against LLM scores.
+
+Takes a finished batch run scored in "llm" mode, scores the same resumes
+and skills by embedding similarity, and fits the zero point, ten point and
+uncertain band that map similarities onto the LLM's 0-10 scores:
+
+    python batch.py run backend.json
+    python benchmarks/calibrate_vector_scoring.py backend.json --json calibration.json
+
+Prints the vector_scoring.CALIBRATION entry for the embedding model in use,
+ready to paste over the current one.
+"""
+import argparse
+import json
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import batch  # noqa: E402
+from vector_scoring import CALIBRATION, UNCERTAIN_SCORES, fit_thresholds  # noqa: E402
+
+
+def parse_scores(text):
+    low, _, high = text.partition(",")
+    return float(low), float(high)
+
+
+def scored_pairs(manifest, limit=None):
+    """(best similarity, LLM score) for every skill of every fully LLM-scored unit in the run"""
+    agent = batch.make_agent(manifest)
+    similarities, llm_scores = [], []
+    units = 0
+    for path in batch.checkpoint_paths(manifest["workdir"]):
+        checkpoint = batch.Checkpoint(path)
+        for row in checkpoint.scored(manifest["params_hash"]):
+            # Degraded units hold keyword or similarity fallbacks, not LLM scores
+            if row["status"] != "done" or not row["resume_text"] or (limit and units >= limit):
+                continue
+            llm = json.loads(row["result"]).get("skill_scores", {})
+            skills = [skill for skill in manifest["skills"] if skill in llm]
+            if not skills:
+                continue
+            for skill, (_, similarity, _) in agent.vector_skill_scores(row["resume_text"], skills).items():
+                similarities.append(similarity)
+                llm_scores.append(llm[skill])
+            units += 1
+        checkpoint.close()
+    return agent.skill_scorer.model, similarities, llm_scores, units
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("manifest", help="batch manifest of a finished run with scoring_mode llm")
+    parser.add_argument("--limit", type=int, help="use at most this many resumes")
+    parser.add_argument(
+        "--uncertain-scores", type=parse_scores, default=UNCERTAIN_SCORES,
+        help=f"scores whose similarities form the uncertain band, default {UNCERTAIN_SCORES[0]},{UNCERTAIN_SCORES[1]}"
+    )
+    parser.add_argument("--json", help="write the fit to this path")
+    args = parser.parse_args()
+
+    manifest = batch.load_manifest(args.manifest)
+    if manifest["scoring_mode"] != "llm":
+        parser.error("calibrate against a run scored with scoring_mode llm, not one the calibration itself scored")
+
+    model, similarities, llm_scores, units = scored_pairs(manifest, args.limit)
+    if len(set(llm_scores)) < 2:
+        parser.error(f"need LLM scores that differ to fit a line; {units} resumes gave {len(llm_scores)} scores")
+    low, high, (band_low, band_high) = fit_thresholds(similarities, llm_scores, args.uncertain_scores)
+
+    print(f"Fitted {len(llm_scores)} skill scores from {units} resumes")
+    if model in CALIBRATION:
+        print(f"current: {CALIBRATION[model]!r}")
+    print(f'    "{model}": ({low:.2f}, {high:.2f}, ({band_low:.2f}, {band_high:.2f})),')
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "model": model,
+                "resumes": units,
+                "pairs": len(llm_scores),
+                "uncertain_scores": list(args.uncertain_scores),
+                "calibration": [low, high, [band_low, band_high]],
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""OpenAI-compatible stand-in for load tests.
+
+Serves chat completions (plain, streamed and JSON-schema structured) and
+embeddings with configurable latency, so the app can be driven without
+real model calls. Structured replies are generated from the requested
+schema, filling areas, question types and skills from the prompt:
+
+    python benchmarks/fake_openai.py --port 8089 --latency 0.5 --token-delay 0.02
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_BASE=http://127.0.0.1:8089/v1 streamlit run app.py
+"""
+import argparse
+import base64
+import hashlib
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EMBEDDING_DIMENSIONS = 1536
+
+WORDS = (
+    "delivered scalable services across teams with measurable impact on latency cost and reliability "
+    "designed pipelines mentored engineers automated deployments improved test coverage and shipped "
+    "features used by thousands of customers while owning monitoring incident response and roadmaps"
+).split()
+
+
+def words(rng, count):
+    return " ".join(rng.choice(WORDS) for _ in range(count)).capitalize() + "."
+
+
+def prompt_text(body):
+    parts = []
+    for message in body.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, list):
+            content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        parts.append(content or "")
+    return "\n".join(parts)
+
+
+def schema_hints(prompt):
+    """Choices for well-known string fields, lifted from the prompt the app sent"""
+    hints = {}
+    match = re.search(r"one of: ([^)]+)\)", prompt)
+    if match:
+        hints["type"] = [part.strip() for part in match.group(1).split(",") if part.strip()]
+    match = re.search(r"Skills to focus on: (.+)", prompt)
+    if match:
+        hints["skill"] = [part.strip() for part in match.group(1).split(",") if part.strip()]
+    match = re.search(r"in the following areas: (.+?)\.\s*\n", prompt)
+    if match:
+        hints["area"] = [part.strip() for part in match.group(1).split(",") if part.strip()]
+        hints["count"] = len(hints["area"])
+    match = re.search(r"Generate (\d+)", prompt)
+    if match:
+        hints["count"] = int(match.group(1))
+    return hints
+
+
+def sample(schema, hints, rng, cycles, name="", depth=0):
+    """Build a value that satisfies a strict-subset JSON schema"""
+    if "anyOf" in schema:
+        return sample(schema["anyOf"][0], hints, rng, cycles, name, depth)
+    kind = schema.get("type")
+    if kind == "object":
+        return {
+            key: sample(value, hints, rng, cycles, key, depth + 1)
+            for key, value in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        count = hints.get("count", 3) if depth == 1 else 3
+        return [sample(schema["items"], hints, rng, cycles, name, depth + 1) for _ in range(count)]
+    if kind == "string":
+        if hints.get(name):
+            if name not in cycles:
+                cycles[name] = itertools.cycle(hints[name])
+            return next(cycles[name])
+        return words(rng, rng.randint(6, 14))
+    if kind in ("integer", "number"):
+        return rng.randint(1, 10)
+    if kind == "boolean":
+        return rng.random() < 0.5
+    return None
+
+
+def chat_reply(body, reply_words):
+    """Text a model might plausibly return for this request"""
+    prompt = prompt_text(body)
+    rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        schema = response_format["json_schema"]["schema"]
+        return json.dumps(sample(schema, schema_hints(prompt), rng, {}))
+
+    match = re.search(r"Skill: (.+)\s*$", prompt)
+    if match:
+        return f"{rng.randint(2, 9)}. The resume shows {match.group(1).strip()} in {words(rng, 10).lower()}"
+    return " ".join(words(rng, 12) for _ in range(max(1, reply_words // 12)))
+
+
+def embedding(value):
+    """Deterministic unit vector for one embedding input (text or token ids)"""
+    import numpy as np
+
+    digest = hashlib.sha256(json.dumps(value).encode("utf-8")).digest()
+    vector = np.random.default_rng(int.from_bytes(digest[:8], "little")).standard_normal(EMBEDDING_DIMENSIONS)
+    return (vector / np.linalg.norm(vector)).astype(np.float32)
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    latency = 0.0
+    jitter = 0.0
+    token_delay = 0.0
+    reply_words = 120
+    stats = None
+    stats_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, payload, status=200):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def wait(self):
+        delay = self.latency * (1 + random.uniform(-self.jitter, self.jitter))
+        if delay > 0:
+            time.sleep(delay)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        endpoint = self.path.rstrip("/").rsplit("/", 1)[-1]
+        with self.stats_lock:
+            self.stats["requests"][endpoint] = self.stats["requests"].get(endpoint, 0) + 1
+            self.stats["in_flight"] += 1
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+        try:
+            if endpoint == "completions":
+                self.chat(body)
+            elif endpoint == "embeddings":
+                self.embeddings(body)
+            else:
+                self.send_json({"error": {"message": f"Unknown endpoint {self.path}"}}, status=404)
+        finally:
+            with self.stats_lock:
+                self.stats["in_flight"] -= 1
+
+    def chat(self, body):
+        text = chat_reply(body, self.reply_words)
+        model = body.get("model", "gpt-4o-mini")
+        prompt_tokens = len(prompt_text(body)) // 4
+        completion_tokens = len(text) // 4
+        self.wait()
+
+        if not body.get("stream"):
+            self.send_json({
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        pieces = re.findall(r"\S+\s*", text) or [text]
+        for i in range(0, len(pieces), 3):
+            if i and self.token_delay:
+                time.sleep(self.token_delay)
+            delta = {"content": "".join(pieces[i:i + 3])}
+            if i == 0:
+                delta["role"] = "assistant"
+            event = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": None}],
+            }
+            self.send_chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+        final = {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        }
+        self.send_chunk(f"data: {json.dumps(final)}\n\n".encode("utf-8"))
+        self.send_chunk(b"data: [DONE]\n\n")
+        self.send_chunk(b"")
+
+    def embeddings(self, body):
+        inputs = body.get("input", [])
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        self.wait()
+        data = []
+        for i, value in enumerate(inputs):
+            vector = embedding(value)
+            if body.get("encoding_format") == "base64":
+                encoded = base64.b64encode(vector.tobytes()).decode("ascii")
+            else:
+                encoded = vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": encoded})
+        tokens = sum(len(value) if isinstance(value, list) else len(value) // 4 for value in inputs)
+        self.send_json({
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "text-embedding-ada-002"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+
+def start_server(host="127.0.0.1", port=0, latency=0.0, jitter=0.0, token_delay=0.0, reply_words=120):
+    """Serve the stand-in on a background thread; returns (server, base URL, stats dict)"""
+    stats = {"requests": {}, "in_flight": 0, "max_in_flight": 0}
+    handler = type("Handler", (FakeOpenAIHandler,), {
+        "latency": latency, "jitter": jitter, "token_delay": token_delay,
+        "reply_words": reply_words, "stats": stats, "stats_lock": threading.Lock(),
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}/v1", stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before the first byte of each reply")
+    parser.add_argument("--jitter", type=float, default=0.2, help="latency varies by up to this fraction")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds between streamed chunks")
+    parser.add_argument("--reply-words", type=int, default=120, help="length of free-text replies")
+    args = parser.parse_args()
+
+    server, base_url, stats = start_server(
+        args.host, args.port, args.latency, args.jitter, args.token_delay, args.reply_words
+    )
+    print(f"Fake OpenAI API on {base_url}")
+    try:
+        while True:
+            time.sleep(60)
+            print(json.dumps(stats))
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Cold-start benchmark for the app's import graph.
+
+Runs each stage in fresh interpreters from the repository root and reports
+the median wall time plus the heaviest modules from ``-X importtime``:
+
+    python benchmarks/import_time.py --runs 5 --top 15 --json startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What app.py imports before the first page paints, and what the first analysis adds on top
+STAGES = {
+    "first_render": "import streamlit, ui, agents, prefetch",
+    "first_analysis": "import streamlit, ui, agents, prefetch; agents.warmup()",
+}
+
+TIMED = "import time; _t = time.perf_counter(); {code}; print(time.perf_counter() - _t)"
+
+
+def run_timed(code):
+    """Return the wall time of code in a fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, "-c", TIMED.format(code=code)],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def run_importtime(code):
+    """Return (module, self_us, cumulative_us) rows from -X importtime for code"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((module.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per stage")
+    parser.add_argument("--top", type=int, default=15, help="heaviest top-level imports to list")
+    parser.add_argument("--json", help="write the report to this path")
+    args = parser.parse_args()
+
+    report = {"python": sys.version.split()[0], "stages": {}}
+    for stage, code in STAGES.items():
+        timings = [run_timed(code) for _ in range(args.runs)]
+        rows = run_importtime(code)
+        # Top-level packages only, so nested imports are not double counted
+        top_level = sorted(
+            (row for row in rows if "." not in row[0]),
+            key=lambda row: row[2], reverse=True
+        )[:args.top]
+        report["stages"][stage] = {
+            "median_s": statistics.median(timings),
+            "min_s": min(timings),
+            "max_s": max(timings),
+            "heaviest_imports": [
+                {"module": module, "cumulative_ms": cumulative / 1000} for module, _, cumulative in top_level
+            ],
+        }
+
+        print(f"{stage}: median {statistics.median(timings):.3f}s over {args.runs} runs")
+        for module, _, cumulative in top_level:
+            print(f"    {cumulative / 1000:9.1f} ms  {module}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+"""Concurrent-session load test for the Streamlit app.
+
+Starts the fake OpenAI server and drives N simulated recruiters through
+app.py headlessly with Streamlit's AppTest, all in this one process like
+a real server. Each session enters a key, analyzes its own resume, then
+clicks through a weighted mix of tab actions with think time in between:
+
+    python benchmarks/load_test.py --sessions 50 --actions 6 --think 2 --latency 0.5 --json load.json
+
+Reports throughput, latency percentiles per action, thread counts and memory growth.
+Thread counts leave out the fake server's threads; memory includes it.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_ROOT, "app.py")
+sys.path.insert(0, REPO_ROOT)
+
+from fake_openai import start_server  # noqa: E402
+
+RESUME_KEY = "load_test_resume"
+DEFAULT_MIX = "qa=4,interview=2,improvements=2,rewrite=1,reanalyze=1"
+# The fake model server's listener and per-request handler threads
+SERVER_THREAD_GROUPS = ("fake-openai", "process_request_thread")
+
+RESUME_TEMPLATE = """Candidate {index}
+candidate{index}@example.com
+
+SUMMARY
+Software engineer with {years} years of experience building data and web platforms.
+
+EXPERIENCE
+Senior Engineer, Company {index} ({start}-present)
+- Built Python and FastAPI services on Kubernetes and AWS serving {users} users
+- Led a team of {team} engineers migrating ETL pipelines to Apache Spark and Airflow
+- Cut p95 latency by {cut}% with Redis caching and SQL query tuning
+
+Engineer, Startup {index}
+- Shipped React and TypeScript dashboards with GraphQL APIs
+- Set up CI/CD with Docker, Terraform and Jenkins
+
+EDUCATION
+B.Sc. Computer Science
+
+SKILLS
+Python, SQL, Docker, Kubernetes, React, Machine Learning, {extra}
+"""
+EXTRA_SKILLS = ["PyTorch", "Kafka", "Snowflake", "Go", "Scikit-Learn", "Grafana", "Next.js", "Rust"]
+
+
+def resume_text(index):
+    rng = random.Random(index)
+    return RESUME_TEMPLATE.format(
+        index=index, years=rng.randint(2, 15), start=rng.randint(2012, 2022), users=rng.randint(1, 900) * 1000,
+        team=rng.randint(2, 12), cut=rng.randint(10, 70), extra=", ".join(rng.sample(EXTRA_SKILLS, 3))
+    )
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ACTIONS:
+            raise argparse.ArgumentTypeError(f"Unknown action {name!r}; choose from {', '.join(ACTIONS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def rss_bytes():
+    """Current resident set size; peak RSS where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def thread_group(name):
+    """A thread's group: its name without the counters, e.g. "llm-hedge_3" -> "llm-hedge"
+
+    Unnamed threads are grouped by target: "Thread-12 (_run_script)" -> "_run_script".
+    """
+    match = re.fullmatch(r"Thread-\d+(?: \((.+)\))?", name)
+    if match:
+        return match.group(1) or "Thread"
+    return name.split("_")[0].rstrip("-0123456789") or name
+
+
+def app_threads():
+    """Live threads other than the fake model server's, which runs in this process but is not the app"""
+    return [thread for thread in threading.enumerate() if thread_group(thread.name) not in SERVER_THREAD_GROUPS]
+
+
+def thread_groups():
+    """Live app threads by group, e.g. {"llm-hedge": 16, "ThreadPoolExecutor": 8}"""
+    groups = {}
+    for thread in app_threads():
+        group = thread_group(thread.name)
+        groups[group] = groups.get(group, 0) + 1
+    return groups
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def widget(elements, label):
+    for element in elements:
+        if element.label == label:
+            return element
+    raise LookupError(f"No widget labelled {label!r}")
+
+
+def ask_question(at, rng):
+    import ui
+
+    widget(at.text_input, "Enter your question about the resume:").input(rng.choice(ui.EXAMPLE_QUESTIONS))
+
+
+def click(label):
+    def action(at, rng):
+        widget(at.button, label).click()
+    return action
+
+
+ACTIONS = {
+    "qa": ask_question,
+    "interview": click("Generate Interview Questions"),
+    "improvements": click("Generate Resume Improvements"),
+    "rewrite": click("Generate Improved Resume"),
+    "reanalyze": click("🔍 Analyze Resume"),
+}
+
+
+class Recorder:
+    """Thread-safe collection of per-action timings and errors"""
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def timed(self, action, at, timeout):
+        started = time.perf_counter()
+        error = None
+        try:
+            at.run(timeout=timeout)
+            failures = [element.value for element in at.error if "Error" in element.value]
+            if at.exception:
+                error = at.exception[0].message
+            elif failures:
+                error = failures[0]
+        except Exception as e:
+            error = str(e)
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.samples.setdefault(action, []).append(elapsed)
+        if error:
+            self.error(action, error)
+        return error is None
+
+    def error(self, action, message):
+        with self.lock:
+            self.errors.setdefault(action, []).append(message[:200])
+
+
+def pin_choices(at, choices):
+    """Point radios and selectboxes with a format_func at a formatted label
+
+    AppTest looks their current value up among the formatted labels, which
+    fails for widgets whose values differ from their labels.
+    """
+    for element in list(at.radio) + list(at.selectbox):
+        try:
+            element.index
+        except ValueError:
+            element.set_value(choices.get(element.label, element.options[element.proto.default]))
+
+
+def run_session(index, args, mix, recorder):
+    """One recruiter: load the page, enter a key, analyze, then a mix of tab actions"""
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(args.seed + index)
+    time.sleep(args.ramp * index / max(args.sessions, 1))
+
+    at = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+    at.session_state[RESUME_KEY] = resume_text(0 if args.same_resume else index)
+    choices = {"Skill scoring": "Embedding similarity" if args.scoring_mode == "vector" else "LLM per skill"}
+
+    def run(action):
+        pin_choices(at, choices)
+        return recorder.timed(action, at, args.timeout)
+
+    run("load")
+    widget(at.sidebar.text_input, "OpenAI API Key").input("sk-load-test")
+    run("configure")
+    widget(at.button, "🔍 Analyze Resume").click()
+    if not run("analyze"):
+        return
+
+    names, weights = list(mix), list(mix.values())
+    for _ in range(args.actions):
+        time.sleep(rng.expovariate(1 / args.think) if args.think else 0)
+        action = rng.choices(names, weights)[0]
+        try:
+            ACTIONS[action](at, rng)
+        except LookupError as e:
+            recorder.error(action, str(e))
+            continue
+        run(action)
+
+
+def patch_upload():
+    """AppTest cannot drive st.file_uploader, so each session's resume comes from its session state"""
+    import io
+
+    import streamlit as st
+    import ui
+
+    def resume_upload_section():
+        text = st.session_state.get(RESUME_KEY)
+        if not text:
+            return None
+        upload = io.BytesIO(text.encode("utf-8"))
+        upload.name = "resume.txt"
+        return upload
+
+    ui.resume_upload_section = resume_upload_section
+
+
+def share_runtime():
+    """Keep a mock Runtime installed for the whole run
+
+    AppTest installs a mock Runtime before each script run and clears it
+    after, so concurrent sessions would clear it from under each other.
+    """
+    from unittest.mock import MagicMock
+
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+
+    shared = MagicMock(spec=Runtime)
+    shared.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    shared.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: cls._instance or shared)
+    Runtime.exists = classmethod(lambda cls: True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20, help="concurrent simulated recruiters")
+    parser.add_argument("--actions", type=int, default=5, help="tab actions per session after the analysis")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help=f"action weights, default {DEFAULT_MIX}")
+    parser.add_argument("--think", type=float, default=2.0, help="mean think time between actions (s)")
+    parser.add_argument("--ramp", type=float, default=0.0, help="spread session starts over this many seconds")
+    parser.add_argument("--scoring-mode", choices=["llm", "vector"], default="llm")
+    parser.add_argument("--same-resume", action="store_true", help="every session analyzes the same resume")
+    parser.add_argument("--latency", type=float, default=0.5, help="fake model latency to first byte (s)")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="fake model delay between streamed chunks (s)")
+    parser.add_argument("--timeout", type=float, default=300, help="per-action timeout (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the report to this path")
+    args = parser.parse_args()
+
+    server, base_url, server_stats = start_server(latency=args.latency, jitter=0.2, token_delay=args.token_delay)
+    workdir = tempfile.mkdtemp(prefix="load_test_")
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ["OPENAI_API_BASE"] = base_url
+    # Fresh stores, so runs neither reuse nor pollute real analyses and cached embeddings
+    os.environ.setdefault("ANALYSIS_DB_PATH", os.path.join(workdir, "analysis_history.db"))
+    os.environ.setdefault("EMBEDDING_CACHE_DIR", os.path.join(workdir, "embeddings"))
+    os.chdir(REPO_ROOT)
+    patch_upload()
+    share_runtime()
+
+    import metrics
+
+    recorder = Recorder()
+    baseline_rss, peak_rss = rss_bytes(), rss_bytes()
+    baseline_threads = peak_threads = len(app_threads())
+    peak_groups = {}
+    done = threading.Event()
+
+    def sample_resources():
+        nonlocal peak_rss, peak_threads
+        while not done.wait(0.5):
+            peak_rss = max(peak_rss, rss_bytes())
+            groups = thread_groups()
+            peak_threads = max(peak_threads, sum(groups.values()))
+            for name, count in groups.items():
+                peak_groups[name] = max(peak_groups.get(name, 0), count)
+
+    sampler = threading.Thread(target=sample_resources, name="load-sampler", daemon=True)
+    sampler.start()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions, thread_name_prefix="load-session") as pool:
+        futures = [pool.submit(run_session, i, args, args.mix, recorder) for i in range(args.sessions)]
+        for future in futures:
+            future.result()
+    wall = time.perf_counter() - started
+    done.set()
+    sampler.join()
+    server.shutdown()
+
+    completed = sum(len(samples) for samples in recorder.samples.values())
+    report = {
+        "sessions": args.sessions,
+        "wall_s": wall,
+        "actions_completed": completed,
+        "throughput_per_s": completed / wall if wall else 0.0,
+        "actions": {},
+        "threads": {
+            "baseline": baseline_threads,
+            "peak": peak_threads,
+            "end": len(app_threads()),
+            "peak_by_group": dict(sorted(peak_groups.items(), key=lambda item: -item[1])),
+        },
+        "memory_mb": {
+            "baseline": baseline_rss / 2 ** 20,
+            "peak": peak_rss / 2 ** 20,
+            "end": rss_bytes() / 2 ** 20,
+            "growth": (rss_bytes() - baseline_rss) / 2 ** 20,
+        },
+        "model_server": server_stats,
+        "app_metrics": metrics.snapshot(),
+    }
+    for action, samples in recorder.samples.items():
+        errors = recorder.errors.get(action, [])
+        report["actions"][action] = {
+            "count": len(samples),
+            "errors": len(errors),
+            "p50_s": percentile(samples, 50),
+            "p90_s": percentile(samples, 90),
+            "p99_s": percentile(samples, 99),
+            "mean_s": statistics.mean(samples),
+            "max_s": max(samples),
+            "first_errors": sorted(set(errors))[:3],
+        }
+
+    print(f"{args.sessions} sessions, {completed} actions in {wall:.1f}s ({report['throughput_per_s']:.2f}/s)")
+    print(f"    {'action':<14}{'count':>7}{'errors':>8}{'p50':>9}{'p90':>9}{'p99':>9}")
+    for action, row in report["actions"].items():
+        print(
+            f"    {action:<14}{row['count']:>7}{row['errors']:>8}"
+            f"{row['p50_s']:>8.2f}s{row['p90_s']:>8.2f}s{row['p99_s']:>8.2f}s"
+        )
+        for error in row["first_errors"]:
+            print(f"        ! {error}")
+    memory = report["memory_mb"]
+    print(f"threads: {baseline_threads} -> peak {peak_threads}, {report['threads']['end']} at exit")
+    print(f"memory: {memory['baseline']:.0f} MB -> peak {memory['peak']:.0f} MB, {memory['growth']:+.0f} MB at exit")
+    print(f"model calls: {server_stats['requests']}, max {server_stats['max_in_flight']} in flight")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import math
+import os
+import threading
+import time
+
+import metrics
+
+# Per-analysis limits; 0 means unlimited. Wall time defaults to the agent's analysis deadline.
+MAX_CALLS = int(os.environ.get("ANALYSIS_MAX_CALLS", "40"))
+MAX_TOKENS = int(os.environ.get("ANALYSIS_MAX_TOKENS", "80000"))
+MAX_SECONDS = float(os.environ.get("ANALYSIS_MAX_SECONDS", "0"))
+
+# Expected completion length per call, for estimating a call before it is made
+COMPLETION_TOKENS = {
+    "skill_scoring": 120,
+    "jd_extraction": 400,
+    "weakness_analysis": 300,
+}
+# A batched scoring call answers every skill it is given in one response
+BATCHED_COMPLETION_TOKENS_PER_SKILL = 50
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class BudgetExceededError(Exception):
+    """Raised instead of making a model call the analysis budget cannot cover"""
+
+    def __init__(self, limit):
+        super().__init__(f"analysis budget exhausted ({limit})")
+        self.limit = limit
+
+
+def estimate_tokens(prompt):
+    """Estimate the tokens in a prompt string or message list without calling the API
+
+    Uses the usual four-characters-per-token rule for English text, which is
+    close enough to plan against and needs no tokenizer download.
+    """
+    if isinstance(prompt, str):
+        return math.ceil(len(prompt) / 4)
+    return sum(MESSAGE_OVERHEAD_TOKENS + math.ceil(len(message.content) / 4) for message in prompt)
+
+
+class AnalysisBudget:
+    """Calls, tokens and wall time one analysis may spend, and what was degraded to stay inside them
+
+    The model router charges every non-streaming request it sends for the
+    analysis, fallbacks, hedges and repairs included: its estimated prompt
+    tokens up front and its response length when it returns. Streamed
+    follow-ups (Q&A, improvements, rewrites) come after the analysis and are
+    not charged.
+    """
+
+    def __init__(self, max_calls=None, max_tokens=None, max_seconds=None):
+        self.max_calls = MAX_CALLS if max_calls is None else max_calls
+        self.max_tokens = MAX_TOKENS if max_tokens is None else max_tokens
+        self.max_seconds = MAX_SECONDS if max_seconds is None else max_seconds
+        self.started = time.monotonic()
+        self.calls = 0
+        self.tokens = 0
+        self.estimated_calls = 0
+        self.estimated_tokens = 0
+        self.degradations = []
+        self._lock = threading.Lock()
+
+    @property
+    def deadline(self):
+        return self.started + self.max_seconds if self.max_seconds else None
+
+    def calls_left(self):
+        return self.max_calls - self.calls if self.max_calls else math.inf
+
+    def tokens_left(self):
+        return self.max_tokens - self.tokens if self.max_tokens else math.inf
+
+    def short_of(self, calls, tokens):
+        """The limits ("calls", "tokens" or both) that calls more calls totalling tokens would exceed, else None"""
+        with self._lock:
+            over = [name for name, left, wanted in (("calls", self.calls_left(), calls), ("tokens", self.tokens_left(), tokens))
+                    if wanted > left]
+            return " and ".join(over) or None
+
+    def can_afford(self, calls, tokens):
+        return self.short_of(calls, tokens) is None
+
+    def plan(self, calls, tokens):
+        """Add a full-fidelity estimate to the pre-flight total reported with the result"""
+        with self._lock:
+            self.estimated_calls += calls
+            self.estimated_tokens += tokens
+
+    def charge(self, calls=0, tokens=0):
+        with self._lock:
+            self.calls += calls
+            self.tokens += tokens
+
+    def try_charge(self, calls, tokens):
+        """Charge for calls if they fit, atomically; False if they do not"""
+        with self._lock:
+            if calls > self.calls_left() or tokens > self.tokens_left():
+                return False
+            self.calls += calls
+            self.tokens += tokens
+            return True
+
+    def degrade(self, step, skills, reason):
+        """Record a degradation step, the limit that forced it and the skills it applied to"""
+        if not skills:
+            return
+        with self._lock:
+            self.degradations.append({"step": step, "reason": reason, "skills": list(skills)})
+        metrics.incr(f"budget.{step}", len(skills))
+
+    def summary(self):
+        """Limits, pre-flight estimate, actual spend and degradations, for the analysis result"""
+        with self._lock:
+            return {
+                "limits": {"calls": self.max_calls, "tokens": self.max_tokens, "seconds": self.max_seconds},
+                "estimated": {"calls": self.estimated_calls, "tokens": self.estimated_tokens},
+                "spent": {
+                    "calls": self.calls,
+                    "tokens": self.tokens,
+                    "seconds": round(time.monotonic() - self.started, 3),
+                },
+                "degradations": list(self.degradations),
+            }
@@ -0,0 +1,378 @@
+"""Approximate nearest-neighbour index over resume chunk vectors from many candidates.
+
+The single-resume RAG store keeps an exact flat index in RAM, which does not
+scale to millions of chunks. This index can be flat, IVF-Flat, IVF-PQ or
+HNSW, is trained and rebuilt from the raw vectors kept beside it, and is
+memory-mapped on load:
+
+    python candidate_index.py add-run backend.json corpus/     # embed a batch run's resumes
+    python candidate_index.py build corpus/ --kind ivf_pq      # train and write the index
+    python candidate_index.py info corpus/
+"""
+import argparse
+import json
+import math
+import os
+import threading
+import time
+
+import metrics
+from history import connect
+
+INDEX_KINDS = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+DEFAULT_DIMENSIONS = 1536
+DEFAULT_NPROBE = 16
+DEFAULT_EF_SEARCH = 64
+ADD_BATCH = 65536
+# Centroids per PQ sub-quantizer at 8 bits; PQ cannot be trained on fewer vectors than this
+PQ_CENTROIDS = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY,
+    candidate_id TEXT NOT NULL,
+    chunk INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    deleted INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_candidate ON chunks(candidate_id);
+"""
+
+
+def default_nlist(n_vectors):
+    """IVF list count: about 4 * sqrt(n), with at least 39 training points per list"""
+    return max(1, min(int(4 * math.sqrt(n_vectors)), n_vectors // 39))
+
+
+def default_pq_m(dimensions):
+    """PQ sub-quantizer count: at most 64, at least 8 dimensions each, and dividing the dimensions"""
+    limit = max(1, min(64, dimensions // 8))
+    return max(m for m in range(1, limit + 1) if dimensions % m == 0)
+
+
+def factory_string(kind, n_vectors, dimensions, nlist=None, pq_m=None, hnsw_m=32):
+    """faiss.index_factory description for an index kind; every kind takes explicit ids"""
+    if kind == "flat":
+        return "IDMap,Flat"
+    if kind == "hnsw":
+        return f"IDMap,HNSW{hnsw_m}"
+    nlist = nlist or default_nlist(n_vectors)
+    if kind == "ivf_flat":
+        return f"IVF{nlist},Flat"
+    if kind == "ivf_pq":
+        return f"IVF{nlist},PQ{pq_m or default_pq_m(dimensions)}x8"
+    raise ValueError(f"Unknown index kind {kind!r}; choose from {', '.join(INDEX_KINDS)}")
+
+
+def training_size(kind, nlist):
+    """Vectors to train on: enough for the coarse quantizer, and for PQ's 256 centroids per sub-quantizer"""
+    if kind == "ivf_flat":
+        return nlist * 64
+    if kind == "ivf_pq":
+        return max(nlist * 64, 256 * 64)
+    return 0
+
+
+def make_index(kind, dimensions, n_vectors, **params):
+    """Create an empty inner-product index; vectors are expected to be unit length"""
+    import faiss
+
+    return faiss.index_factory(
+        dimensions, factory_string(kind, n_vectors, dimensions, **params), faiss.METRIC_INNER_PRODUCT
+    )
+
+
+def set_search_params(index, nprobe=DEFAULT_NPROBE, ef_search=DEFAULT_EF_SEARCH):
+    """Apply the query-time accuracy knobs the index has: nprobe for IVF, efSearch for HNSW"""
+    import faiss
+
+    try:
+        faiss.extract_index_ivf(index).nprobe = nprobe
+        return
+    except RuntimeError:
+        pass
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    if hasattr(inner, "hnsw"):
+        inner.hnsw.efSearch = ef_search
+
+
+def normalize(vectors):
+    import numpy as np
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class CandidateIndex:
+    """Resume chunks from many candidates in a directory: raw vectors, chunk metadata and an ANN index
+
+    Raw float32 vectors are appended to vectors.f32 so any index kind can be
+    trained or rebuilt from them; chunks.db maps vector ids to candidates.
+    Removed candidates are filtered from results until the next rebuild.
+    Each thread gets its own chunks.db connection, so one index can be
+    searched from many threads.
+    """
+
+    def __init__(self, directory, dimensions=DEFAULT_DIMENSIONS):
+        self.directory = directory
+        self.dimensions = dimensions
+        os.makedirs(directory, exist_ok=True)
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.index_path = os.path.join(directory, "index.faiss")
+        self.spec_path = os.path.join(directory, "index.json")
+        self.db_path = os.path.join(directory, "chunks.db")
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+        self.index = None
+        self.spec = None
+        self.read_only = False
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.db_path)
+            self._local.conn = conn
+        return conn
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM chunks WHERE deleted = 0").fetchone()[0]
+
+    def raw_vectors(self):
+        """Every stored vector, deleted ones included, memory-mapped from disk"""
+        import numpy as np
+
+        if not os.path.exists(self.vectors_path) or not os.path.getsize(self.vectors_path):
+            return np.zeros((0, self.dimensions), dtype=np.float32)
+        return np.memmap(self.vectors_path, dtype=np.float32, mode="r").reshape(-1, self.dimensions)
+
+    def add(self, candidate_id, texts, vectors):
+        """Store a candidate's chunks, replacing any earlier ones, and index them if an index is loaded"""
+        import numpy as np
+
+        vectors = normalize(vectors)
+        with self._lock:
+            start = len(self.raw_vectors())
+            with open(self.vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+            ids = np.arange(start, start + len(vectors), dtype=np.int64)
+            with self._connect() as conn:
+                conn.execute("UPDATE chunks SET deleted = 1 WHERE candidate_id = ?", (candidate_id,))
+                conn.executemany(
+                    "INSERT INTO chunks (id, candidate_id, chunk, text) VALUES (?, ?, ?, ?)",
+                    [(int(i), candidate_id, n, text) for n, (i, text) in enumerate(zip(ids, texts))]
+                )
+            if self.index is not None and not self.read_only:
+                self.index.add_with_ids(vectors, ids)
+        metrics.incr("candidate_index.vectors_added", len(vectors))
+        return ids
+
+    def remove(self, candidate_id):
+        with self._connect() as conn:
+            conn.execute("UPDATE chunks SET deleted = 1 WHERE candidate_id = ?", (candidate_id,))
+
+    def build(self, kind="flat", nprobe=DEFAULT_NPROBE, ef_search=DEFAULT_EF_SEARCH, **params):
+        """Train a fresh index of kind on the live vectors, add them all and save it
+
+        Also used to rebuild: deleted chunks are dropped and the new index
+        replaces the old one atomically. A corpus too small to train PQ on
+        gets an ivf_flat index instead, which is small at that size anyway;
+        the spec records the kind asked for.
+        """
+        import numpy as np
+
+        started = time.perf_counter()
+        raw = self.raw_vectors()
+        ids = np.array(
+            [row[0] for row in self._connect().execute("SELECT id FROM chunks WHERE deleted = 0 ORDER BY id")],
+            dtype=np.int64
+        )
+        if not len(ids):
+            raise ValueError(f"No vectors to index in {self.directory}")
+        requested_kind = kind
+        if kind == "ivf_pq" and len(ids) < PQ_CENTROIDS:
+            kind = "ivf_flat"
+            metrics.incr("candidate_index.pq_fallbacks")
+        if kind in ("ivf_flat", "ivf_pq") and (params.get("nlist") or 0) > len(ids):
+            raise ValueError(f"nlist={params['nlist']} needs at least that many vectors; {self.directory} has {len(ids)}")
+
+        index = make_index(kind, self.dimensions, len(ids), **params)
+        if not index.is_trained:
+            nlist = params.get("nlist") or default_nlist(len(ids))
+            sample = np.sort(np.random.default_rng(0).choice(
+                ids, size=min(len(ids), training_size(kind, nlist)), replace=False
+            ))
+            index.train(np.ascontiguousarray(raw[sample]))
+        trained = time.perf_counter() - started
+
+        for offset in range(0, len(ids), ADD_BATCH):
+            batch = ids[offset:offset + ADD_BATCH]
+            index.add_with_ids(np.ascontiguousarray(raw[batch]), batch)
+        set_search_params(index, nprobe, ef_search)
+
+        spec = {
+            "kind": kind,
+            "requested_kind": requested_kind,
+            "factory": factory_string(kind, len(ids), self.dimensions, **params),
+            "dimensions": self.dimensions,
+            "vectors": int(index.ntotal),
+            "nprobe": nprobe,
+            "ef_search": ef_search,
+            "train_seconds": round(trained, 3),
+            "build_seconds": round(time.perf_counter() - started, 3),
+            "built_at": time.time(),
+        }
+        self._write(index, spec)
+        with self._lock:
+            self.index, self.spec, self.read_only = index, spec, False
+        metrics.incr("candidate_index.builds")
+        return spec
+
+    def _write(self, index, spec):
+        import faiss
+
+        faiss.write_index(index, self.index_path + ".tmp")
+        os.replace(self.index_path + ".tmp", self.index_path)
+        with open(self.spec_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(spec, f, indent=2)
+        os.replace(self.spec_path + ".tmp", self.spec_path)
+
+    def save(self):
+        """Write the loaded index, including vectors added since it was built"""
+        if self.index is not None and not self.read_only:
+            self.spec["vectors"] = int(self.index.ntotal)
+            self._write(self.index, self.spec)
+
+    def load(self, mmap=True):
+        """Load the saved index, memory-mapping it so pages are read on demand and shared between processes
+
+        A memory-mapped index is read-only; load with mmap=False to keep adding to it.
+        """
+        import faiss
+
+        with open(self.spec_path, "r", encoding="utf-8") as f:
+            spec = json.load(f)
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+        index = faiss.read_index(self.index_path, flags)
+        set_search_params(index, spec.get("nprobe", DEFAULT_NPROBE), spec.get("ef_search", DEFAULT_EF_SEARCH))
+        with self._lock:
+            self.index, self.spec, self.read_only = index, spec, mmap
+        return spec
+
+    def search(self, vectors, k=10):
+        """Nearest chunks for each query vector: lists of {candidate_id, chunk, text, score}"""
+        index = self.index
+        if index is None:
+            raise ValueError("Build or load the index before searching")
+
+        queries = normalize(vectors)
+        # Over-fetch so chunks deleted since the last rebuild do not leave results short
+        conn = self._connect()
+        deleted = conn.execute("SELECT COUNT(*) FROM chunks WHERE deleted = 1").fetchone()[0]
+        fetch = min(int(index.ntotal), k + min(deleted, k * 4))
+        with metrics.timer("candidate_index.search"):
+            scores, ids = index.search(queries, fetch)
+
+        wanted = {int(i) for i in ids.ravel() if i >= 0}
+        rows = {}
+        if wanted:
+            placeholders = ", ".join("?" * len(wanted))
+            for row in conn.execute(
+                f"SELECT id, candidate_id, chunk, text FROM chunks WHERE deleted = 0 AND id IN ({placeholders})",
+                tuple(wanted)
+            ):
+                rows[row["id"]] = row
+
+        results = []
+        for query_scores, query_ids in zip(scores, ids):
+            hits = []
+            for score, i in zip(query_scores, query_ids):
+                row = rows.get(int(i))
+                if row is not None:
+                    hits.append({"candidate_id": row["candidate_id"], "chunk": row["chunk"], "text": row["text"], "score": float(score)})
+                if len(hits) == k:
+                    break
+            results.append(hits)
+        return results
+
+    def close(self):
+        """Close this thread's database connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def add_batch_run(manifest_path, directory, chunk_size=1000, chunk_overlap=200):
+    """Chunk and embed every resume a batch run has scored, as the Q&A store does, and add it to the index"""
+    import batch
+    from agents import ResumeAnalysisAgent
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    manifest = batch.load_manifest(manifest_path)
+    embeddings = ResumeAnalysisAgent(api_key=os.environ.get("OPENAI_API_KEY")).create_embeddings()
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, length_function=len)
+    corpus = None
+    added = 0
+    seen = set()
+    for path in batch.checkpoint_paths(manifest["workdir"]):
+        checkpoint = batch.Checkpoint(path)
+        for row in checkpoint.scored(manifest["params_hash"]):
+            if row["candidate_id"] in seen or not row["resume_text"]:
+                continue
+            seen.add(row["candidate_id"])
+            chunks = splitter.split_text(row["resume_text"])
+            vectors = embeddings.embed_documents(chunks)
+            if corpus is None:
+                corpus = CandidateIndex(directory, dimensions=len(vectors[0]))
+            corpus.add(row["candidate_id"], chunks, vectors)
+            added += 1
+        checkpoint.close()
+    if corpus is not None:
+        corpus.close()
+    return added
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add_parser = commands.add_parser("add-run", help="embed the resumes of a batch run into the corpus")
+    add_parser.add_argument("manifest")
+    add_parser.add_argument("directory")
+
+    build_parser = commands.add_parser("build", help="train and write an index over the corpus (also rebuilds)")
+    build_parser.add_argument("directory")
+    build_parser.add_argument("--kind", choices=INDEX_KINDS, default="ivf_flat")
+    build_parser.add_argument("--dimensions", type=int, default=DEFAULT_DIMENSIONS)
+    build_parser.add_argument("--nlist", type=int, help="IVF lists, default about 4 * sqrt(n)")
+    build_parser.add_argument("--pq-m", type=int, help="PQ sub-quantizers, bytes per vector")
+    build_parser.add_argument("--hnsw-m", type=int, default=32, help="HNSW neighbours per node")
+    build_parser.add_argument("--nprobe", type=int, default=DEFAULT_NPROBE)
+    build_parser.add_argument("--ef-search", type=int, default=DEFAULT_EF_SEARCH)
+
+    info_parser = commands.add_parser("info", help="describe the saved index")
+    info_parser.add_argument("directory")
+
+    args = parser.parse_args()
+    if args.command == "add-run":
+        print(f"Added {add_batch_run(args.manifest, args.directory)} candidates to {args.directory}")
+    elif args.command == "build":
+        corpus = CandidateIndex(args.directory, dimensions=args.dimensions)
+        spec = corpus.build(
+            args.kind, nprobe=args.nprobe, ef_search=args.ef_search,
+            nlist=args.nlist, pq_m=args.pq_m, hnsw_m=args.hnsw_m
+        )
+        print(json.dumps(spec, indent=2))
+    else:
+        with open(os.path.join(args.directory, "index.json"), "r", encoding="utf-8") as f:
+            spec = json.load(f)
+        spec["index_bytes"] = os.path.getsize(os.path.join(args.directory, "index.faiss"))
+        spec["bytes_per_vector"] = spec["index_bytes"] / max(spec["vectors"], 1)
+        print(json.dumps(spec, indent=2))
+
+
+if __name__ == "__main__":
+    main()
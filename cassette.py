@@ -0,0 +1,232 @@
+import base64
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+import metrics
+
+# LLM_CASSETTE=path.jsonl.gz turns the cassette on; LLM_CASSETTE_MODE is "record" or "replay".
+# LLM_CASSETTE_SPEED scales recorded latencies on replay: 1 is real time, 0 (the default) is no waiting.
+CASSETTE_PATH = os.environ.get("LLM_CASSETTE")
+CASSETTE_MODE = os.environ.get("LLM_CASSETTE_MODE", "replay")
+CASSETTE_SPEED = float(os.environ.get("LLM_CASSETTE_SPEED", "0"))
+
+REPLAY_HEADERS = ("content-type", "content-encoding")
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def request_key(request):
+    """Identify a request by method, path and canonical body, ignoring headers"""
+    body = request.content
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":")).encode("utf-8")
+    except ValueError:
+        pass
+    digest = hashlib.sha256(request.method.encode("utf-8") + b" " + request.url.raw_path + b"\n" + body)
+    return digest.hexdigest()
+
+
+def _encode(data):
+    try:
+        return {"text": data.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"b64": base64.b64encode(data).decode("ascii")}
+
+
+def _decode(entry):
+    if "b64" in entry:
+        return base64.b64decode(entry["b64"])
+    return entry["text"].encode("utf-8")
+
+
+def _lines(f):
+    """Lines of a cassette, stopping quietly where a killed recording left it truncated
+
+    Recording flushes after every entry, so a gzip cassette that was never
+    closed has every finished line but no end-of-stream marker, and its last
+    line may be cut short.
+    """
+    try:
+        for line in f:
+            yield line
+    except EOFError:
+        metrics.incr("cassette.truncated")
+
+
+def load(path):
+    """Read a cassette into {request key: [entries in recorded order]}"""
+    entries = {}
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in _lines(f):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                if line.endswith("\n"):
+                    raise
+                # Only the last line can be cut short
+                metrics.incr("cassette.truncated")
+                break
+            entries.setdefault(entry["key"], []).append(entry)
+    return entries
+
+
+class CassetteMiss(Exception):
+    """A replayed request has no recording"""
+
+
+def record_transport(path, inner=None):
+    """Transport that forwards to inner and appends each exchange to the cassette at path"""
+    import httpx
+
+    class RecordingStream(httpx.SyncByteStream):
+        def __init__(self, stream, observe):
+            self.stream = stream
+            self.observe = observe
+
+        def __iter__(self):
+            for chunk in self.stream:
+                self.observe(chunk)
+                yield chunk
+
+        def close(self):
+            self.stream.close()
+            self.observe(None)
+
+    class RecordingTransport(httpx.BaseTransport):
+        def __init__(self):
+            self.inner = inner or httpx.HTTPTransport()
+            self.lock = threading.Lock()
+            opener = gzip.open if path.endswith(".gz") else open
+            self.file = opener(path, "at", encoding="utf-8")
+
+        def write(self, entry):
+            with self.lock:
+                self.file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+                self.file.flush()
+            metrics.incr("cassette.recorded")
+
+        def handle_request(self, request):
+            request.read()
+            started = time.perf_counter()
+            response = self.inner.handle_request(request)
+            first_byte = time.perf_counter() - started
+            chunks, timeline, state = [], [], {"size": 0, "written": False}
+
+            def on_chunk(chunk):
+                if chunk is not None:
+                    chunks.append(chunk)
+                    state["size"] += len(chunk)
+                    timeline.append([state["size"], round(time.perf_counter() - started, 4)])
+                    return
+                if state["written"]:
+                    return
+                state["written"] = True
+                body = b"".join(chunks)
+                self.write({
+                    "key": request_key(request),
+                    "method": request.method,
+                    "path": request.url.path,
+                    "status": response.status_code,
+                    # Bodies are kept as sent, so compressed ones need their encoding on replay
+                    "headers": {
+                        name: response.headers[name] for name in REPLAY_HEADERS if name in response.headers
+                    },
+                    "first_byte": round(first_byte, 4),
+                    "elapsed": round(time.perf_counter() - started, 4),
+                    # Chunk boundaries matter for streamed responses only
+                    "timeline": timeline if len(timeline) > 1 else [],
+                    **_encode(body),
+                })
+
+            return httpx.Response(
+                status_code=response.status_code,
+                headers=response.headers,
+                stream=RecordingStream(response.stream, on_chunk),
+                extensions=response.extensions,
+            )
+
+        def close(self):
+            self.inner.close()
+            self.file.close()
+
+    return RecordingTransport()
+
+
+def replay_transport(path, speed=0.0):
+    """Transport that answers from the cassette at path, optionally at speed x the recorded latency"""
+    import httpx
+
+    class ReplayStream(httpx.SyncByteStream):
+        def __init__(self, body, timeline, started):
+            self.body = body
+            self.timeline = timeline
+            self.started = started
+
+        def __iter__(self):
+            if not speed or not self.timeline:
+                yield self.body
+                return
+            offset = 0
+            for end, at in self.timeline:
+                delay = self.started + at * speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                yield self.body[offset:end]
+                offset = end
+
+    class ReplayTransport(httpx.BaseTransport):
+        def __init__(self):
+            self.entries = load(path)
+            self.positions = {}
+            self.lock = threading.Lock()
+
+        def handle_request(self, request):
+            request.read()
+            started = time.perf_counter()
+            key = request_key(request)
+            with self.lock:
+                recorded = self.entries.get(key)
+                if not recorded:
+                    metrics.incr("cassette.misses")
+                    raise CassetteMiss(f"No recording for {request.method} {request.url.path} ({key[:12]})")
+                # Identical requests replay in recorded order; the last one repeats once they run out
+                position = self.positions.get(key, 0)
+                self.positions[key] = position + 1
+                entry = recorded[min(position, len(recorded) - 1)]
+            metrics.incr("cassette.replayed")
+
+            if speed:
+                wait = (entry["first_byte"] if entry["timeline"] else entry["elapsed"]) * speed
+                time.sleep(wait)
+            return httpx.Response(
+                status_code=entry["status"],
+                headers=entry["headers"],
+                stream=ReplayStream(_decode(entry), entry["timeline"], started),
+            )
+
+    return ReplayTransport()
+
+
+def http_client():
+    """Shared httpx client for OpenAI calls when LLM_CASSETTE is set, otherwise None"""
+    global _client
+    if not CASSETTE_PATH:
+        return None
+    with _client_lock:
+        if _client is None:
+            import httpx
+
+            if CASSETTE_MODE == "record":
+                transport = record_transport(CASSETTE_PATH)
+            else:
+                transport = replay_transport(CASSETTE_PATH, CASSETTE_SPEED)
+            _client = httpx.Client(transport=transport, timeout=httpx.Timeout(600.0))
+        return _client
@@ -0,0 +1,60 @@
+import math
+from functools import lru_cache
+from html import escape
+
+# Inline SVG keeps chart rendering off matplotlib: no figures to leak and
+# identical inputs on a rerun are served from the caches below.
+BACKGROUND = "#111111"
+TRACK = "#333333"
+MISSING = "#444444"
+PASS_COLOR = "#4CAF50"
+FAIL_COLOR = "#d32f2f"
+
+
+@lru_cache(maxsize=256)
+def score_gauge_svg(score, accent_color="#d32f2f", cutoff=75):
+    """Return a donut gauge for an overall score as SVG markup"""
+    score = max(0, min(100, int(score)))
+    radius = 70
+    circumference = 2 * math.pi * radius
+    filled = circumference * score / 100
+    passed = score >= cutoff
+
+    return (
+        '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 200 200" width="100%" style="max-width: 260px;">'
+        f'<rect width="200" height="200" fill="{BACKGROUND}"/>'
+        f'<circle cx="100" cy="100" r="{radius}" fill="none" stroke="{TRACK}" stroke-width="36"/>'
+        f'<circle cx="100" cy="100" r="{radius}" fill="none" stroke="{escape(accent_color)}" stroke-width="36" '
+        f'stroke-dasharray="{filled:.2f} {circumference - filled:.2f}" transform="rotate(-90 100 100)"/>'
+        f'<text x="100" y="100" text-anchor="middle" fill="white" font-size="30" font-weight="bold" font-family="sans-serif">{score}%</text>'
+        f'<text x="100" y="124" text-anchor="middle" fill="{PASS_COLOR if passed else FAIL_COLOR}" font-size="16" '
+        f'font-weight="bold" font-family="sans-serif">{"PASS" if passed else "FAIL"}</text>'
+        "</svg>"
+    )
+
+
+@lru_cache(maxsize=256)
+def skill_bars_svg(skill_scores, accent_color="#d32f2f", missing_threshold=5):
+    """Return horizontal 0-10 bars for a tuple of (skill, score) pairs as SVG markup"""
+    row_height = 26
+    label_width = 190
+    bar_width = 280
+    height = row_height * len(skill_scores) + 10
+
+    rows = []
+    for i, (skill, score) in enumerate(skill_scores):
+        y = 5 + i * row_height
+        color = MISSING if score <= missing_threshold else escape(accent_color)
+        rows.append(
+            f'<text x="{label_width - 8}" y="{y + 16}" text-anchor="end" fill="white" font-size="13" font-family="sans-serif">{escape(str(skill))}</text>'
+            f'<rect x="{label_width}" y="{y + 4}" width="{bar_width}" height="16" rx="3" fill="{TRACK}"/>'
+            f'<rect x="{label_width}" y="{y + 4}" width="{bar_width * max(0, min(10, score)) / 10:.1f}" height="16" rx="3" fill="{color}"/>'
+            f'<text x="{label_width + bar_width + 8}" y="{y + 16}" fill="white" font-size="13" font-family="sans-serif">{score}/10</text>'
+        )
+
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {label_width + bar_width + 50} {height}" width="100%">'
+        f'<rect width="100%" height="100%" fill="{BACKGROUND}"/>'
+        + "".join(rows)
+        + "</svg>"
+    )
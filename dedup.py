@@ -0,0 +1,167 @@
+import hashlib
+import re
+import threading
+
+import metrics
+
+NUM_PERM = 128
+BANDS = 32  # 32 bands of 4 rows: candidates surface from roughly 0.5 Jaccard upwards
+SHINGLE_SIZE = 5
+_MERSENNE = (1 << 61) - 1
+
+
+def _hash_params(num_perm, seed=1):
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Word n-grams of normalized text"""
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def split_sections(text):
+    """Split a resume into blank-line separated sections"""
+    return [section.strip() for section in re.split(r"\n\s*\n", text) if section.strip()]
+
+
+class MinHashIndex:
+    """MinHash signatures with LSH banding to find near-duplicate resumes"""
+
+    def __init__(self, threshold=0.85, num_perm=NUM_PERM, bands=BANDS, max_entries=5000):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._a, self._b = _hash_params(num_perm)
+        self._signatures = {}
+        self._payloads = {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+
+    def signature(self, text):
+        """MinHash signature of text's shingles"""
+        import numpy as np
+
+        tokens = shingles(text)
+        if not tokens:
+            return np.full(self.num_perm, _MERSENNE, dtype=np.uint64)
+        hashes = np.array(
+            [int.from_bytes(hashlib.blake2b(t.encode("utf-8"), digest_size=4).digest(), "little") for t in tokens],
+            dtype=np.uint64
+        )
+        # Universal hashing (a*x + b) mod p for every permutation at once; with 32-bit
+        # hashes and 31-bit coefficients the products stay inside uint64
+        products = (np.outer(self._a, hashes) + self._b[:, None]) % np.uint64(_MERSENNE)
+        return products.min(axis=1)
+
+    def _band_keys(self, signature, scope=None):
+        return [
+            (scope, band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def _remove(self, key):
+        scope, signature = self._signatures.pop(key)
+        self._payloads.pop(key, None)
+        for band_key in self._band_keys(signature, scope):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def add(self, key, text, payload=None, scope=None):
+        """Index a resume's text under key with an arbitrary payload (e.g. its analysis)
+
+        Only entries with the same scope match each other, so results computed
+        against one job description are never reused for another.
+        """
+        signature = self.signature(text)
+        with self._lock:
+            if key in self._signatures:
+                self._remove(key)
+            self._signatures[key] = (scope, signature)
+            self._payloads[key] = payload
+            for band_key in self._band_keys(signature, scope):
+                self._buckets.setdefault(band_key, set()).add(key)
+            # Oldest entries go first once the index is full
+            while len(self._signatures) > self.max_entries:
+                self._remove(next(iter(self._signatures)))
+        return signature
+
+    def query(self, text, scope=None):
+        """Return (key, estimated similarity, payload) of the closest indexed resume above threshold, or None"""
+        signature = self.signature(text)
+        with self._lock:
+            self.lookups += 1
+            candidates = set()
+            for band_key in self._band_keys(signature, scope):
+                candidates |= self._buckets.get(band_key, set())
+            best = None
+            for key in candidates:
+                similarity = float((self._signatures[key][1] == signature).mean())
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (key, similarity, self._payloads[key])
+            if best:
+                self.hits += 1
+            metrics.set_gauge("dedup.hit_rate", round(self.hits / self.lookups, 3))
+        metrics.incr("dedup.lookups")
+        if best:
+            metrics.incr("dedup.hits")
+        return best
+
+    def stats(self):
+        """Index size and duplicate hit rate"""
+        with self._lock:
+            return {
+                "indexed": len(self._signatures),
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+            }
+
+
+def _section_digest(section):
+    return hashlib.blake2b(re.sub(r"\s+", " ", section).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def section_digests(text):
+    """Digests of text's sections, whitespace-normalized; enough to tell later which sections changed"""
+    return {_section_digest(section) for section in split_sections(text)}
+
+
+def mentioned_skills(skills, text):
+    """The skills text mentions"""
+    lowered = text.lower()
+    return [skill for skill in skills if skill.lower() in lowered]
+
+
+def changed_sections(old_digests, new_text):
+    """Sections of new_text that were not in the old text, given the old text's section_digests"""
+    return [section for section in split_sections(new_text) if _section_digest(section) not in old_digests]
+
+
+def skills_to_rescore(skills, old_digests, old_mentioned, new_text):
+    """Skills whose scores may have moved: those mentioned in a changed section, or mentioned in only one version
+
+    The old resume is described by its section_digests and mentioned_skills,
+    so its text need not be kept.
+    """
+    changed = "\n".join(changed_sections(old_digests, new_text)).lower()
+    new_lower = new_text.lower()
+    old_mentioned = set(old_mentioned)
+    return [
+        skill for skill in skills
+        if skill.lower() in changed or (skill in old_mentioned) != (skill.lower() in new_lower)
+    ]
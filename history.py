@@ -0,0 +1,258 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import metrics
+
+DEFAULT_DB_PATH = os.environ.get("ANALYSIS_DB_PATH", "analysis_history.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS candidates (
+    id INTEGER PRIMARY KEY,
+    content_hash TEXT NOT NULL UNIQUE,
+    resume_text TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_descriptions (
+    id INTEGER PRIMARY KEY,
+    content_hash TEXT NOT NULL UNIQUE,
+    role TEXT NOT NULL DEFAULT '',
+    jd_text TEXT,
+    skills TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    candidate_id INTEGER NOT NULL REFERENCES candidates(id),
+    jd_id INTEGER NOT NULL REFERENCES job_descriptions(id),
+    owner TEXT NOT NULL DEFAULT '',
+    scoring_mode TEXT NOT NULL DEFAULT '',
+    degraded INTEGER NOT NULL DEFAULT 0,
+    skills TEXT,
+    overall_score INTEGER NOT NULL,
+    selected INTEGER NOT NULL,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS skill_scores (
+    analysis_id INTEGER NOT NULL REFERENCES analyses(id) ON DELETE CASCADE,
+    skill TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    reasoning TEXT,
+    PRIMARY KEY (analysis_id, skill)
+);
+CREATE TABLE IF NOT EXISTS weaknesses (
+    analysis_id INTEGER NOT NULL REFERENCES analyses(id) ON DELETE CASCADE,
+    skill TEXT NOT NULL,
+    score INTEGER,
+    detail TEXT,
+    suggestions TEXT,
+    example TEXT,
+    PRIMARY KEY (analysis_id, skill)
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    analysis_id INTEGER NOT NULL REFERENCES analyses(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    params_hash TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (analysis_id, kind, params_hash)
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_lookup ON analyses(candidate_id, jd_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_analyses_owner ON analyses(owner, created_at);
+CREATE INDEX IF NOT EXISTS idx_analyses_score ON analyses(overall_score);
+CREATE INDEX IF NOT EXISTS idx_jd_role ON job_descriptions(role);
+CREATE INDEX IF NOT EXISTS idx_skill_scores_skill ON skill_scores(skill, score);
+"""
+
+# Columns added to analyses after its first release, with their definitions
+ADDED_COLUMNS = {
+    "owner": "TEXT NOT NULL DEFAULT ''",
+    "scoring_mode": "TEXT NOT NULL DEFAULT ''",
+    "degraded": "INTEGER NOT NULL DEFAULT 0",
+    "skills": "TEXT",
+}
+
+
+def connect(path):
+    """Open a WAL-mode connection; callers keep one per thread"""
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def jd_hash(skills, jd_text=None):
+    """Identify what a resume was scored against: the JD text, or the role's skill list"""
+    return content_hash(jd_text if jd_text else "\n".join(skills))
+
+
+def owner_key(secret):
+    """Identify whose analyses these are without storing the secret itself"""
+    return content_hash(f"owner\n{secret}")[:32]
+
+
+def params_hash(params):
+    return content_hash(json.dumps(params, sort_keys=True, default=str))
+
+
+class AnalysisRepository:
+    """SQLite store of past analyses and the artifacts generated from them
+
+    WAL mode lets Streamlit sessions read while another writes; each thread
+    gets its own connection.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            # Databases from before analyses were scoped to an owner gain the new columns first
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(analyses)")}
+            if columns:
+                for column, definition in ADDED_COLUMNS.items():
+                    if column not in columns:
+                        conn.execute(f"ALTER TABLE analyses ADD COLUMN {column} {definition}")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.path)
+            self._local.conn = conn
+        return conn
+
+    def _upsert(self, conn, table, content_hash_value, **columns):
+        row = conn.execute(f"SELECT id FROM {table} WHERE content_hash = ?", (content_hash_value,)).fetchone()
+        if row:
+            return row["id"]
+        names = ", ".join(["content_hash", "created_at", *columns])
+        placeholders = ", ".join("?" * (len(columns) + 2))
+        cursor = conn.execute(
+            f"INSERT INTO {table} ({names}) VALUES ({placeholders})",
+            (content_hash_value, time.time(), *columns.values())
+        )
+        return cursor.lastrowid
+
+    def _write_weaknesses(self, conn, analysis_id, result):
+        conn.executemany(
+            "INSERT OR REPLACE INTO weaknesses (analysis_id, skill, score, detail, suggestions, example) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    analysis_id, weakness.get("skill", ""), weakness.get("score"), weakness.get("detail"),
+                    json.dumps(weakness.get("suggestions", [])), weakness.get("example")
+                )
+                for weakness in result.get("detailed_weaknesses", [])
+            ]
+        )
+
+    def save_analysis(self, resume_text, skills, result, role="", jd_text=None, scoring_mode="", owner=""):
+        """Store one analysis with its per-skill scores and weaknesses; returns its id"""
+        with self._connect() as conn:
+            candidate_id = self._upsert(conn, "candidates", content_hash(resume_text), resume_text=resume_text)
+            jd_id = self._upsert(
+                conn, "job_descriptions", jd_hash(skills, jd_text),
+                role=role, jd_text=jd_text, skills=json.dumps(list(skills))
+            )
+            # A JD re-extracted later can yield other skills; the analysis keeps the ones it was scored on
+            analysis_id = conn.execute(
+                "INSERT INTO analyses (candidate_id, jd_id, owner, scoring_mode, degraded, skills, overall_score, selected, "
+                "result, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    candidate_id, jd_id, owner, scoring_mode, int(bool(result.get("degraded"))), json.dumps(list(skills)),
+                    int(result.get("overall_score", 0)), int(bool(result.get("selected"))),
+                    json.dumps(result, default=str), time.time()
+                )
+            ).lastrowid
+            reasoning = result.get("skill_reasoning", {})
+            conn.executemany(
+                "INSERT INTO skill_scores (analysis_id, skill, score, reasoning) VALUES (?, ?, ?, ?)",
+                [(analysis_id, skill, int(score), reasoning.get(skill)) for skill, score in result.get("skill_scores", {}).items()]
+            )
+            self._write_weaknesses(conn, analysis_id, result)
+        metrics.incr("history.saved")
+        return analysis_id
+
+    def find_analysis(self, resume_text, skills, jd_text=None, scoring_mode="", owner=""):
+        """Return the id of the owner's latest full-quality analysis of this exact resume, JD or role and scoring mode
+
+        Degraded analyses (fallback scores, skipped weaknesses) are never reused.
+        """
+        row = self._connect().execute(
+            "SELECT a.id FROM analyses a "
+            "JOIN candidates c ON c.id = a.candidate_id "
+            "JOIN job_descriptions j ON j.id = a.jd_id "
+            "WHERE c.content_hash = ? AND j.content_hash = ? AND a.scoring_mode = ? AND a.owner = ? AND a.degraded = 0 "
+            "ORDER BY a.created_at DESC LIMIT 1",
+            (content_hash(resume_text), jd_hash(skills, jd_text), scoring_mode, owner)
+        ).fetchone()
+        metrics.incr("history.hits" if row else "history.misses")
+        return row["id"] if row else None
+
+    def load_analysis(self, analysis_id, owner=None):
+        """Return (resume_text, skills, result, jd_text) of a stored analysis, or None if owner does not own it"""
+        query = (
+            "SELECT c.resume_text, COALESCE(a.skills, j.skills) AS skills, j.jd_text, a.result FROM analyses a "
+            "JOIN candidates c ON c.id = a.candidate_id "
+            "JOIN job_descriptions j ON j.id = a.jd_id "
+            "WHERE a.id = ?"
+        )
+        params = [analysis_id]
+        if owner is not None:
+            query += " AND a.owner = ?"
+            params.append(owner)
+        row = self._connect().execute(query, params).fetchone()
+        if row is None:
+            return None
+        return row["resume_text"], json.loads(row["skills"]), json.loads(row["result"]), row["jd_text"]
+
+    def recent(self, limit=20, role=None, min_score=None, owner=None):
+        """Latest analyses, newest first, optionally filtered by owner, role and minimum score"""
+        query = (
+            "SELECT a.id, a.overall_score, a.selected, a.created_at, j.role, c.content_hash FROM analyses a "
+            "JOIN candidates c ON c.id = a.candidate_id "
+            "JOIN job_descriptions j ON j.id = a.jd_id WHERE 1 = 1"
+        )
+        params = []
+        if owner is not None:
+            query += " AND a.owner = ?"
+            params.append(owner)
+        if role is not None:
+            query += " AND j.role = ?"
+            params.append(role)
+        if min_score is not None:
+            query += " AND a.overall_score >= ?"
+            params.append(min_score)
+        query += " ORDER BY a.created_at DESC LIMIT ?"
+        params.append(limit)
+        return [dict(row) for row in self._connect().execute(query, params)]
+
+    def save_artifact(self, analysis_id, kind, params, content):
+        """Store generated output (questions, improvements, rewritten resume) for an analysis"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO artifacts (analysis_id, kind, params_hash, content, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (analysis_id, kind, params_hash(params), json.dumps(content, default=str), time.time())
+            )
+
+    def load_artifact(self, analysis_id, kind, params):
+        """Return previously generated output, or None"""
+        row = self._connect().execute(
+            "SELECT content FROM artifacts WHERE analysis_id = ? AND kind = ? AND params_hash = ?",
+            (analysis_id, kind, params_hash(params))
+        ).fetchone()
+        if row is None:
+            return None
+        metrics.incr(f"history.artifact_hits.{kind}")
+        return json.loads(row["content"])
@@ -0,0 +1,191 @@
+import hashlib
+import io
+import os
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import metrics
+
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def sniff_format(data):
+    """Identify a resume's format from its leading bytes rather than its file name"""
+    if data.startswith(b"%PDF"):
+        return "pdf"
+    if data.startswith(b"PK\x03\x04"):
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as docx:
+                if "word/document.xml" in docx.namelist():
+                    return "docx"
+        except zipfile.BadZipFile:
+            pass
+        return "unknown"
+    if b"\x00" in data[:1024]:
+        return "unknown"
+    return "txt"
+
+
+def extract_pdf_text(data):
+    """Extract text from PDF bytes"""
+    import PyPDF2
+
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    return "".join(page.extract_text() or "" for page in reader.pages)
+
+
+def extract_docx_text(data):
+    """Extract paragraph text from DOCX bytes"""
+    with zipfile.ZipFile(io.BytesIO(data)) as docx:
+        root = ET.fromstring(docx.read("word/document.xml"))
+    paragraphs = []
+    for paragraph in root.iter(f"{WORD_NAMESPACE}p"):
+        paragraphs.append("".join(node.text or "" for node in paragraph.iter(f"{WORD_NAMESPACE}t")))
+    return "\n".join(paragraphs)
+
+
+def extract_txt_text(data):
+    """Decode text bytes, tolerating legacy encodings"""
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode("latin-1")
+
+
+EXTRACTORS = {
+    "pdf": extract_pdf_text,
+    "docx": extract_docx_text,
+    "txt": extract_txt_text,
+}
+
+
+def parse_resume_bytes(name, data):
+    """Sniff and extract one resume; runs inside a worker process"""
+    start = time.perf_counter()
+    fmt = sniff_format(data)
+    metadata = {"member": name, "format": fmt, "size": len(data)}
+    text = ""
+    if fmt in EXTRACTORS:
+        try:
+            text = EXTRACTORS[fmt](data)
+        except Exception as e:
+            metadata["error"] = f"{type(e).__name__}: {e}"
+    else:
+        metadata["error"] = "unsupported format"
+    metadata["parse_seconds"] = time.perf_counter() - start
+    return text, metadata
+
+
+def candidate_id(data):
+    """Stable id for a resume, derived from its content"""
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def iter_members(source):
+    """Yield (name, bytes) for each file in a zip archive or directory, without extracting to disk"""
+    if isinstance(source, (str, os.PathLike)) and os.path.isdir(source):
+        for root, _, files in os.walk(source):
+            for file_name in sorted(files):
+                path = os.path.join(root, file_name)
+                with open(path, "rb") as f:
+                    yield os.path.relpath(path, source), f.read()
+        return
+
+    with zipfile.ZipFile(source) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            with archive.open(info) as member:
+                yield info.filename, member.read()
+
+
+def _terminate(executor):
+    # ProcessPoolExecutor cannot cancel a running call, so hung workers are killed outright
+    for process in list((getattr(executor, "_processes", None) or {}).values()):
+        process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def ingest(source, max_workers=None, timeout=30, max_pending=None, accept=None):
+    """Parse every resume in source in a process pool, yielding (candidate_id, text, metadata) as each is ready
+
+    Members are read lazily and at most max_pending are in flight, so memory stays
+    bounded and scoring can start on the first results while the archive is still
+    being read. A member that exceeds timeout seconds is reported with an error and
+    timed_out set in its metadata;
+    if every worker is stuck the pool is recycled. Members whose candidate id
+    fails accept(candidate_id) are skipped without being parsed.
+    """
+    max_workers = max_workers or os.cpu_count() or 2
+    max_pending = max_pending or max_workers * 4
+    members = iter(iter_members(source))
+    executor = ProcessPoolExecutor(max_workers=max_workers)
+    pending = {}  # future -> (candidate id, name, data, submitted at)
+    started = {}  # future -> when it was first seen running
+    stuck = set()
+    exhausted = False
+
+    def submit(cid, name, data):
+        future = executor.submit(parse_resume_bytes, name, data)
+        pending[future] = (cid, name, data, time.monotonic())
+
+    try:
+        while not exhausted or len(pending) > len(stuck):
+            while not exhausted and len(pending) - len(stuck) < max_pending:
+                try:
+                    name, data = next(members)
+                except StopIteration:
+                    exhausted = True
+                    break
+                cid = candidate_id(data)
+                if accept is not None and not accept(cid):
+                    metrics.incr("ingest.skipped")
+                    continue
+                submit(cid, name, data)
+
+            if len(pending) == len(stuck):
+                continue
+
+            done, _ = wait([f for f in pending if f not in stuck], timeout=1, return_when=FIRST_COMPLETED)
+            for future in done:
+                cid, name, data, _ = pending.pop(future)
+                started.pop(future, None)
+                try:
+                    text, metadata = future.result()
+                except Exception as e:
+                    text, metadata = "", {"member": name, "size": len(data), "error": f"{type(e).__name__}: {e}"}
+                metrics.incr("ingest.failed" if "error" in metadata else "ingest.parsed")
+                yield cid, text, metadata
+
+            # Futures in the call queue also report running, so only the longest-running
+            # ones, at most one per free worker, are actually executing and can time out
+            now = time.monotonic()
+            running = sorted(
+                (f for f in pending if f not in stuck and f.running()),
+                key=lambda f: (started.setdefault(f, now), pending[f][3])
+            )
+            for future in running[:max_workers - len(stuck)]:
+                if now - started[future] <= timeout:
+                    continue
+                cid, name, data, _ = pending[future]
+                stuck.add(future)
+                metrics.incr("ingest.timeouts")
+                yield cid, "", {"member": name, "size": len(data), "error": f"timed out after {timeout}s", "timed_out": True}
+
+            if len(stuck) >= max_workers:
+                # Every worker is wedged: kill the pool and resubmit whatever was still queued on it
+                _terminate(executor)
+                requeue = [entry for future, entry in pending.items() if future not in stuck]
+                pending.clear()
+                started.clear()
+                stuck.clear()
+                executor = ProcessPoolExecutor(max_workers=max_workers)
+                for cid, name, data, _ in requeue:
+                    submit(cid, name, data)
+    finally:
+        if stuck:
+            _terminate(executor)
+        else:
+            executor.shutdown(wait=False, cancel_futures=True)
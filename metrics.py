@@ -0,0 +1,94 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Process-wide instrumentation shared by the agent, the UI and batch tooling
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_timings = {}
+
+MAX_SAMPLES = 500
+
+
+def incr(name, value=1):
+    """Increment a counter"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def set_gauge(name, value):
+    """Set a gauge to its latest value"""
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name, seconds):
+    """Record a duration sample"""
+    with _lock:
+        timing = _timings.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0, "samples": []})
+        timing["count"] += 1
+        timing["total"] += seconds
+        timing["max"] = max(timing["max"], seconds)
+        timing["samples"].append(seconds)
+        if len(timing["samples"]) > MAX_SAMPLES:
+            del timing["samples"][0]
+
+
+@contextmanager
+def timer(name):
+    """Time the enclosed block and record it under name"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+def count(name):
+    """Return how many samples have been recorded for name"""
+    with _lock:
+        return _timings.get(name, {}).get("count", 0)
+
+
+def _pick(sorted_samples, pct):
+    index = min(len(sorted_samples) - 1, int(round(pct / 100 * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+def percentile(name, pct, window=None):
+    """Return the pct-th percentile of the last window samples for name, or None"""
+    with _lock:
+        samples = _timings.get(name, {}).get("samples", [])
+        samples = sorted(samples[-window:] if window else samples)
+    if not samples:
+        return None
+    return _pick(samples, pct)
+
+
+def snapshot():
+    """Return a copy of all counters, gauges and timing summaries"""
+    with _lock:
+        timings = {}
+        for name, timing in _timings.items():
+            samples = sorted(timing["samples"])
+            timings[name] = {
+                "count": timing["count"],
+                "avg": timing["total"] / timing["count"] if timing["count"] else 0.0,
+                "p50": _pick(samples, 50) if samples else 0.0,
+                "p95": _pick(samples, 95) if samples else 0.0,
+                "max": timing["max"],
+            }
+        return {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "timings": timings,
+        }
+
+
+def reset():
+    """Clear all recorded metrics"""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _timings.clear()
@@ -0,0 +1,128 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, CancelledError, TimeoutError as FuturesTimeoutError
+
+import metrics
+
+_SKIPPED = object()
+# Longest a tab waits on a prefetch that is already running before doing the work itself
+WAIT_SECONDS = 20
+
+
+class PrefetchScheduler:
+    """Run the likely next agent calls in the background and keep their results"""
+
+    def __init__(self, max_workers=2, max_tasks=12, time_budget=300):
+        self.max_tasks = max_tasks
+        self.time_budget = time_budget
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._started_at = None
+
+    def _over_budget(self):
+        return self._started_at is not None and time.monotonic() - self._started_at > self.time_budget
+
+    def schedule(self, key, func, *args):
+        """Queue func(*args) under key unless cancelled, already queued or over budget"""
+        with self._lock:
+            if self._cancelled.is_set() or key in self._futures:
+                return False
+            if len(self._futures) >= self.max_tasks or self._over_budget():
+                metrics.incr("prefetch.rejected")
+                return False
+            if self._started_at is None:
+                self._started_at = time.monotonic()
+            self._futures[key] = self._executor.submit(self._run, func, args)
+            metrics.incr("prefetch.scheduled")
+            return True
+
+    def _run(self, func, args):
+        # Work that sat in the queue past the budget or a cancel is dropped, not run
+        if self._cancelled.is_set() or self._over_budget():
+            metrics.incr("prefetch.skipped")
+            return _SKIPPED
+        with metrics.timer("prefetch.task"):
+            return func(*args)
+
+    def get(self, key, timeout=WAIT_SECONDS):
+        """Return the prefetched result for key; None on a miss
+
+        A task still queued behind other prefetches is cancelled and counts as
+        a miss, so the caller does the work now instead of waiting for
+        unrelated tasks. A running one is waited on for up to timeout seconds.
+        """
+        future = self._futures.get(key)
+        if future is None:
+            metrics.incr("prefetch.miss")
+            return None
+        if future.cancel():
+            metrics.incr("prefetch.miss_queued")
+            metrics.incr("prefetch.miss")
+            return None
+
+        try:
+            result = future.result(timeout=timeout)
+        except CancelledError:
+            result = _SKIPPED
+        except FuturesTimeoutError:
+            metrics.incr("prefetch.wait_timeouts")
+            result = _SKIPPED
+        except Exception as e:
+            print(f"Error in prefetched task {key}: {e}")
+            result = _SKIPPED
+
+        if result is _SKIPPED:
+            metrics.incr("prefetch.miss")
+            return None
+
+        metrics.incr("prefetch.hit")
+        return result
+
+    def cancel(self):
+        """Stop scheduling, drop queued work and let running calls finish unobserved
+
+        A running call may outlive the analysis it was scheduled for; the agent
+        drops its output instead of saving it with the next analysis.
+        """
+        self._cancelled.set()
+        with self._lock:
+            for future in self._futures.values():
+                future.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def qa_key(question):
+    return ("qa", question.strip().lower())
+
+
+def interview_key(question_types, difficulty, num_questions):
+    return ("interview", tuple(question_types), difficulty, num_questions)
+
+
+def improvement_key(improvement_areas, target_role):
+    return ("improve", tuple(improvement_areas), target_role.strip())
+
+
+def improved_resume_key(target_role, highlight_skills):
+    return ("rewrite", target_role.strip(), highlight_skills.strip())
+
+
+def prefetch_downstream(scheduler, agent, example_questions, question_defaults, improvement_defaults):
+    """Schedule the default artifacts of the downstream tabs, cheapest and most likely first"""
+    question_types, difficulty, num_questions = question_defaults
+    scheduler.schedule(
+        interview_key(question_types, difficulty, num_questions),
+        agent.generate_interview_questions, question_types, difficulty, num_questions
+    )
+    scheduler.schedule(
+        improvement_key(improvement_defaults, ""),
+        agent.improve_resume, improvement_defaults, ""
+    )
+    for question in example_questions:
+        scheduler.schedule(qa_key(question), agent.ask_question, question)
+    scheduler.schedule(
+        improved_resume_key("", ""),
+        agent.get_improved_resume, "", ""
+    )
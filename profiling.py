@@ -0,0 +1,220 @@
+import cProfile
+import functools
+import inspect
+import io
+import json
+import os
+import pstats
+import random
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+import metrics
+
+# Requests are profiled when their agent asks for it, or at random at PROFILE_SAMPLE_RATE (0 to 1)
+SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "resume_agent_profiles"))
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+
+# Most recent captures, newest last, for the Diagnostics panel
+recent = deque(maxlen=20)
+
+_local = threading.local()
+# cProfile allows one active profiler per process on Python 3.12+, so one step is profiled at a time
+_profile_lock = threading.Lock()
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+
+
+def _start_tracing():
+    global _tracing_users
+    import tracemalloc
+
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_users = 1
+        elif _tracing_users:
+            _tracing_users += 1
+        return tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+
+
+def _stop_tracing():
+    global _tracing_users
+    import tracemalloc
+
+    with _tracing_lock:
+        snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        peak = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0
+        # Tracing someone else started is left running
+        if _tracing_users:
+            _tracing_users -= 1
+            if _tracing_users == 0:
+                tracemalloc.stop()
+        return snapshot, peak
+
+
+class Capture:
+    """CPU profile and allocation diff for one request, written to PROFILE_DIR/<request id>/
+
+    cProfile only sees the calling thread, so time spent in worker pools
+    shows up as waiting on futures. The profiler is only enabled while a
+    step runs (the whole call, or one chunk of a generator), and steps that
+    overlap another request's are left unprofiled and counted. tracemalloc
+    traces every thread, so the allocation figures cover the whole process
+    while the request ran, not just this request.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.request_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{uuid.uuid4().hex[:8]}"
+        self.profiler = cProfile.Profile()
+        self.before = _start_tracing()
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.cpu_seconds = 0.0
+        self.unprofiled_steps = 0
+
+    @contextmanager
+    def running(self):
+        """Profile the enclosed block; generators are profiled one step at a time"""
+        _local.active = True
+        cpu_start = time.thread_time()
+        enabled = False
+        if _profile_lock.acquire(blocking=False):
+            try:
+                self.profiler.enable()
+                enabled = True
+            except ValueError as e:
+                # Another profiler (a debugger, coverage) is active; run the step unprofiled
+                print(f"Error starting profiler for {self.request_id}: {e}")
+                _profile_lock.release()
+        if not enabled:
+            self.unprofiled_steps += 1
+            metrics.incr("profiling.unprofiled_steps")
+        try:
+            yield
+        finally:
+            if enabled:
+                self.profiler.disable()
+                _profile_lock.release()
+            self.cpu_seconds += time.thread_time() - cpu_start
+            _local.active = False
+
+    def finish(self, error=None):
+        self._write(error)
+
+    def _write(self, error):
+        elapsed = time.perf_counter() - self.started
+        after, peak = _stop_tracing()
+        directory = os.path.join(PROFILE_DIR, self.request_id)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            self.profiler.dump_stats(os.path.join(directory, "cpu.prof"))
+
+            report = io.StringIO()
+            pstats.Stats(self.profiler, stream=report).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+            with open(os.path.join(directory, "cpu.txt"), "w", encoding="utf-8") as f:
+                f.write(report.getvalue())
+
+            allocated = 0
+            if self.before is not None and after is not None:
+                import tracemalloc
+
+                own = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+                diff = after.filter_traces(own).compare_to(self.before.filter_traces(own), "lineno")
+                allocated = sum(stat.size_diff for stat in diff if stat.size_diff > 0)
+                with open(os.path.join(directory, "allocations.txt"), "w", encoding="utf-8") as f:
+                    f.write("\n".join(str(stat) for stat in diff[:TOP_ALLOCATIONS]) + "\n")
+
+            summary = {
+                "request_id": self.request_id,
+                "name": self.name,
+                "started_at": self.started_at,
+                "elapsed_s": round(elapsed, 4),
+                "cpu_s": round(self.cpu_seconds, 4),
+                "allocated_mb": round(allocated / 2 ** 20, 3),
+                "traced_peak_mb": round(peak / 2 ** 20, 3),
+                "allocations_scope": "process",
+                "unprofiled_steps": self.unprofiled_steps,
+                "error": error,
+            }
+            with open(os.path.join(directory, "summary.json"), "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2)
+        except Exception as e:
+            print(f"Error writing profile {self.request_id}: {e}")
+            return
+
+        recent.append({"request_id": self.request_id, "name": self.name, "elapsed_s": summary["elapsed_s"]})
+        metrics.incr("profiling.captured")
+
+
+def start_capture(name):
+    """A Capture for name, or None if another request's step is being profiled right now"""
+    if _profile_lock.locked():
+        metrics.incr("profiling.skipped_busy")
+        return None
+    return Capture(name)
+
+
+def should_profile(owner):
+    """Profile this call if it is not already inside a profiled one, and it was asked for or sampled"""
+    if getattr(_local, "active", False):
+        return False
+    return bool(getattr(owner, "profile_requests", False)) or (SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE)
+
+
+def profiled(name):
+    """Decorate an agent method so profiled requests leave a CPU and allocation snapshot
+
+    Calls that are not profiled pay for a couple of attribute lookups.
+    """
+    def decorate(func):
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(self, *args, **kwargs):
+                capture = start_capture(name) if should_profile(self) else None
+                if capture is None:
+                    yield from func(self, *args, **kwargs)
+                    return
+
+                steps = func(self, *args, **kwargs)
+                error = None
+                try:
+                    while True:
+                        with capture.running():
+                            try:
+                                item = next(steps)
+                            except StopIteration:
+                                return
+                        yield item
+                except Exception as e:
+                    error = str(e)
+                    raise
+                finally:
+                    steps.close()
+                    capture.finish(error)
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            capture = start_capture(name) if should_profile(self) else None
+            if capture is None:
+                return func(self, *args, **kwargs)
+
+            error = None
+            try:
+                with capture.running():
+                    return func(self, *args, **kwargs)
+            except Exception as e:
+                error = str(e)
+                raise
+            finally:
+                capture.finish(error)
+        return wrapper
+    return decorate
@@ -0,0 +1,118 @@
+import threading
+import time
+
+import metrics
+from answer_cache import THRESHOLDS, key_terms
+from history import DEFAULT_DB_PATH, connect
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS question_bank (
+    id INTEGER PRIMARY KEY,
+    skill TEXT NOT NULL,
+    type TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    question TEXT NOT NULL,
+    model TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    uses INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_question_bank_key ON question_bank(skill, type, difficulty, uses);
+"""
+
+
+def bank_key(skill, question_type, difficulty):
+    return skill.strip().lower(), question_type.strip().lower(), difficulty.strip().lower()
+
+
+class QuestionBank:
+    """Candidate-neutral interview questions by (skill, type, difficulty), shared across candidates
+
+    Questions are stored with their embedding; a new question too close to
+    one already filed under the same key, and naming the same entities, is
+    dropped as a duplicate.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.path)
+            self._local.conn = conn
+        return conn
+
+    def add(self, skill, question_type, difficulty, question, vector, model):
+        """File a question unless a near-duplicate exists; returns True when it was added"""
+        import numpy as np
+
+        vector = np.asarray(vector, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        threshold = THRESHOLDS.get(model, THRESHOLDS["text-embedding-ada-002"])
+        key = bank_key(skill, question_type, difficulty)
+
+        # Serialise check-then-insert so two sessions cannot file the same question twice
+        with self._write_lock, self._connect() as conn:
+            rows = conn.execute(
+                "SELECT question, embedding FROM question_bank WHERE skill = ? AND type = ? AND difficulty = ? AND model = ?",
+                (*key, model)
+            ).fetchall()
+            if rows:
+                existing = np.stack([np.frombuffer(row["embedding"], dtype=np.float32) for row in rows])
+                terms = key_terms(question, [skill])
+                similar = [rows[i]["question"] for i in np.flatnonzero(existing @ vector >= threshold)]
+                if any(key_terms(other, [skill]) == terms for other in similar):
+                    metrics.incr("question_bank.duplicates")
+                    return False
+            conn.execute(
+                "INSERT INTO question_bank (skill, type, difficulty, question, model, embedding, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*key, question, model, vector.tobytes(), time.time())
+            )
+        metrics.incr("question_bank.added")
+        return True
+
+    def pick(self, skills, question_types, difficulty, limit):
+        """Assemble up to limit (type, skill, question) tuples, spreading them across types and skills
+
+        The least used questions come first so repeat candidates see some variety.
+        """
+        # Keys interleave types within each skill so the round robin below alternates types
+        pools = {}
+        conn = self._connect()
+        for skill in skills:
+            for question_type in question_types:
+                rows = conn.execute(
+                    "SELECT id, question FROM question_bank WHERE skill = ? AND type = ? AND difficulty = ? "
+                    "ORDER BY uses, id LIMIT ?",
+                    (*bank_key(skill, question_type, difficulty), limit)
+                ).fetchall()
+                if rows:
+                    pools[(question_type, skill)] = list(rows)
+
+        picked, seen = [], set()
+        while pools and len(picked) < limit:
+            for pool_key in list(pools):
+                if len(picked) >= limit:
+                    break
+                row = pools[pool_key].pop(0)
+                if not pools[pool_key]:
+                    del pools[pool_key]
+                if row["id"] in seen:
+                    continue
+                seen.add(row["id"])
+                picked.append((pool_key[0], pool_key[1], row["question"], row["id"]))
+
+        if picked:
+            with self._connect() as conn:
+                conn.executemany("UPDATE question_bank SET uses = uses + 1 WHERE id = ?", [(p[3],) for p in picked])
+        metrics.incr("question_bank.picked", len(picked))
+        return [p[:3] for p in picked]
+
+    def size(self):
+        return self._connect().execute("SELECT COUNT(*) FROM question_bank").fetchone()[0]
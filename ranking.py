@@ -0,0 +1,99 @@
+import heapq
+import json
+import os
+import tempfile
+
+import metrics
+
+
+def rank_key(result):
+    """Sort key for a scoring result: overall score, then total skill points"""
+    return result.get("overall_score", 0), sum(result.get("skill_scores", {}).values())
+
+
+class ShortlistRanker:
+    """Keep the top-k candidates by overall score while spilling full results to disk
+
+    Only (key, candidate id, file offset) tuples stay in memory, so memory is O(k)
+    however many candidates are pushed. Ties on score and skill points go to the
+    candidate seen first. The spill file holds full resume text, so a temporary
+    one is deleted on close.
+    """
+
+    def __init__(self, k=50, spill_path=None):
+        self.k = k
+        self.owns_spill = spill_path is None
+        if spill_path is None:
+            fd, spill_path = tempfile.mkstemp(prefix="shortlist-", suffix=".jsonl")
+            os.close(fd)
+        self.spill_path = spill_path
+        self._spill = open(spill_path, "ab+")
+        self._heap = []
+        self.seen = 0
+
+    def push(self, candidate_id, result, resume_text=None, metadata=None):
+        """Add one candidate's scoring result"""
+        record = {"candidate_id": candidate_id, "result": result, "resume_text": resume_text, "metadata": metadata or {}}
+        self._spill.seek(0, os.SEEK_END)
+        offset = self._spill.tell()
+        self._spill.write(json.dumps(record, default=str).encode("utf-8") + b"\n")
+
+        entry = (rank_key(result) + (-self.seen,), candidate_id, offset)
+        self.seen += 1
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry > self._heap[0]:
+            heapq.heapreplace(self._heap, entry)
+        metrics.set_gauge("ranking.seen", self.seen)
+
+    def load(self, offset):
+        """Read a spilled record back"""
+        self._spill.flush()
+        self._spill.seek(offset)
+        return json.loads(self._spill.readline())
+
+    def shortlist(self):
+        """Return the spilled records of the top-k candidates, best first"""
+        return [self.load(offset) for _, _, offset in sorted(self._heap, reverse=True)]
+
+    def close(self, remove=None):
+        """Close the spill file, deleting it if remove, or by default if it was a temporary file"""
+        if remove is None:
+            remove = self.owns_spill
+        self._spill.close()
+        if remove and os.path.exists(self.spill_path):
+            os.unlink(self.spill_path)
+
+
+def screen(records, skills, agent, k=50, spill_path=None, store=None, role=""):
+    """Score a stream of (candidate id, text, metadata) records and return the top-k with weakness details
+
+    Every candidate gets skill scores; only the shortlist pays for the
+    per-skill weakness analysis. Scores are also appended to store, a
+    results_store.ResultStore, when one is given.
+    """
+    ranker = ShortlistRanker(k=k, spill_path=spill_path)
+    try:
+        for candidate_id, text, metadata in records:
+            if not text.strip():
+                metrics.incr("ranking.skipped_empty")
+                continue
+            result = agent.semantic_skill_analysis(text, skills)
+            ranker.push(candidate_id, result, resume_text=text, metadata=metadata)
+            if store is not None:
+                store.add(candidate_id, result, role=role)
+
+        shortlist = ranker.shortlist()
+    finally:
+        # A spill file the caller did not ask for is removed even if scoring fails
+        ranker.close()
+
+    for record in shortlist:
+        result = record["result"]
+        if result.get("missing_skills"):
+            agent.restore_analysis(record["resume_text"], skills, result)
+            result["detailed_weaknesses"] = agent.analyze_resume_weaknesses()
+    if store is not None:
+        store.flush()
+    metrics.incr("ranking.weakness_runs_saved", max(0, ranker.seen - len(shortlist)))
+    return shortlist
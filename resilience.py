@@ -0,0 +1,156 @@
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+import metrics
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency that has been failing repeatedly"""
+
+
+class CircuitBreaker:
+    """Stop calling a failing dependency for a while, then let one trial call through"""
+
+    def __init__(self, failure_threshold=5, reset_after=30):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_after:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        """Return True if a call may be attempted now"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def release(self):
+        """Give back a trial slot taken by allow() when no call was made after all"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class HedgeBudget:
+    """Token bucket capping hedges at a fraction of calls: each call earns ratio tokens, each hedge spends one"""
+
+    def __init__(self, ratio=0.1, burst=5):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = float(burst)
+        self._lock = threading.Lock()
+
+    def earn(self):
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def spend(self):
+        """Take a token for one hedge; False if the budget is used up"""
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+def _queued(executor):
+    queue = getattr(executor, "_work_queue", None)
+    return queue is not None and queue.qsize() > 0
+
+
+def hedged_call(executor, func, hedge_after, timeout, budget=None, before_hedge=None):
+    """Run func, starting a duplicate if it is slower than hedge_after; the first success wins
+
+    The hedge timer starts when the first attempt starts running, not when it
+    is queued, and no hedge is sent while the pool has queued work or budget
+    (a HedgeBudget) has no tokens left, so a saturated pool is not doubled.
+    before_hedge, if given, is called just before a hedge is sent; returning
+    False skips it.
+    Raises TimeoutError if neither attempt finishes within timeout seconds, or the
+    last error if every attempt fails.
+    """
+    deadline = time.monotonic() + timeout
+    started = threading.Event()
+
+    def attempt():
+        started.set()
+        return func()
+
+    attempts = [executor.submit(attempt)]
+    if budget is not None:
+        budget.earn()
+    if started.wait(timeout):
+        done, _ = wait(attempts, timeout=max(0, min(hedge_after, deadline - time.monotonic())))
+        if not done and time.monotonic() < deadline:
+            if _queued(executor):
+                metrics.incr("hedge.skipped_saturated")
+            elif budget is not None and not budget.spend():
+                metrics.incr("hedge.skipped_budget")
+            elif before_hedge is not None and not before_hedge():
+                metrics.incr("hedge.skipped_refused")
+            else:
+                metrics.incr("hedge.fired")
+                attempts.append(executor.submit(func))
+
+    last_error = None
+    pending = set(attempts)
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                result = future.result()
+            except Exception as e:
+                last_error = e
+                continue
+            if len(attempts) > 1 and future is attempts[1]:
+                metrics.incr("hedge.won")
+            for other in pending:
+                other.cancel()
+            return result
+
+    for future in pending:
+        future.cancel()
+    if last_error is not None and not pending:
+        raise last_error
+    raise TimeoutError(f"no response within {timeout:.1f}s")
+
+
+def lexical_skill_score(text, skill):
+    """Score a skill 0-10 from how often it is mentioned; a cheap stand-in when the LLM is unavailable"""
+    pattern = r"(?<!\w)" + re.escape(skill.lower()) + r"(?!\w)"
+    mentions = len(re.findall(pattern, text.lower()))
+    if mentions == 0:
+        return 0
+    # A mention is not proof of proficiency, so lexical scores top out at 7
+    return min(7, 4 + mentions)
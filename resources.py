@@ -0,0 +1,75 @@
+import os
+import threading
+from collections import OrderedDict
+
+import metrics
+
+DEFAULT_MAX_BYTES = int(os.environ.get("SESSION_MEMORY_CAP_MB", "512")) * 1024 * 1024
+
+
+class SessionResourceManager:
+    """Track the memory each session's agent holds and evict vector stores past a global cap"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._sessions = OrderedDict()  # session id -> agent, least recently used first
+        self._footprints = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def touch(self, session_id, agent):
+        """Mark a session as most recently used, refresh its size and enforce the cap"""
+        with self._lock:
+            self._sessions[session_id] = agent
+            self._sessions.move_to_end(session_id)
+            self._footprints[session_id] = agent.memory_footprint()
+            self._enforce(protect=session_id)
+            self._publish()
+
+    def release(self, session_id):
+        """Forget a session and clean up its agent"""
+        with self._lock:
+            agent = self._sessions.pop(session_id, None)
+            self._footprints.pop(session_id, None)
+            self._publish()
+        if agent:
+            agent.cleanup()
+
+    def prune(self, is_active):
+        """Release every session for which is_active(session_id) is false"""
+        with self._lock:
+            stale = [session_id for session_id in self._sessions if not is_active(session_id)]
+        for session_id in stale:
+            self.release(session_id)
+        return len(stale)
+
+    def total_bytes(self):
+        return sum(sum(footprint.values()) for footprint in self._footprints.values())
+
+    def _enforce(self, protect=None):
+        # Vector stores go first: they are the bulk of a session and can be rebuilt from the embedding cache
+        for session_id, agent in self._sessions.items():
+            if self.total_bytes() <= self.max_bytes:
+                break
+            if session_id == protect:
+                continue
+            if agent.release_vector_stores():
+                self.evictions += 1
+                metrics.incr("memory.vectorstore_evictions")
+                self._footprints[session_id] = agent.memory_footprint()
+
+    def _publish(self):
+        metrics.set_gauge("memory.sessions", len(self._sessions))
+        metrics.set_gauge("memory.total_bytes", self.total_bytes())
+        metrics.set_gauge("memory.cap_bytes", self.max_bytes)
+
+    def stats(self):
+        """Return memory totals and per-session footprints"""
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "total_bytes": self.total_bytes(),
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "per_session": {session_id: dict(footprint) for session_id, footprint in self._footprints.items()},
+            }
@@ -0,0 +1,90 @@
+import glob
+import os
+import time
+
+import metrics
+
+# One row per candidate and skill
+COLUMNS = [
+    "run_id", "candidate_id", "role", "skill", "skill_score", "missing", "overall_score",
+    "selected", "degraded", "scoring_seconds", "recorded_at",
+]
+
+
+class ResultStore:
+    """Append-only columnar store of screening results, one Parquet part file per batch"""
+
+    def __init__(self, directory, batch_size=5000, run_id=None):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.run_id = run_id or time.strftime("%Y%m%d-%H%M%S")
+        self._rows = {column: [] for column in COLUMNS}
+        os.makedirs(directory, exist_ok=True)
+
+    def add(self, candidate_id, result, role=""):
+        """Buffer one candidate's result as per-skill rows, flushing full batches"""
+        missing = set(result.get("missing_skills", []))
+        degraded = set(result.get("degraded_skills", []))
+        recorded_at = time.time()
+        for skill, score in result.get("skill_scores", {}).items():
+            self._rows["run_id"].append(self.run_id)
+            self._rows["candidate_id"].append(candidate_id)
+            self._rows["role"].append(role)
+            self._rows["skill"].append(skill)
+            self._rows["skill_score"].append(int(score))
+            self._rows["missing"].append(skill in missing)
+            self._rows["overall_score"].append(int(result.get("overall_score", 0)))
+            self._rows["selected"].append(bool(result.get("selected", False)))
+            self._rows["degraded"].append(skill in degraded)
+            self._rows["scoring_seconds"].append(float(result.get("scoring_seconds", 0.0)))
+            self._rows["recorded_at"].append(recorded_at)
+
+        if len(self._rows["skill"]) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write buffered rows as a new part file"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not self._rows["skill"]:
+            return None
+
+        table = pa.table(self._rows)
+        part = os.path.join(self.directory, f"part-{self.run_id}-{time.time_ns()}.parquet")
+        # Write under a temporary name so readers never see a half-written part
+        pq.write_table(table, part + ".tmp", compression="zstd")
+        os.replace(part + ".tmp", part)
+        metrics.incr("results.rows_written", table.num_rows)
+        self._rows = {column: [] for column in COLUMNS}
+        return part
+
+    def parts(self):
+        return sorted(glob.glob(os.path.join(self.directory, "part-*.parquet")))
+
+    def dataset(self):
+        import pyarrow.dataset as ds
+
+        return ds.dataset(self.parts(), format="parquet")
+
+    def query(self, columns=None, filter=None):
+        """Load matching rows into a pandas DataFrame, e.g. filter=pyarrow.dataset.field("selected")"""
+        return self.dataset().to_table(columns=columns, filter=filter).to_pandas()
+
+    def export_csv(self, path, filter=None):
+        """Stream all rows to a CSV file batch by batch"""
+        import pyarrow.csv as pacsv
+
+        with pacsv.CSVWriter(path, self.dataset().schema) as writer:
+            for batch in self.dataset().to_batches(filter=filter):
+                writer.write_batch(batch)
+        return path
+
+    def export_parquet(self, path, filter=None):
+        """Stream all rows into a single Parquet file"""
+        import pyarrow.parquet as pq
+
+        with pq.ParquetWriter(path, self.dataset().schema, compression="zstd") as writer:
+            for batch in self.dataset().to_batches(filter=filter):
+                writer.write_batch(batch)
+        return path
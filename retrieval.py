@@ -0,0 +1,95 @@
+import math
+import re
+from collections import Counter
+
+import metrics
+
+# Keep dots, pluses and hashes inside tokens so "python3.11", "c++", "c#" and "aws-saa" survive
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9.+#/-]*[a-z0-9+#]|[a-z0-9]")
+RRF_K = 60
+
+_hybrid_retriever_class = None
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """Inverted index over a fixed list of texts with Okapi BM25 scoring"""
+
+    def __init__(self, texts, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.lengths = []
+        for doc_id, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            self.lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((doc_id, tf))
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        n = len(self.lengths)
+        self.idf = {
+            term: math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.postings.items()
+        }
+
+    def search(self, query, k=10):
+        """Return up to k (doc id, score) pairs, best first"""
+        scores = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / (self.avg_length or 1))
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """Merge ranked lists of ids into one, scoring each id by sum of 1 / (k + rank)"""
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused, key=fused.get, reverse=True)
+
+
+def hybrid_retriever(vectorstore, chunks, k=3, fetch_k=8):
+    """Build a retriever fusing FAISS similarity with BM25 keyword matches over the same chunks
+
+    The vector store's documents must carry their position in chunks as
+    metadata["chunk"].
+    """
+    global _hybrid_retriever_class
+    if _hybrid_retriever_class is None:
+        from typing import Any, List
+
+        from langchain_core.documents import Document
+        from langchain_core.retrievers import BaseRetriever
+
+        class HybridRetriever(BaseRetriever):
+            vectorstore: Any
+            keyword_index: Any
+            chunks: List[str]
+            k: int = 3
+            fetch_k: int = 8
+
+            def _get_relevant_documents(self, query, *, run_manager=None):
+                with metrics.timer("qa.retrieval"):
+                    dense = [
+                        doc.metadata["chunk"]
+                        for doc in self.vectorstore.similarity_search(query, k=self.fetch_k)
+                    ]
+                    sparse = [doc_id for doc_id, _ in self.keyword_index.search(query, self.fetch_k)]
+                    fused = reciprocal_rank_fusion([dense, sparse])[:self.k]
+                metrics.incr("qa.keyword_only_hits", len(set(fused) - set(dense)))
+                return [Document(page_content=self.chunks[i], metadata={"chunk": i}) for i in fused]
+
+        _hybrid_retriever_class = HybridRetriever
+
+    return _hybrid_retriever_class(
+        vectorstore=vectorstore, keyword_index=BM25Index(chunks), chunks=chunks, k=k, fetch_k=fetch_k
+    )
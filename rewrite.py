@@ -0,0 +1,101 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+from dedup import split_sections
+
+SECTION_KEYWORDS = (
+    "summary", "profile", "objective", "about", "experience", "employment", "work history", "education",
+    "skills", "technical skills", "projects", "certifications", "certificates", "achievements", "awards",
+    "publications", "languages", "interests", "volunteer", "leadership", "activities", "training", "courses",
+)
+# Sections that should mention every highlighted skill, not just the ones already in them
+SKILL_SECTIONS = ("summary", "profile", "objective", "about", "skills")
+MAX_CACHED_SECTIONS = 512
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def is_heading(line, allow_caps=True, after_blank=True):
+    """True for a section heading: a known section name, a short title-case or colon-ended
+    phrase built on one ("Work Experience", "Relevant projects:"), or a short all-caps line
+    that ends with a colon or follows a blank line
+
+    Bullets and body text ("- Ran internal training", "About 5 years of Python work") and
+    acronym lists ("AWS, GCP, SQL") are never headings, and all-caps job titles inside a
+    section are also short and upper case, so an unknown all-caps line only counts where a
+    heading could start.
+    """
+    raw = line.strip()
+    stripped = raw.rstrip(":").strip()
+    if not stripped or len(stripped) > 40:
+        return False
+    lowered = stripped.lower()
+    if lowered in SECTION_KEYWORDS:
+        return True
+    words = stripped.split()
+    if "," in stripped or stripped[0] in "-*•·|" or len(words) > 4 or any(c.isdigit() for c in stripped):
+        return False
+    if any(lowered.startswith(keyword + " ") or lowered.endswith(" " + keyword) for keyword in SECTION_KEYWORDS):
+        return raw.endswith(":") or all(word[0].isupper() or word.lower() in ("&", "and", "of") for word in words)
+    if not allow_caps or not stripped.isupper() or not any(c.isalpha() for c in stripped):
+        return False
+    return raw.endswith(":") or after_blank
+
+
+def split_resume_sections(text):
+    """Split a resume into (heading, section text) pairs; text before the first heading gets heading None
+
+    Resumes without recognizable headings fall back to blank-line separated blocks.
+    """
+    sections = []
+    heading, lines = None, []
+    after_blank = True
+    for line in text.splitlines():
+        # An all-caps first line is the candidate's name, not a section
+        allow_caps = heading is not None or bool("".join(lines).strip())
+        if is_heading(line, allow_caps=allow_caps, after_blank=after_blank):
+            if heading is not None or "".join(lines).strip():
+                sections.append((heading, "\n".join(lines).strip()))
+            heading, lines = line.strip().rstrip(":").strip(), [line]
+        else:
+            lines.append(line)
+        after_blank = not line.strip()
+    if heading is not None or "".join(lines).strip():
+        sections.append((heading, "\n".join(lines).strip()))
+
+    if not any(heading for heading, _ in sections):
+        blocks = split_sections(text)
+        return [(None, blocks[0])] + [(block.splitlines()[0][:40], block) for block in blocks[1:]] if blocks else []
+    return sections
+
+
+def relevant_skills(heading, text, skills):
+    """Highlight skills that bear on this section"""
+    if heading and any(keyword in heading.lower() for keyword in SKILL_SECTIONS):
+        return list(skills)
+    lowered = text.lower()
+    return [skill for skill in skills if skill.lower() in lowered]
+
+
+def section_key(text, skills, jd_digest, context=""):
+    payload = "\x1f".join([text, "\x1e".join(sorted(skills)), jd_digest, context])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cached_section(key):
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    return None
+
+
+def cache_section(key, rewritten):
+    with _lock:
+        _cache[key] = rewritten
+        _cache.move_to_end(key)
+        while len(_cache) > MAX_CACHED_SECTIONS:
+            _cache.popitem(last=False)
@@ -0,0 +1,382 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cassette
+import metrics
+from budget import BudgetExceededError, estimate_tokens
+from resilience import CircuitBreaker, CircuitOpenError, HedgeBudget, hedged_call
+import schemas
+
+# Each pipeline stage gets its own model. High-volume, low-stakes stages run on a
+# fast model; the rewrite keeps the flagship. "latency_budget" is the p90 (seconds)
+# above which a route is considered slow and its fallbacks are tried first.
+DEFAULT_ROUTES = {
+    "skill_scoring": {
+        "model": "gpt-4o-mini", "fallbacks": ["gpt-4o"],
+        "params": {"temperature": 0}, "timeout": 20, "latency_budget": 6,
+    },
+    "jd_extraction": {
+        "model": "gpt-4o-mini", "fallbacks": ["gpt-4o"],
+        "params": {"temperature": 0}, "timeout": 30, "latency_budget": 10,
+    },
+    "weakness_analysis": {
+        "model": "gpt-4o", "fallbacks": ["gpt-4o-mini"],
+        "params": {}, "timeout": 45, "latency_budget": 20,
+    },
+    "interview_questions": {
+        "model": "gpt-4o", "fallbacks": ["gpt-4o-mini"],
+        "params": {}, "timeout": 60, "latency_budget": 30,
+    },
+    "interview_personalization": {
+        "model": "gpt-4o-mini", "fallbacks": ["gpt-4o"],
+        "params": {}, "timeout": 30, "latency_budget": 10,
+    },
+    "improvements": {
+        "model": "gpt-4o", "fallbacks": ["gpt-4o-mini"],
+        "params": {}, "timeout": 60, "latency_budget": 30,
+    },
+    "rewrite": {
+        "model": "gpt-4o", "fallbacks": ["gpt-4o-mini"],
+        "params": {"temperature": 0.7}, "timeout": 120, "latency_budget": 60,
+    },
+    "qa": {
+        "model": "gpt-4o", "fallbacks": ["gpt-4o-mini"],
+        "params": {}, "timeout": 30, "latency_budget": 15,
+    },
+    "repair": {
+        "model": "gpt-4o-mini", "fallbacks": ["gpt-4o"],
+        "params": {"temperature": 0}, "timeout": 30, "latency_budget": 10,
+    },
+}
+
+# A model that keeps failing or blowing its budget is skipped for this long
+COOLDOWN_SECONDS = 60
+FAILURE_THRESHOLD = 3
+LATENCY_WINDOW = 20
+
+# Hedged calls fire a duplicate request once a call is slower than this percentile
+HEDGE_PERCENTILE = 95
+HEDGE_MIN_SAMPLES = 5
+_hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-hedge")
+# Hedges are capped at HEDGE_RATIO of hedged calls, with up to HEDGE_BURST in a row
+HEDGE_RATIO = float(os.environ.get("HEDGE_RATIO", "0.1"))
+HEDGE_BURST = int(os.environ.get("HEDGE_BURST", "5"))
+_hedge_budget = HedgeBudget(HEDGE_RATIO, HEDGE_BURST)
+
+# Most recent per-call token usage, for checking provider prompt-cache hits
+usage_log = deque(maxlen=200)
+_usage_handler_class = None
+
+
+def record_usage(stage, model, token_usage):
+    """Record prompt, cached-prompt and completion tokens for one call"""
+    prompt_tokens = token_usage.get("prompt_tokens", 0) or 0
+    cached_tokens = (token_usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0) or 0
+    completion_tokens = token_usage.get("completion_tokens", 0) or 0
+
+    metrics.incr(f"tokens.{stage}.prompt", prompt_tokens)
+    metrics.incr(f"tokens.{stage}.prompt_cached", cached_tokens)
+    metrics.incr(f"tokens.{stage}.completion", completion_tokens)
+    usage_log.append({
+        "stage": stage,
+        "model": model,
+        "prompt_tokens": prompt_tokens,
+        "cached_tokens": cached_tokens,
+        "uncached_tokens": prompt_tokens - cached_tokens,
+        "completion_tokens": completion_tokens,
+    })
+
+
+def usage_handler(stage, model):
+    """Return a callback handler that records token usage for stage and model"""
+    global _usage_handler_class
+    if _usage_handler_class is None:
+        from langchain_core.callbacks import BaseCallbackHandler
+
+        class UsageHandler(BaseCallbackHandler):
+            def __init__(self, stage, model):
+                self.stage = stage
+                self.model = model
+
+            def on_llm_end(self, response, **kwargs):
+                token_usage = (response.llm_output or {}).get("token_usage") or {}
+                if token_usage:
+                    record_usage(self.stage, self.model, token_usage)
+
+        _usage_handler_class = UsageHandler
+    return _usage_handler_class(stage, model)
+
+
+def load_routes():
+    """Return the default routes merged with overrides from MODEL_ROUTES (a JSON string or file path)"""
+    routes = {stage: dict(route) for stage, route in DEFAULT_ROUTES.items()}
+    override = os.environ.get("MODEL_ROUTES")
+    if not override:
+        return routes
+
+    try:
+        if os.path.exists(override):
+            with open(override, "r", encoding="utf-8") as f:
+                override = f.read()
+        for stage, route in json.loads(override).items():
+            routes.setdefault(stage, {}).update(route)
+    except Exception as e:
+        print(f"Error loading MODEL_ROUTES, using defaults: {e}")
+    return routes
+
+
+class ModelRouter:
+    """Pick a chat model per pipeline stage and fall back when one is slow or erroring"""
+
+    def __init__(self, api_key, routes=None):
+        self.api_key = api_key
+        self.routes = routes or load_routes()
+        self._models = {}
+        self._failures = {}
+        self._benched_until = {}
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, stage):
+        """Circuit breaker guarding every model of a stage"""
+        with self._lock:
+            if stage not in self._breakers:
+                self._breakers[stage] = CircuitBreaker()
+            return self._breakers[stage]
+
+    def hedge_delay(self, stage, model):
+        """Seconds to wait before sending a duplicate request, from recent latencies"""
+        name = f"llm.{stage}.{model}"
+        if metrics.count(name) < HEDGE_MIN_SAMPLES:
+            return self.routes[stage].get("latency_budget") or self.routes[stage].get("timeout") or 30
+        return metrics.percentile(name, HEDGE_PERCENTILE, window=LATENCY_WINDOW * 5)
+
+    def chat_model(self, stage, model):
+        """Return a (cached) chat client for model with the stage's parameters"""
+        from langchain_openai import ChatOpenAI
+
+        route = self.routes[stage]
+        key = (stage, model)
+        with self._lock:
+            if key not in self._models:
+                self._models[key] = ChatOpenAI(
+                    model=model,
+                    api_key=self.api_key,
+                    timeout=route.get("timeout"),
+                    max_retries=route.get("max_retries", 1),
+                    callbacks=[usage_handler(stage, model)],
+                    http_client=cassette.http_client(),
+                    **route.get("params", {})
+                )
+            return self._models[key]
+
+    def candidates(self, stage):
+        """Models to try for stage, healthy ones first"""
+        route = self.routes[stage]
+        models = [route["model"]] + [m for m in route.get("fallbacks", []) if m != route["model"]]
+        now = time.monotonic()
+        healthy = [m for m in models if self._benched_until.get((stage, m), 0) <= now]
+        benched = [m for m in models if m not in healthy]
+        return healthy + benched
+
+    def llm(self, stage):
+        """Return the preferred chat model for stage, for use inside chains"""
+        return self.chat_model(stage, self.candidates(stage)[0])
+
+    def _record(self, stage, model, elapsed=None, error=None):
+        name = f"llm.{stage}.{model}"
+        key = (stage, model)
+        if error is not None:
+            metrics.incr(f"{name}.errors")
+            with self._lock:
+                self._failures[key] = self._failures.get(key, 0) + 1
+                if self._failures[key] >= FAILURE_THRESHOLD:
+                    self._benched_until[key] = time.monotonic() + COOLDOWN_SECONDS
+                    self._failures[key] = 0
+            return
+
+        metrics.observe(name, elapsed)
+        with self._lock:
+            self._failures[key] = 0
+        budget = self.routes[stage].get("latency_budget")
+        p90 = metrics.percentile(name, 90, window=LATENCY_WINDOW)
+        if budget and p90 is not None and p90 > budget:
+            metrics.incr(f"{name}.over_budget")
+            with self._lock:
+                self._benched_until[key] = time.monotonic() + COOLDOWN_SECONDS
+
+    def invoke(self, stage, prompt, hedge=False, timeout=None, budget=None, **call_kwargs):
+        """Run prompt through the stage's models in order until one succeeds
+
+        With hedge=True a duplicate request is sent when a call runs past the
+        stage's recent p95 latency, and the first response wins. timeout caps
+        each attempt; it defaults to the route's timeout. Every request sent,
+        fallbacks and hedges included, is charged to budget (an
+        AnalysisBudget); requests it cannot cover are not sent, and if the
+        first cannot be, BudgetExceededError is raised without counting
+        against the circuit breaker. Extra keyword arguments are passed to
+        the API call (e.g. response_format).
+        """
+        prompt_tokens = estimate_tokens(prompt) if budget else 0
+        breaker = self.breaker(stage)
+        if not breaker.allow():
+            metrics.incr(f"llm.{stage}.circuit_open")
+            raise CircuitOpenError(f"circuit open for {stage}")
+
+        timeout = timeout or self.routes[stage].get("timeout") or 60
+        last_error = None
+        before_hedge = (lambda: budget.try_charge(1, prompt_tokens)) if budget else None
+        for model in self.candidates(stage):
+            if budget and not budget.try_charge(1, prompt_tokens):
+                metrics.incr(f"llm.{stage}.over_budget")
+                if last_error is None:
+                    # Nothing was sent, so the models are not at fault
+                    breaker.release()
+                    raise BudgetExceededError(budget.short_of(1, prompt_tokens) or "calls")
+                break
+            llm = self.chat_model(stage, model)
+            if call_kwargs:
+                llm = llm.bind(**call_kwargs)
+            start = time.perf_counter()
+            try:
+                if hedge:
+                    response = hedged_call(
+                        _hedge_pool, lambda: llm.invoke(prompt), self.hedge_delay(stage, model), timeout,
+                        budget=_hedge_budget, before_hedge=before_hedge
+                    )
+                else:
+                    response = llm.invoke(prompt)
+            except Exception as e:
+                self._record(stage, model, error=e)
+                print(f"Model {model} failed for {stage}: {e}")
+                last_error = e
+                continue
+            self._record(stage, model, elapsed=time.perf_counter() - start)
+            breaker.record_success()
+            if budget:
+                budget.charge(tokens=estimate_tokens(response.content))
+            return response
+
+        breaker.record_failure()
+        raise last_error
+
+    def stream(self, stage, prompt, **call_kwargs):
+        """Yield the response text in chunks as the model produces them
+
+        Falls back to the next model only if a model fails before its first
+        chunk; once text has been yielded, errors propagate to the caller.
+        Streams serve follow-ups after an analysis (Q&A, improvements,
+        rewrites) and are not charged to any AnalysisBudget.
+        """
+        breaker = self.breaker(stage)
+        if not breaker.allow():
+            metrics.incr(f"llm.{stage}.circuit_open")
+            raise CircuitOpenError(f"circuit open for {stage}")
+
+        last_error = None
+        for model in self.candidates(stage):
+            llm = self.chat_model(stage, model)
+            if call_kwargs:
+                llm = llm.bind(**call_kwargs)
+            start = time.perf_counter()
+            started = False
+            try:
+                for chunk in llm.stream(prompt):
+                    if not chunk.content:
+                        continue
+                    if not started:
+                        started = True
+                        metrics.observe(f"llm.{stage}.{model}.first_token", time.perf_counter() - start)
+                    yield chunk.content
+            except GeneratorExit:
+                # The consumer stopped reading (a rerun, an early break) after text arrived, so the
+                # model was healthy; settle the breaker so a half-open trial slot is not held forever
+                breaker.record_success()
+                raise
+            except Exception as e:
+                self._record(stage, model, error=e)
+                if started:
+                    breaker.record_failure()
+                    raise
+                print(f"Model {model} failed for {stage}: {e}")
+                last_error = e
+                continue
+            self._record(stage, model, elapsed=time.perf_counter() - start)
+            breaker.record_success()
+            return
+
+        breaker.record_failure()
+        raise last_error
+
+    def structured_kwargs(self, stage, schema_name):
+        """API arguments requesting schema-constrained output, where the stage's route allows it"""
+        if self.routes[stage].get("structured_outputs", True):
+            return {"response_format": schemas.response_format(schema_name)}
+        return {}
+
+    def invoke_structured(self, stage, prompt, schema_name, hedge=False, timeout=None, budget=None):
+        """Run prompt with a JSON-schema response format and return the typed result
+
+        Malformed output is fixed locally where possible, then by a short repair
+        call that only sees the broken output. Returns None if both fail.
+        """
+        call_kwargs = self.structured_kwargs(stage, schema_name)
+        text = self.invoke(stage, prompt, hedge=hedge, timeout=timeout, budget=budget, **call_kwargs).content
+        return self.parse_structured(stage, schema_name, text, budget)
+
+    def parse_structured(self, stage, schema_name, text, budget=None):
+        """Parse model output against schema_name, repairing it if needed; None if that fails
+
+        The repair call is charged to budget, and skipped if budget cannot cover it.
+        """
+        result, errors = schemas.parse(text, schema_name)
+        if result is not None:
+            metrics.incr(f"structured.{schema_name}.parsed")
+            return result
+
+        metrics.incr(f"structured.{schema_name}.parse_failures")
+        print(f"Structured output for {stage} failed validation: {errors[:3]}")
+        try:
+            repair_kwargs = self.structured_kwargs("repair", schema_name)
+            repaired = self.invoke(
+                "repair", schemas.repair_prompt(schema_name, text, errors), budget=budget, **repair_kwargs
+            ).content
+            result, errors = schemas.parse(repaired, schema_name)
+        except Exception as e:
+            errors = [str(e)]
+
+        if result is not None:
+            metrics.incr(f"structured.{schema_name}.llm_repair")
+            return result
+        metrics.incr(f"structured.{schema_name}.unrecovered")
+        print(f"Could not repair structured output for {stage}: {errors[:3]}")
+        return None
+
+    def stream_structured(self, stage, prompt, schema_name):
+        """Yield the items of a single-array schema as each one finishes streaming
+
+        If nothing usable streams, the whole output goes through
+        parse_structured, repair included.
+        """
+        chunks = []
+
+        def text():
+            for chunk in self.stream(stage, prompt, **self.structured_kwargs(stage, schema_name)):
+                chunks.append(chunk)
+                yield chunk
+
+        streamed = 0
+        for item in schemas.iter_array_items(text(), schema_name):
+            streamed += 1
+            yield item
+        if streamed:
+            metrics.incr(f"structured.{schema_name}.streamed_items", streamed)
+            return
+
+        result = self.parse_structured(stage, schema_name, "".join(chunks))
+        if result is not None:
+            yield from getattr(result, schemas.array_key(schema_name))
@@ -0,0 +1,361 @@
+import json
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import metrics
+
+# JSON schemas sent as OpenAI structured-output response formats. They use the
+# strict subset: every property required, no additional properties.
+STRING_LIST = {"type": "array", "items": {"type": "string"}}
+
+SCHEMAS = {
+    "skill_list": {
+        "type": "object",
+        "properties": {"skills": STRING_LIST},
+        "required": ["skills"],
+        "additionalProperties": False,
+    },
+    "skill_scores": {
+        "type": "object",
+        "properties": {
+            "scores": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "skill": {"type": "string"},
+                        "score": {"type": "integer"},
+                        "reasoning": {"type": "string"},
+                    },
+                    "required": ["skill", "score", "reasoning"],
+                    "additionalProperties": False,
+                },
+            },
+        },
+        "required": ["scores"],
+        "additionalProperties": False,
+    },
+    "weakness": {
+        "type": "object",
+        "properties": {
+            "weakness": {"type": "string"},
+            "improvement_suggestions": STRING_LIST,
+            "example_addition": {"type": "string"},
+        },
+        "required": ["weakness", "improvement_suggestions", "example_addition"],
+        "additionalProperties": False,
+    },
+    "interview_questions": {
+        "type": "object",
+        "properties": {
+            "questions": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "type": {"type": "string"},
+                        "skill": {"type": "string"},
+                        "question": {"type": "string"},
+                        "generic_question": {"type": "string"},
+                    },
+                    "required": ["type", "skill", "question", "generic_question"],
+                    "additionalProperties": False,
+                },
+            },
+        },
+        "required": ["questions"],
+        "additionalProperties": False,
+    },
+    "personalized_questions": {
+        "type": "object",
+        "properties": {"questions": STRING_LIST},
+        "required": ["questions"],
+        "additionalProperties": False,
+    },
+    "improvements": {
+        "type": "object",
+        "properties": {
+            "improvements": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "area": {"type": "string"},
+                        "description": {"type": "string"},
+                        "specific": STRING_LIST,
+                        "before_after": {
+                            "anyOf": [
+                                {
+                                    "type": "object",
+                                    "properties": {"before": {"type": "string"}, "after": {"type": "string"}},
+                                    "required": ["before", "after"],
+                                    "additionalProperties": False,
+                                },
+                                {"type": "null"},
+                            ]
+                        },
+                    },
+                    "required": ["area", "description", "specific", "before_after"],
+                    "additionalProperties": False,
+                },
+            },
+        },
+        "required": ["improvements"],
+        "additionalProperties": False,
+    },
+}
+
+
+@dataclass
+class SkillList:
+    skills: List[str]
+
+
+@dataclass
+class SkillScore:
+    skill: str
+    score: int
+    reasoning: str = ""
+
+
+@dataclass
+class SkillScores:
+    scores: List[SkillScore]
+
+
+@dataclass
+class WeaknessAnalysis:
+    weakness: str
+    improvement_suggestions: List[str] = field(default_factory=list)
+    example_addition: str = ""
+
+
+@dataclass
+class InterviewQuestion:
+    type: str
+    question: str
+    skill: str = ""
+    generic_question: str = ""
+
+
+@dataclass
+class InterviewQuestions:
+    questions: List[InterviewQuestion]
+
+
+@dataclass
+class PersonalizedQuestions:
+    questions: List[str]
+
+
+@dataclass
+class Improvement:
+    area: str
+    description: str
+    specific: List[str] = field(default_factory=list)
+    before_after: Optional[dict] = None
+
+
+@dataclass
+class Improvements:
+    improvements: List[Improvement]
+
+
+def _build(schema_name, data):
+    if schema_name == "skill_list":
+        return SkillList(**data)
+    if schema_name == "skill_scores":
+        return SkillScores([SkillScore(**s) for s in data["scores"]])
+    if schema_name == "weakness":
+        return WeaknessAnalysis(**data)
+    if schema_name == "interview_questions":
+        return InterviewQuestions([InterviewQuestion(**q) for q in data["questions"]])
+    if schema_name == "personalized_questions":
+        return PersonalizedQuestions(**data)
+    if schema_name == "improvements":
+        return Improvements([Improvement(**i) for i in data["improvements"]])
+    raise KeyError(schema_name)
+
+
+def _build_item(schema_name, data):
+    if schema_name == "skill_scores":
+        return SkillScore(**data)
+    if schema_name == "interview_questions":
+        return InterviewQuestion(**data)
+    if schema_name == "improvements":
+        return Improvement(**data)
+    return data
+
+
+def array_key(schema_name):
+    """The property holding the array of a single-array schema"""
+    return SCHEMAS[schema_name]["required"][0]
+
+
+def iter_array_items(chunks, schema_name):
+    """Yield each item of a single-array schema as soon as its JSON is complete
+
+    chunks is an iterable of text fragments as they stream in. Items that do
+    not validate are skipped, as in validate().
+    """
+    item_schema = SCHEMAS[schema_name]["properties"][array_key(schema_name)]["items"]
+    opener = re.compile(r'"%s"\s*:\s*\[' % array_key(schema_name))
+    buffer = ""
+    pos = -1
+    depth = 0
+    in_string = False
+    escape = False
+    item_start = -1
+
+    for chunk in chunks:
+        buffer += chunk
+        if pos < 0:
+            match = opener.search(buffer)
+            if not match:
+                continue
+            pos = match.end()
+
+        while pos < len(buffer):
+            c = buffer[pos]
+            complete = None
+            if in_string:
+                if escape:
+                    escape = False
+                elif c == "\\":
+                    escape = True
+                elif c == '"':
+                    in_string = False
+                    if depth == 0:
+                        complete = buffer[item_start:pos + 1]
+            elif c == '"':
+                in_string = True
+                if depth == 0:
+                    item_start = pos
+            elif c in "{[":
+                if depth == 0:
+                    item_start = pos
+                depth += 1
+            elif c in "}]":
+                if depth == 0:
+                    return
+                depth -= 1
+                if depth == 0:
+                    complete = buffer[item_start:pos + 1]
+            pos += 1
+
+            if complete is not None:
+                try:
+                    cleaned, errors = validate(json.loads(complete), item_schema)
+                except json.JSONDecodeError:
+                    errors = ["invalid JSON"]
+                if errors:
+                    metrics.incr("structured.dropped_items")
+                    continue
+                yield _build_item(schema_name, cleaned)
+
+
+def response_format(schema_name):
+    """OpenAI response_format for a named schema"""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": schema_name, "strict": True, "schema": SCHEMAS[schema_name]},
+    }
+
+
+def validate(value, schema, path="$"):
+    """Check value against schema, returning (cleaned value, errors)
+
+    Invalid array items are dropped rather than failing the whole document, so
+    one bad question does not cost the other nine.
+    """
+    if "anyOf" in schema:
+        all_errors = []
+        for option in schema["anyOf"]:
+            cleaned, errors = validate(value, option, path)
+            if not errors:
+                return cleaned, []
+            all_errors.extend(errors)
+        return None, all_errors
+
+    expected = schema.get("type")
+    if expected == "null":
+        return (None, []) if value is None else (None, [f"{path}: expected null"])
+    if expected == "string":
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return str(value), []
+        return (value.strip(), []) if isinstance(value, str) else (None, [f"{path}: expected string"])
+    if expected == "integer":
+        try:
+            return int(value), []
+        except (TypeError, ValueError):
+            return None, [f"{path}: expected integer"]
+    if expected == "array":
+        if not isinstance(value, list):
+            return None, [f"{path}: expected array"]
+        items = []
+        for i, item in enumerate(value):
+            cleaned, errors = validate(item, schema["items"], f"{path}[{i}]")
+            if errors:
+                metrics.incr("structured.dropped_items")
+                continue
+            items.append(cleaned)
+        return items, []
+    if expected == "object":
+        if not isinstance(value, dict):
+            return None, [f"{path}: expected object"]
+        cleaned, errors = {}, []
+        for key, subschema in schema["properties"].items():
+            if key not in value:
+                errors.append(f"{path}.{key}: missing")
+                continue
+            cleaned[key], sub_errors = validate(value[key], subschema, f"{path}.{key}")
+            errors.extend(sub_errors)
+        return cleaned, errors
+    return value, []
+
+
+def local_repair(text):
+    """Cheap, model-free fixes for the usual ways JSON comes back malformed"""
+    fenced = re.search(r"```(?:json)?\s*([\s\S]+?)\s*```", text)
+    if fenced:
+        text = fenced.group(1)
+    start = min((i for i in (text.find("{"), text.find("[")) if i >= 0), default=-1)
+    end = max(text.rfind("}"), text.rfind("]"))
+    if start >= 0 and end > start:
+        text = text[start:end + 1]
+    text = text.replace("“", '"').replace("”", '"').replace("’", "'")
+    return re.sub(r",\s*([}\]])", r"\1", text)
+
+
+def parse(text, schema_name):
+    """Parse and validate model output; returns (typed result or None, errors)"""
+    schema = SCHEMAS[schema_name]
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        try:
+            data = json.loads(local_repair(text))
+            metrics.incr(f"structured.{schema_name}.local_repair")
+        except json.JSONDecodeError as e:
+            return None, [f"invalid JSON: {e}"]
+
+    # Models sometimes return the bare list for single-array schemas
+    if isinstance(data, list) and len(schema["required"]) == 1:
+        data = {schema["required"][0]: data}
+
+    cleaned, errors = validate(data, schema)
+    if errors:
+        return None, errors
+    return _build(schema_name, cleaned), []
+
+
+def repair_prompt(schema_name, text, errors):
+    """A short prompt asking a fast model to fix just the malformed output"""
+    return (
+        "The following output was supposed to be JSON matching this schema but failed validation.\n"
+        f"Schema: {json.dumps(SCHEMAS[schema_name])}\n"
+        f"Errors: {'; '.join(errors[:10])}\n"
+        f"Output:\n{text}\n\n"
+        "Return only the corrected JSON. Keep the content; fix only the structure."
+    )
@@ -0,0 +1,50 @@
+from answer_cache import AnswerCache, key_terms
+
+
+class SimilarEmbeddings:
+    """Every question lands almost on the same vector, as entity swaps do with real embeddings"""
+
+    def embed_documents(self, texts):
+        return [[1.0, 0.01 * len(text)] for text in texts]
+
+
+def test_entity_swapped_question_is_not_a_hit():
+    cache = AnswerCache(SimilarEmbeddings(), "resume", model="text-embedding-3-small")
+    cache.store("Does the candidate know Python?", "Yes, five years of Python.")
+
+    answer, _ = cache.lookup("Does the candidate know Java?")
+
+    assert answer is None
+
+
+def test_paraphrase_naming_the_same_entity_is_a_hit():
+    cache = AnswerCache(SimilarEmbeddings(), "resume", model="text-embedding-3-small")
+    cache.store("Does the candidate know Python?", "Yes, five years of Python.")
+
+    answer, _ = cache.lookup("Is the candidate experienced with Python?")
+
+    assert answer == "Yes, five years of Python."
+
+
+def test_vocabulary_terms_are_matched_in_lowercase_questions():
+    assert key_terms("does the candidate know machine learning?", ["Machine Learning"]) == {"machine learning"}
+    assert key_terms("Has the candidate used C++ since 2019?") == {"c++", "2019"}
+
+
+def test_c_family_questions_do_not_share_an_answer():
+    cache = AnswerCache(SimilarEmbeddings(), "resume", model="text-embedding-3-small")
+    cache.store("Does the candidate know C++?", "Yes, C++ at two employers.")
+
+    for question in ("Does the candidate know C#?", "Does the candidate know C?", "Does the candidate know .NET?"):
+        answer, _ = cache.lookup(question)
+        assert answer is None, question
+
+
+def test_exact_repeat_keeps_symbols_in_the_key():
+    cache = AnswerCache(SimilarEmbeddings(), "resume", model="text-embedding-3-small")
+    cache.store("Does the candidate know .NET?", "Yes, .NET Core.")
+    cache.store("Does the candidate know C#?", "Yes, C# and F#.")
+
+    assert cache.lookup("Does the candidate know .NET")[0] == "Yes, .NET Core."
+    assert cache.lookup("Does the candidate know C#?")[0] == "Yes, C# and F#."
+    assert len(cache) == 2
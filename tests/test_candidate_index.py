@@ -0,0 +1,60 @@
+import threading
+
+import numpy as np
+import pytest
+
+from candidate_index import INDEX_KINDS, CandidateIndex
+
+faiss = pytest.importorskip("faiss")
+
+DIMENSIONS = 16
+
+
+def corpus(directory, candidates):
+    """An index with four chunks per candidate, each near its candidate's own direction"""
+    rng = np.random.default_rng(0)
+    index = CandidateIndex(str(directory), dimensions=DIMENSIONS)
+    centers = {}
+    for n in range(candidates):
+        center = rng.normal(size=DIMENSIONS)
+        centers[f"c{n}"] = center
+        index.add(f"c{n}", [f"c{n} chunk {i}" for i in range(4)], center + 0.05 * rng.normal(size=(4, DIMENSIONS)))
+    return index, centers
+
+
+@pytest.mark.parametrize("kind", INDEX_KINDS)
+def test_build_load_search_and_remove(tmp_path, kind):
+    index, centers = corpus(tmp_path, 80)
+    spec = index.build(kind, nprobe=64)
+    assert spec["vectors"] == 320
+    index.close()
+
+    loaded = CandidateIndex(str(tmp_path), dimensions=DIMENSIONS)
+    loaded.load()
+    hits = loaded.search([centers["c7"]], k=3)[0]
+    assert [hit["candidate_id"] for hit in hits] == ["c7"] * 3
+
+    loaded.remove("c7")
+    assert "c7" not in {hit["candidate_id"] for hit in loaded.search([centers["c7"]], k=3)[0]}
+    loaded.close()
+
+
+def test_ivf_pq_on_a_small_corpus_falls_back_to_ivf_flat(tmp_path):
+    index, centers = corpus(tmp_path, 25)
+
+    spec = index.build("ivf_pq")
+
+    assert (spec["requested_kind"], spec["kind"]) == ("ivf_pq", "ivf_flat")
+    assert index.search([centers["c3"]], k=1)[0][0]["candidate_id"] == "c3"
+
+
+def test_search_from_another_thread(tmp_path):
+    index, centers = corpus(tmp_path, 10)
+    index.build("flat")
+    results = []
+
+    thread = threading.Thread(target=lambda: results.append(index.search([centers["c2"]], k=1)))
+    thread.start()
+    thread.join()
+
+    assert results[0][0][0]["candidate_id"] == "c2"
@@ -0,0 +1,21 @@
+import gzip
+import json
+
+import cassette
+
+
+def test_gzip_cassette_from_a_killed_recording_loads_its_finished_entries(tmp_path):
+    recording = str(tmp_path / "recording.jsonl.gz")
+    f = gzip.open(recording, "at", encoding="utf-8")
+    for key in ("a", "b"):
+        f.write(json.dumps({"key": key}) + "\n")
+        f.flush()
+    f.write('{"key": "c')
+    f.flush()
+    # What a killed recorder leaves behind: flushed lines, a half-written entry and no gzip trailer
+    path = str(tmp_path / "killed.jsonl.gz")
+    with open(recording, "rb") as raw, open(path, "wb") as out:
+        out.write(raw.read())
+    f.close()
+
+    assert sorted(cassette.load(path)) == ["a", "b"]
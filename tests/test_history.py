@@ -0,0 +1,54 @@
+import sqlite3
+
+from history import AnalysisRepository, owner_key
+
+RESULT = {"overall_score": 80, "selected": True, "skill_scores": {"Python": 8}, "skill_reasoning": {}}
+
+
+def test_history_is_scoped_to_its_owner(tmp_path):
+    history = AnalysisRepository(str(tmp_path / "history.db"))
+    alice, bob = owner_key("key-a"), owner_key("key-b")
+    analysis_id = history.save_analysis("resume", ["Python"], RESULT, role="Dev", scoring_mode="llm", owner=alice)
+
+    assert [entry["id"] for entry in history.recent(owner=alice)] == [analysis_id]
+    assert history.recent(owner=bob) == []
+    assert history.load_analysis(analysis_id, owner=bob) is None
+    assert history.find_analysis("resume", ["Python"], scoring_mode="llm", owner=bob) is None
+    assert history.find_analysis("resume", ["Python"], scoring_mode="llm", owner=alice) == analysis_id
+
+
+def test_find_analysis_skips_other_modes_and_degraded_runs(tmp_path):
+    history = AnalysisRepository(str(tmp_path / "history.db"))
+    owner = owner_key("key")
+    history.save_analysis("resume", ["Python"], {**RESULT, "degraded": True}, scoring_mode="llm", owner=owner)
+
+    assert history.find_analysis("resume", ["Python"], scoring_mode="llm", owner=owner) is None
+    analysis_id = history.save_analysis("resume", ["Python"], RESULT, scoring_mode="vector", owner=owner)
+    assert history.find_analysis("resume", ["Python"], scoring_mode="llm", owner=owner) is None
+    assert history.find_analysis("resume", ["Python"], scoring_mode="vector", owner=owner) == analysis_id
+
+
+def test_older_databases_gain_the_new_columns(tmp_path):
+    path = str(tmp_path / "history.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE analyses (id INTEGER PRIMARY KEY, candidate_id INTEGER NOT NULL, jd_id INTEGER NOT NULL, "
+        "overall_score INTEGER NOT NULL, selected INTEGER NOT NULL, result TEXT NOT NULL, created_at REAL NOT NULL)"
+    )
+    conn.commit()
+    conn.close()
+
+    history = AnalysisRepository(path)
+    assert history.save_analysis("resume", ["Python"], RESULT, owner=owner_key("key"))
+
+
+def test_load_analysis_returns_the_skills_it_was_scored_on(tmp_path):
+    history = AnalysisRepository(str(tmp_path / "history.db"))
+    owner = owner_key("key")
+    first = history.save_analysis("resume", ["Python"], RESULT, jd_text="Backend JD", owner=owner)
+    second = history.save_analysis(
+        "resume", ["Python", "Go"], {**RESULT, "skill_scores": {"Python": 8, "Go": 5}}, jd_text="Backend JD", owner=owner
+    )
+
+    assert history.load_analysis(first, owner=owner)[1] == ["Python"]
+    assert history.load_analysis(second, owner=owner)[1] == ["Python", "Go"]
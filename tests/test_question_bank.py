@@ -0,0 +1,28 @@
+import numpy as np
+
+from question_bank import QuestionBank
+
+MODEL = "text-embedding-3-small"
+
+
+def test_pick_spreads_questions_across_types(tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank.db"))
+    skills = ["Python", "SQL", "Docker", "AWS", "Kubernetes", "Go"]
+    vectors = np.eye(len(skills) * 2, dtype=np.float32)
+    for i, skill in enumerate(skills):
+        bank.add(skill, "Basic", "Medium", f"What is {skill}?", vectors[2 * i], MODEL)
+        bank.add(skill, "Technical", "Medium", f"How does {skill} work internally?", vectors[2 * i + 1], MODEL)
+
+    picked = bank.pick(skills, ["Basic", "Technical"], "Medium", 5)
+
+    assert len(picked) == 5
+    assert {question_type for question_type, _, _ in picked} == {"Basic", "Technical"}
+
+
+def test_entity_swapped_question_is_not_a_duplicate(tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank.db"))
+    vector = np.ones(4, dtype=np.float32)
+
+    assert bank.add("Cloud", "Technical", "Medium", "How would you deploy a service on AWS?", vector, MODEL)
+    assert bank.add("Cloud", "Technical", "Medium", "How would you deploy a service on GCP?", vector, MODEL)
+    assert not bank.add("Cloud", "Technical", "Medium", "How do you deploy a service on AWS?", vector, MODEL)
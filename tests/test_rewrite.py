@@ -0,0 +1,39 @@
+from rewrite import split_resume_sections
+
+RESUME = """JANE DOE
+jane@example.com
+
+EXPERIENCE
+SENIOR ENGINEER
+Acme 2019-2023
+AWS, GCP, SQL
+Built things.
+
+OPEN SOURCE
+Maintainer of X.
+HOBBIES:
+Chess
+"""
+
+
+def test_caps_lines_inside_a_section_do_not_split_it():
+    headings = [heading for heading, _ in split_resume_sections(RESUME)]
+
+    assert headings == [None, "EXPERIENCE", "OPEN SOURCE", "HOBBIES"]
+
+
+def test_bullets_and_body_lines_naming_a_section_do_not_split_it():
+    resume = """Jane Doe
+
+Work Experience
+Acme 2019-2023
+- Delivered 12 client projects
+- Ran internal training
+About 5 years of Python work
+
+Technical Skills:
+Python
+"""
+    headings = [heading for heading, _ in split_resume_sections(resume)]
+
+    assert headings == [None, "Work Experience", "Technical Skills"]
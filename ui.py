@@ -1,9 +1,39 @@
 
 import streamlit as st
-import pandas as pd
 import base64
 import io
-import matplotlib.pyplot as plt
+import time
+import metrics
+import profiling
+import charts
+
+# Defaults shared with the prefetch scheduler so prefetched results match a first click
+EXAMPLE_QUESTIONS = [
+    "What is the candidate's most recent role?",
+    "How many years of experience does the candidate have with Python?",
+    "What educational qualifications does the candidate have?",
+    "What are the candidate's key achievements?",
+    "Has the candidate managed teams before?",
+    "What projects has the candidate worked on?",
+    "Does the candidate have experience with cloud technologies?"
+]
+QUESTION_TYPES = ["Basic", "Technical", "Experience", "Scenario", "Coding", "Behavioral"]
+DEFAULT_QUESTION_TYPES = ["Basic", "Technical"]
+DEFAULT_DIFFICULTY = "Medium"
+DEFAULT_NUM_QUESTIONS = 5
+IMPROVEMENT_AREAS = ["Content", "Format", "Skills Highlighting", "Experience Description", "Education", "Projects", "Achievements", "Overall Structure"]
+DEFAULT_IMPROVEMENT_AREAS = ["Content", "Skills Highlighting"]
+
+REGENERATE_HELP = "Ignore the saved result for these settings and replace it with a new one."
+
+# How each budget degradation step is described to the user
+BUDGET_STEPS = {
+    "batched_scoring": "Scored together in one call",
+    "vector_scoring": "Scored by embedding similarity",
+    "lexical_scoring": "Scored by keyword match",
+    "out_of_time": "Not scored by the model in time",
+    "weaknesses_skipped": "Weakness details skipped",
+}
 
 def setup_page():
     """Apply custom CSS and setup page (without setting page config)"""
@@ -240,6 +270,28 @@ def setup_sidebar():
         
         st.markdown("---")
         
+        st.subheader("Performance")
+        scoring_mode = st.radio(
+            "Skill scoring", ["llm", "vector"],
+            format_func=lambda mode: "LLM per skill" if mode == "llm" else "Embedding similarity",
+            help="Embedding similarity scores most skills with one matrix multiply and only asks the LLM about borderline ones."
+        )
+        prefetch = st.checkbox(
+            "Prefetch other tabs after analysis", value=False,
+            help="Generates default interview questions, improvements and example answers in the background."
+        )
+        profile = st.checkbox(
+            "Profile requests", value=False,
+            help="Writes a CPU profile and the top memory allocations of each request to the profile directory."
+        )
+        with st.expander("Diagnostics"):
+            st.json(metrics.snapshot())
+            if profiling.recent:
+                st.caption(f"Recent profiles in {profiling.PROFILE_DIR}")
+                st.json(list(profiling.recent)[::-1])
+        
+        st.markdown("---")
+        
         st.markdown("""
         <div style="text-align: center; margin-top: 20px;">
             <p>🚀 Euron Recruitment Agent</p>
@@ -249,11 +301,34 @@ def setup_sidebar():
         
         return {
             "openai_api_key": openai_api_key,
-            "theme_color": theme_color
+            "theme_color": theme_color,
+            "prefetch": prefetch,
+            "profile": profile,
+            "scoring_mode": scoring_mode
         }
 
 
 
+def analysis_history_section(entries):
+    """List stored analyses in the sidebar; returns the id to load when the button is pressed"""
+    with st.sidebar:
+        with st.expander("📂 Past Analyses"):
+            if not entries:
+                st.caption("No analyses stored yet.")
+                return None
+            labels = {
+                entry["id"]: (
+                    f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['created_at']))} · "
+                    f"{entry['role'] or 'Custom JD'} · {entry['overall_score']}/100 · {entry['content_hash'][:8]}"
+                )
+                for entry in entries
+            }
+            analysis_id = st.selectbox("Analysis", list(labels), format_func=labels.get)
+            if st.button("Load analysis"):
+                return analysis_id
+    return None
+
+
 def role_selection_section(role_requirements):
     st.markdown('<div class="card">', unsafe_allow_html=True)
     
@@ -296,56 +371,7 @@ def resume_upload_section():
 
 
 
-def create_score_pie_chart(score):
-    """Create a professional pie chart for the score visualization"""
-    fig, ax = plt.subplots(figsize=(4, 4), facecolor='#111111')
-    
-    # Data
-    sizes = [score, 100 - score]
-    labels = ['', '']  # We'll use annotation instead
-    colors = ["#d32f2f", "#333333"]
-    explode = (0.05, 0)  # explode the 1st slice (Score)
-    
-    # Plot
-    wedges, texts = ax.pie(
-        sizes, 
-        labels=labels, 
-        colors=colors,
-        explode=explode, 
-        startangle=90,
-        wedgeprops={'width': 0.5, 'edgecolor': 'black', 'linewidth': 1}
-    )
-    
-    # Draw a circle in the center to make it a donut chart
-    centre_circle = plt.Circle((0, 0), 0.25, fc='#111111')
-    ax.add_artist(centre_circle)
-    
-    # Equal aspect ratio ensures that pie is drawn as a circle
-    ax.set_aspect('equal')
-    
-    # Add score text in the center
-    ax.text(0, 0, f"{score}%", 
-            ha='center', va='center', 
-            fontsize=24, fontweight='bold', 
-            color='white')
-    
-    # Add pass/fail indicator
-    status = "PASS" if score >= 75 else "FAIL"
-    status_color = "#4CAF50" if score >= 75 else "#d32f2f"
-    ax.text(0, -0.15, status, 
-            ha='center', va='center', 
-            fontsize=14, fontweight='bold', 
-            color=status_color)
-    
-    # Set the background color
-    ax.set_facecolor('#111111')
-    
-    return fig
-
-
-
-
-def display_analysis_results(analysis_result):
+def display_analysis_results(analysis_result, theme_color="#d32f2f", cutoff=75):
     if not analysis_result:
         return
 
@@ -365,8 +391,8 @@ def display_analysis_results(analysis_result):
 
     with col1:
         st.metric("Overall Score", f"{overall_score}/100")
-        fig = create_score_pie_chart(overall_score)
-        st.pyplot(fig)
+        gauge = charts.score_gauge_svg(overall_score, theme_color, cutoff)
+        st.markdown(f'<div class="pie-chart-container">{gauge}</div>', unsafe_allow_html=True)
 
     with col2:
         if selected:
@@ -374,9 +400,32 @@ def display_analysis_results(analysis_result):
         else:
             st.markdown("<h2 style='color:#d32f2f;'>❌ Unfortunately, you were not selected.</h2>", unsafe_allow_html=True)
         st.write(analysis_result.get('reasoning', ''))
+        if analysis_result.get("degraded"):
+            degraded_skills = analysis_result.get("degraded_skills", [])
+            skipped = analysis_result.get("weaknesses_skipped", [])
+            if degraded_skills:
+                st.warning(f"⏱️ Scored without the model (keyword or embedding match) because it failed, was too slow or was over budget: {', '.join(degraded_skills)}")
+            if skipped:
+                st.warning(f"⏱️ Detailed weakness analysis skipped for: {', '.join(skipped)}")
+        spend = analysis_result.get("budget")
+        if spend and spend.get("degradations"):
+            limits = ", ".join(f"{value} {name}" for name, value in spend["limits"].items() if value)
+            steps = "; ".join(
+                f"{BUDGET_STEPS.get(d['step'], d['step'])} ({d['reason']} limit): {', '.join(d['skills'])}"
+                for d in spend["degradations"]
+            )
+            st.info(f"💰 Kept within the analysis budget ({limits}): {steps}")
+        if analysis_result.get("reused_skills"):
+            st.info(f"♻️ Near-duplicate of an earlier resume; reused scores for: {', '.join(analysis_result['reused_skills'])}")
 
     st.markdown('<hr>', unsafe_allow_html=True)
 
+    if skill_scores:
+        st.subheader("📈 Skill Scores")
+        bars = charts.skill_bars_svg(tuple(skill_scores.items()), theme_color)
+        st.markdown(f'<div class="pie-chart-container">{bars}</div>', unsafe_allow_html=True)
+        st.markdown('<hr>', unsafe_allow_html=True)
+
     st.markdown('<div class="strengths-improvements">', unsafe_allow_html=True)
 
     # Strengths
@@ -492,7 +541,7 @@ Status: {"✅ Shortlisted" if selected else "❌ Not Selected"}
 
 
 
-def resume_qa_section(has_resume, ask_question_func=None):
+def resume_qa_section(has_resume, ask_question_func=None, stream_answer_func=None):
     if not has_resume:
         st.warning("Please upload and analyze a resume first.")
         return
@@ -502,7 +551,11 @@ def resume_qa_section(has_resume, ask_question_func=None):
     st.subheader("Ask Questions About the Resume")
     user_question = st.text_input("Enter your question about the resume:", placeholder="What is the candidate's most recent experience?")
     
-    if user_question and ask_question_func:
+    if user_question and stream_answer_func:
+        st.markdown('<div style="background-color: #111122; padding: 15px; border-radius: 5px; border-left: 5px solid #d32f2f;">', unsafe_allow_html=True)
+        st.write_stream(stream_answer_func(user_question))
+        st.markdown('</div>', unsafe_allow_html=True)
+    elif user_question and ask_question_func:
         with st.spinner("Searching resume and generating response..."):
             response = ask_question_func(user_question)
             
@@ -512,17 +565,7 @@ def resume_qa_section(has_resume, ask_question_func=None):
     
     # Add example questions
     with st.expander("Example Questions"):
-        example_questions = [
-            "What is the candidate's most recent role?",
-            "How many years of experience does the candidate have with Python?",
-            "What educational qualifications does the candidate have?",
-            "What are the candidate's key achievements?",
-            "Has the candidate managed teams before?",
-            "What projects has the candidate worked on?",
-            "Does the candidate have experience with cloud technologies?"
-        ]
-        
-        for question in example_questions:
+        for question in EXAMPLE_QUESTIONS:
             if st.button(question, key=f"q_{question}"):
                 st.session_state.current_question = question
                 st.experimental_rerun()
@@ -541,23 +584,24 @@ def interview_questions_section(has_resume, generate_questions_func=None):
     with col1:
         question_types = st.multiselect(
             "Select question types:",
-            ["Basic", "Technical", "Experience", "Scenario", "Coding", "Behavioral"],
-            default=["Basic", "Technical"]
+            QUESTION_TYPES,
+            default=DEFAULT_QUESTION_TYPES
         )
     
     with col2:
         difficulty = st.select_slider(
             "Question difficulty:",
             options=["Easy", "Medium", "Hard"],
-            value="Medium"
+            value=DEFAULT_DIFFICULTY
         )
     
-    num_questions = st.slider("Number of questions:", 3, 15, 5)
+    num_questions = st.slider("Number of questions:", 3, 15, DEFAULT_NUM_QUESTIONS)
+    regenerate = st.checkbox("Regenerate", key="regenerate_questions", help=REGENERATE_HELP)
     
     if st.button("Generate Interview Questions"):
         if generate_questions_func:
             with st.spinner("Generating personalized interview questions..."):
-                questions = generate_questions_func(question_types, difficulty, num_questions)
+                questions = generate_questions_func(question_types, difficulty, num_questions, regenerate)
                 
                 # Create content for download
                 download_content = f"# Euron Recruitment - Interview Questions\n\n"
@@ -591,7 +635,31 @@ def interview_questions_section(has_resume, generate_questions_func=None):
     
     st.markdown('</div>', unsafe_allow_html=True)
 
-def resume_improvement_section(has_resume, improve_resume_func=None):
+def render_improvement(area, suggestions):
+    """Show one improvement area with its suggestions and before/after example"""
+    with st.expander(f"Improvements for {area}", expanded=True):
+        st.markdown(f"<p>{suggestions['description']}</p>", unsafe_allow_html=True)
+        
+        st.subheader("Specific Suggestions")
+        for i, suggestion in enumerate(suggestions["specific"]):
+            st.markdown(f'<div class="solution-detail"><strong>{i+1}.</strong> {suggestion}</div>', unsafe_allow_html=True)
+        
+        if "before_after" in suggestions:
+            st.markdown('<div class="comparison-container">', unsafe_allow_html=True)
+            
+            st.markdown('<div class="comparison-box">', unsafe_allow_html=True)
+            st.markdown("<strong>Before:</strong>", unsafe_allow_html=True)
+            st.markdown(f"<pre>{suggestions['before_after']['before']}</pre>", unsafe_allow_html=True)
+            st.markdown('</div>', unsafe_allow_html=True)
+            
+            st.markdown('<div class="comparison-box">', unsafe_allow_html=True)
+            st.markdown("<strong>After:</strong>", unsafe_allow_html=True) 
+            st.markdown(f"<pre>{suggestions['before_after']['after']}</pre>", unsafe_allow_html=True)
+            st.markdown('</div>', unsafe_allow_html=True)
+            
+            st.markdown('</div>', unsafe_allow_html=True)
+
+def resume_improvement_section(has_resume, improve_resume_func=None, stream_improvements_func=None):
     if not has_resume:
         st.warning("Please upload and analyze a resume first.")
         return
@@ -600,70 +668,58 @@ def resume_improvement_section(has_resume, improve_resume_func=None):
     
     improvement_areas = st.multiselect(
         "Select areas to improve:",
-        ["Content", "Format", "Skills Highlighting", "Experience Description", "Education", "Projects", "Achievements", "Overall Structure"],
-        default=["Content", "Skills Highlighting"]
+        IMPROVEMENT_AREAS,
+        default=DEFAULT_IMPROVEMENT_AREAS
     )
     
     target_role = st.text_input("Target role (optional):", placeholder="e.g., Senior Data Scientist at Google")
+    regenerate = st.checkbox("Regenerate", key="regenerate_improvements", help=REGENERATE_HELP)
     
     if st.button("Generate Resume Improvements"):
-        if improve_resume_func:
-            with st.spinner("Analyzing and generating improvements..."):
-                improvements = improve_resume_func(improvement_areas, target_role)
-                
-                # Create content for download
-                download_content = f"# Euron Recruitment - Resume Improvement Suggestions\n\nTarget Role: {target_role if target_role else 'Not specified'}\n\n"
-                
+        if stream_improvements_func or improve_resume_func:
+            if stream_improvements_func:
+                # Each area renders as soon as its JSON object has streamed in
+                improvements = {}
+                for area, suggestions in stream_improvements_func(improvement_areas, target_role, regenerate):
+                    improvements[area] = suggestions
+                    render_improvement(area, suggestions)
+            else:
+                with st.spinner("Analyzing and generating improvements..."):
+                    improvements = improve_resume_func(improvement_areas, target_role, regenerate)
                 for area, suggestions in improvements.items():
-                    with st.expander(f"Improvements for {area}", expanded=True):
-                        st.markdown(f"<p>{suggestions['description']}</p>", unsafe_allow_html=True)
-                        
-                        st.subheader("Specific Suggestions")
-                        for i, suggestion in enumerate(suggestions["specific"]):
-                            st.markdown(f'<div class="solution-detail"><strong>{i+1}.</strong> {suggestion}</div>', unsafe_allow_html=True)
-                        
-                        if "before_after" in suggestions:
-                            st.markdown('<div class="comparison-container">', unsafe_allow_html=True)
-                            
-                            st.markdown('<div class="comparison-box">', unsafe_allow_html=True)
-                            st.markdown("<strong>Before:</strong>", unsafe_allow_html=True)
-                            st.markdown(f"<pre>{suggestions['before_after']['before']}</pre>", unsafe_allow_html=True)
-                            st.markdown('</div>', unsafe_allow_html=True)
-                            
-                            st.markdown('<div class="comparison-box">', unsafe_allow_html=True)
-                            st.markdown("<strong>After:</strong>", unsafe_allow_html=True) 
-                            st.markdown(f"<pre>{suggestions['before_after']['after']}</pre>", unsafe_allow_html=True)
-                            st.markdown('</div>', unsafe_allow_html=True)
-                            
-                            st.markdown('</div>', unsafe_allow_html=True)
-                    
-                    # Add to download content
-                    download_content += f"## Improvements for {area}\n\n"
-                    download_content += f"{suggestions['description']}\n\n"
-                    download_content += "### Specific Suggestions\n\n"
-                    for i, suggestion in enumerate(suggestions["specific"]):
-                        download_content += f"{i+1}. {suggestion}\n"
-                    download_content += "\n"
-                    
-                    if "before_after" in suggestions:
-                        download_content += "### Before\n\n"
-                        download_content += f"```\n{suggestions['before_after']['before']}\n```\n\n"
-                        download_content += "### After\n\n"
-                        download_content += f"```\n{suggestions['before_after']['after']}\n```\n\n"
-                
-                # Add Euron branding to download content
-                download_content += "\n---\nProvided by Euron Recruitment Agent"
+                    render_improvement(area, suggestions)
+
+            # Create content for download
+            download_content = f"# Euron Recruitment - Resume Improvement Suggestions\n\nTarget Role: {target_role if target_role else 'Not specified'}\n\n"
+            
+            for area, suggestions in improvements.items():
+                # Add to download content
+                download_content += f"## Improvements for {area}\n\n"
+                download_content += f"{suggestions['description']}\n\n"
+                download_content += "### Specific Suggestions\n\n"
+                for i, suggestion in enumerate(suggestions["specific"]):
+                    download_content += f"{i+1}. {suggestion}\n"
+                download_content += "\n"
                 
-                # Add download button
-                st.markdown("---")
-                report_bytes = download_content.encode()
-                b64 = base64.b64encode(report_bytes).decode()
-                href = f'<a class="download-btn" href="data:text/markdown;base64,{b64}" download="euron_resume_improvements.md">📝 Download All Suggestions</a>'
-                st.markdown(href, unsafe_allow_html=True)
+                if "before_after" in suggestions:
+                    download_content += "### Before\n\n"
+                    download_content += f"```\n{suggestions['before_after']['before']}\n```\n\n"
+                    download_content += "### After\n\n"
+                    download_content += f"```\n{suggestions['before_after']['after']}\n```\n\n"
+            
+            # Add Euron branding to download content
+            download_content += "\n---\nProvided by Euron Recruitment Agent"
+            
+            # Add download button
+            st.markdown("---")
+            report_bytes = download_content.encode()
+            b64 = base64.b64encode(report_bytes).decode()
+            href = f'<a class="download-btn" href="data:text/markdown;base64,{b64}" download="euron_resume_improvements.md">📝 Download All Suggestions</a>'
+            st.markdown(href, unsafe_allow_html=True)
     
     st.markdown('</div>', unsafe_allow_html=True)
 
-def improved_resume_section(has_resume, get_improved_resume_func=None):
+def improved_resume_section(has_resume, get_improved_resume_func=None, stream_improved_resume_func=None):
     if not has_resume:
         st.warning("Please upload and analyze a resume first.")
         return
@@ -672,38 +728,46 @@ def improved_resume_section(has_resume, get_improved_resume_func=None):
     
     target_role = st.text_input("Target role:", placeholder="e.g., Senior Software Engineer")
     highlight_skills = st.text_area("Paste your JD to get updated Resume", placeholder="e.g., Python, React, Cloud Architecture")
+    regenerate = st.checkbox("Regenerate", key="regenerate_resume", help=REGENERATE_HELP)
     
     if st.button("Generate Improved Resume"):
-        if get_improved_resume_func:
-            with st.spinner("Creating improved resume..."):
-                improved_resume = get_improved_resume_func(target_role, highlight_skills)
-                
-                st.subheader("Improved Resume")
+        if stream_improved_resume_func or get_improved_resume_func:
+            st.subheader("Improved Resume")
+            if stream_improved_resume_func:
+                # Show the text as it is written, then swap in the editable box
+                placeholder = st.empty()
+                with placeholder.container():
+                    improved_resume = st.write_stream(stream_improved_resume_func(target_role, highlight_skills, regenerate)).strip()
+                placeholder.text_area("", improved_resume, height=400)
+            else:
+                with st.spinner("Creating improved resume..."):
+                    improved_resume = get_improved_resume_func(target_role, highlight_skills, regenerate)
                 st.text_area("", improved_resume, height=400)
-                
-                # Download buttons
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    # Text file download
-                    resume_bytes = improved_resume.encode()
-                    b64 = base64.b64encode(resume_bytes).decode()
-                    href = f'<a class="download-btn" href="data:file/txt;base64,{b64}" download="euron_improved_resume.txt">📄 Download as TXT</a>'
-                    st.markdown(href, unsafe_allow_html=True)
-                
-                with col2:
-                    # Markdown file download
-                    md_content = f"""# {target_role if target_role else 'Professional'} Resume
+
+            
+            # Download buttons
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                # Text file download
+                resume_bytes = improved_resume.encode()
+                b64 = base64.b64encode(resume_bytes).decode()
+                href = f'<a class="download-btn" href="data:file/txt;base64,{b64}" download="euron_improved_resume.txt">📄 Download as TXT</a>'
+                st.markdown(href, unsafe_allow_html=True)
+            
+            with col2:
+                # Markdown file download
+                md_content = f"""# {target_role if target_role else 'Professional'} Resume
 
 {improved_resume}
 
 ---
 Resume enhanced by Euron Recruitment Agent
 """
-                    md_bytes = md_content.encode()
-                    md_b64 = base64.b64encode(md_bytes).decode()
-                    md_href = f'<a class="download-btn" href="data:text/markdown;base64,{md_b64}" download="euron_improved_resume.md">📝 Download as Markdown</a>'
-                    st.markdown(md_href, unsafe_allow_html=True)
+                md_bytes = md_content.encode()
+                md_b64 = base64.b64encode(md_bytes).decode()
+                md_href = f'<a class="download-btn" href="data:text/markdown;base64,{md_b64}" download="euron_improved_resume.md">📝 Download as Markdown</a>'
+                st.markdown(md_href, unsafe_allow_html=True)
     
     st.markdown('</div>', unsafe_allow_html=True)
 
@@ -0,0 +1,91 @@
+import threading
+
+# How a skill is phrased before embedding, so it lands near resume sentences rather than bare keywords
+SKILL_DESCRIPTOR = "Professional experience and demonstrated proficiency with {skill}"
+
+# Cosine similarity -> 0-10 mapping per embedding model: (zero point, ten point, uncertain band).
+# Similarities inside the band are too close to call and go to the LLM. Refit with
+# benchmarks/calibrate_vector_scoring.py against an LLM-scored batch run.
+CALIBRATION = {
+    "text-embedding-ada-002": (0.74, 0.86, (0.77, 0.81)),
+    "text-embedding-3-small": (0.20, 0.55, (0.30, 0.40)),
+    "text-embedding-3-large": (0.15, 0.50, (0.25, 0.35)),
+}
+
+# Skill vectors do not depend on the resume or the API key, so they are shared process-wide
+_skill_vectors = {}
+_lock = threading.Lock()
+
+
+def _normalize(matrix):
+    import numpy as np
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+# Scores whose similarities make up the uncertain band of a fitted calibration
+UNCERTAIN_SCORES = (3, 6)
+
+
+def fit_thresholds(similarities, llm_scores, uncertain_scores=UNCERTAIN_SCORES):
+    """Fit a CALIBRATION entry from max-similarities paired with LLM scores for the same skills
+
+    A line through the pairs gives the zero and ten points; the uncertain band
+    is the similarity range that line maps to uncertain_scores.
+    """
+    import numpy as np
+
+    slope, intercept = np.polyfit(np.asarray(similarities), np.asarray(llm_scores), 1)
+
+    def similarity_at(score):
+        return float((score - intercept) / slope)
+
+    low_score, high_score = uncertain_scores
+    return similarity_at(0), similarity_at(10), (similarity_at(low_score), similarity_at(high_score))
+
+
+class SkillVectorScorer:
+    """Score skills by cosine similarity between skill descriptors and resume chunks"""
+
+    def __init__(self, embeddings, model="text-embedding-ada-002"):
+        self.embeddings = embeddings
+        self.model = model
+        self.low, self.high, self.uncertain_band = CALIBRATION.get(model, CALIBRATION["text-embedding-ada-002"])
+
+    def warm(self, skills):
+        """Embed any skills not cached yet, in a single batch"""
+        import numpy as np
+
+        with _lock:
+            missing = [skill for skill in dict.fromkeys(skills) if (self.model, skill) not in _skill_vectors]
+        if not missing:
+            return 0
+
+        vectors = self.embeddings.embed_documents([SKILL_DESCRIPTOR.format(skill=skill) for skill in missing])
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        with _lock:
+            for skill, vector in zip(missing, vectors):
+                _skill_vectors[(self.model, skill)] = vector
+        return len(missing)
+
+    def score(self, skills, chunk_vectors):
+        """Return {skill: (score 0-10, best similarity, uncertain)} against a chunks x dim matrix"""
+        import numpy as np
+
+        self.warm(skills)
+        with _lock:
+            skill_matrix = np.stack([_skill_vectors[(self.model, skill)] for skill in skills])
+
+        # One matrix multiply gives every skill x chunk cosine similarity
+        similarities = skill_matrix @ _normalize(np.asarray(chunk_vectors, dtype=np.float32)).T
+        best = similarities.max(axis=1)
+        scores = np.rint(np.clip((best - self.low) / (self.high - self.low), 0, 1) * 10).astype(int)
+        low_band, high_band = self.uncertain_band
+        uncertain = (best >= low_band) & (best <= high_band)
+
+        return {
+            skill: (int(score), float(similarity), bool(is_uncertain))
+            for skill, score, similarity, is_uncertain in zip(skills, scores, best, uncertain)
+        }